@@ -0,0 +1,139 @@
+"""
+Answer cache for the Assistant Q&A path (fast_assistant_qa.ask_fast / ask_many).
+Answers are keyed on engine ID plus the normalised question (case, whitespace and
+punctuation folded), kept in an in-memory LRU with a TTL and optionally persisted
+to SQLite so repeated questions are answered across runs without a streamAssist call.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    engine_id TEXT NOT NULL,
+    question_key TEXT NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    used_at REAL NOT NULL,
+    PRIMARY KEY (engine_id, question_key)
+);
+CREATE INDEX IF NOT EXISTS answers_used_at ON answers (used_at);
+"""
+
+# Prune expired and least recently used rows from SQLite every this many stores
+PRUNE_EVERY = 100
+
+_PUNCTUATION = re.compile(r"[^\w\s]+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question(question):
+    """Case-, whitespace- and punctuation-insensitive form of a question ("How do I apply?" == "how do i apply")."""
+    text = unicodedata.normalize("NFKC", question).casefold()
+    text = _PUNCTUATION.sub(" ", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+class AnswerCache:
+    """Thread-safe TTL + LRU answer cache with optional SQLite persistence and hit/miss counters."""
+
+    def __init__(self, ttl_seconds=3600, max_entries=1024, path=None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()    # (engine_id, question_key) -> (answer, stored_at)
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.stores = 0
+        self.conn = None
+        if path:
+            is_new = not os.path.exists(path)
+            self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            if is_new:
+                # Answers may quote internal documents: keep the file private to the current user
+                os.chmod(path, 0o600)
+            self.conn.executescript(SCHEMA)
+            self._prune()
+
+    def get(self, engine_id, question):
+        """Returns the cached answer for the question, or None on a miss (unknown or expired)."""
+        key = (engine_id, normalize_question(question))
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None and self.conn is not None:
+                row = self.conn.execute("SELECT answer, stored_at FROM answers WHERE engine_id = ? AND question_key = ?",
+                                        key).fetchone()
+                if row:
+                    entry = (row[0], row[1])
+                    self._remember(key, entry)
+                    # Memory hits stay pure dict lookups; SQLite recency is refreshed on reload only
+                    with self.conn:
+                        self.conn.execute("UPDATE answers SET used_at = ? WHERE engine_id = ? AND question_key = ?", (now,) + key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if now - entry[1] > self.ttl_seconds:
+                self.entries.pop(key, None)
+                self.expired += 1
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, engine_id, question, answer):
+        key = (engine_id, normalize_question(question))
+        now = time.time()
+        with self.lock:
+            self._remember(key, (answer, now))
+            self.stores += 1
+            if self.conn is not None:
+                with self.conn:
+                    self.conn.execute(
+                        """INSERT OR REPLACE INTO answers (engine_id, question_key, question, answer, stored_at, used_at)
+                           VALUES (?, ?, ?, ?, ?, ?)""",
+                        key + (question, answer, now, now),
+                    )
+                if self.stores % PRUNE_EVERY == 0:
+                    self._prune()
+
+    def _remember(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def _prune(self):
+        """Drops expired rows and keeps the max_entries most recently used ones."""
+        with self.conn:
+            self.conn.execute("DELETE FROM answers WHERE stored_at < ?", (time.time() - self.ttl_seconds,))
+            self.conn.execute(
+                "DELETE FROM answers WHERE rowid NOT IN (SELECT rowid FROM answers ORDER BY used_at DESC LIMIT ?)",
+                (self.max_entries,))
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "stores": self.stores,
+            "entries": len(self.entries),
+        }
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
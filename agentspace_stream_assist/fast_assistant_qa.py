@@ -1,48 +1,136 @@
 #!/usr/bin/env python3
 """
 Fast Assistant Q&A System
-Uses StreamAssist logic but returns only the final answer for speed
+Uses StreamAssist logic but returns only the final answer for speed.
+ask_many() answers a whole question set concurrently over one shared async client;
+both can sit behind an AnswerCache (answer_cache.py) so repeated questions skip the engine.
 """
 
 from google.cloud import discoveryengine_v1
 from google.api_core.client_options import ClientOptions
+import argparse
+import asyncio
+import json
 import re
+import sys
+import time
+from answer_cache import AnswerCache, normalize_question
 
-def ask_fast(question: str) -> str:
+# Configuration from stream_assist.py
+PROJECT_ID = "weizhong-project01"
+LOCATION = "global"
+ENGINE_ID = 'enterprise-search-17484208_1748420861365'
+
+NO_ANSWER = "I couldn't extract a clear final answer from the assistant response."
+
+_client = None
+
+
+def client_options(location: str = LOCATION):
+    """Regional endpoint for non-global locations"""
+    return (
+        ClientOptions(api_endpoint=f"{location}-discoveryengine.googleapis.com")
+        if location != "global"
+        else None
+    )
+
+
+def get_client():
+    """One AssistantServiceClient (and gRPC channel) shared by every ask_fast call"""
+    global _client
+    if _client is None:
+        _client = discoveryengine_v1.AssistantServiceClient(client_options=client_options())
+    return _client
+
+
+def build_request(question: str, engine_id: str = ENGINE_ID):
+    # Create the request using AssistantService (same as stream_assist.py)
+    return discoveryengine_v1.StreamAssistRequest(
+        name=f"projects/{PROJECT_ID}/locations/{LOCATION}/collections/default_collection/engines/{engine_id}/assistants/default_assistant",
+        query=discoveryengine_v1.types.Query(text=question),
+    )
+
+
+def answer_parts(response) -> list:
+    """Answer text parts of one streamed response (thought process, thinking markers and search indicators skipped)"""
+    parts = []
+    # Look for the actual content (not thought process)
+    if hasattr(response, 'answer'):
+        for reply in response.answer.replies:
+            if hasattr(reply, 'grounded_content') and reply.grounded_content:
+                # Check for direct content
+                if hasattr(reply.grounded_content, 'content') and reply.grounded_content.content:
+                    if not getattr(reply.grounded_content.content, 'thought', False):
+                        if hasattr(reply.grounded_content.content, 'text'):
+                            content_text = reply.grounded_content.content.text.strip()
+                            # Skip thinking markers and search indicators
+                            if (content_text and 
+                                not content_text.startswith('**') and 
+                                not content_text.startswith('Searching for') and
+                                len(content_text) > 10 and
+                                not 'thought' in str(reply.grounded_content.content)):
+                                parts.append(content_text)
+    return parts
+
+
+def extract_final_answer(final_answer_parts: list, final_response) -> str:
+    """Builds the final answer from the collected answer parts and the last streamed response"""
+    # Process collected answer parts
+    if final_answer_parts:
+        # Join the parts and clean up
+        final_answer = ' '.join(final_answer_parts)
+        final_answer = re.sub(r'\*\*[^*]+\*\*\s*', '', final_answer)
+        final_answer = final_answer.strip()
+        
+        # If this looks like a complete answer, return it
+        if len(final_answer) > 10:
+            return final_answer
+    
+    # Fallback: try to extract from the final response structure
+    if final_response and hasattr(final_response, 'answer'):
+        answer_obj = final_response.answer
+        if hasattr(answer_obj, 'replies'):
+            for reply in answer_obj.replies:
+                if hasattr(reply, 'grounded_content'):
+                    # Look for text grounding metadata which often contains the clean answer
+                    if hasattr(reply.grounded_content, 'text_grounding_metadata'):
+                        metadata = reply.grounded_content.text_grounding_metadata
+                        if hasattr(metadata, 'segments'):
+                            # Extract text segments to build the answer
+                            segments_text = []
+                            for segment in metadata.segments:
+                                if hasattr(segment, 'text'):
+                                    segments_text.append(segment.text)
+                            if segments_text:
+                                return ' '.join(segments_text)
+    
+    return NO_ANSWER
+
+
+def ask_fast(question: str, cache: AnswerCache = None) -> str:
     """
     Ask a question and get the final answer quickly using Assistant API
     
     Args:
         question: Your question like "What's the date of birth of Alice?"
+        cache: Optional AnswerCache; a fresh cached answer is returned without calling the engine
         
     Returns:
         Direct final answer without streaming steps
     """
-    # Configuration from stream_assist.py
-    project_id = "weizhong-project01"
-    location = "global"
-    engine_id = 'enterprise-search-17484208_1748420861365'
-    
-    # Create AssistantService client (not SearchService)
-    client_options = (
-        ClientOptions(api_endpoint=f"{location}-discoveryengine.googleapis.com")
-        if location != "global"
-        else None
-    )
-    client = discoveryengine_v1.AssistantServiceClient(client_options=client_options)
-    
     print(f"🤔 Question: {question}")
+    if cache is not None:
+        answer = cache.get(ENGINE_ID, question)
+        if answer is not None:
+            print("⚡ Answered from cache")
+            return answer
+    
+    client = get_client()
     print("🔍 Querying assistant...")
     
     try:
-        # Create the request using AssistantService (same as stream_assist.py)
-        request = discoveryengine_v1.StreamAssistRequest(
-            name=f"projects/{project_id}/locations/{location}/collections/default_collection/engines/{engine_id}/assistants/default_assistant",
-            query=discoveryengine_v1.types.Query(text=question),
-        )
-        
         # Get the stream response
-        stream = client.stream_assist(request=request)
+        stream = client.stream_assist(request=build_request(question))
         
         # Collect all responses and extract only the final answer
         final_answer_parts = []
@@ -50,63 +138,192 @@ def ask_fast(question: str) -> str:
         
         for response in stream:
             final_response = response
-            # Look for the actual content (not thought process)
-            if hasattr(response, 'answer'):
-                for reply in response.answer.replies:
-                    if hasattr(reply, 'grounded_content') and reply.grounded_content:
-                        # Check for direct content
-                        if hasattr(reply.grounded_content, 'content') and reply.grounded_content.content:
-                            if not getattr(reply.grounded_content.content, 'thought', False):
-                                if hasattr(reply.grounded_content.content, 'text'):
-                                    content_text = reply.grounded_content.content.text.strip()
-                                    # Skip thinking markers and search indicators
-                                    if (content_text and 
-                                        not content_text.startswith('**') and 
-                                        not content_text.startswith('Searching for') and
-                                        len(content_text) > 10 and
-                                        not 'thought' in str(reply.grounded_content.content)):
-                                        final_answer_parts.append(content_text)
-        
-        # Process collected answer parts
-        if final_answer_parts:
-            # Join the parts and clean up
-            final_answer = ' '.join(final_answer_parts)
-            final_answer = re.sub(r'\*\*[^*]+\*\*\s*', '', final_answer)
-            final_answer = final_answer.strip()
-            
-            # If this looks like a complete answer, return it
-            if len(final_answer) > 10:
-                return final_answer
+            final_answer_parts.extend(answer_parts(response))
         
-        # Fallback: try to extract from the final response structure
-        if final_response and hasattr(final_response, 'answer'):
-            answer_obj = final_response.answer
-            if hasattr(answer_obj, 'replies'):
-                for reply in answer_obj.replies:
-                    if hasattr(reply, 'grounded_content'):
-                        # Look for text grounding metadata which often contains the clean answer
-                        if hasattr(reply.grounded_content, 'text_grounding_metadata'):
-                            metadata = reply.grounded_content.text_grounding_metadata
-                            if hasattr(metadata, 'segments'):
-                                # Extract text segments to build the answer
-                                segments_text = []
-                                for segment in metadata.segments:
-                                    if hasattr(segment, 'text'):
-                                        segments_text.append(segment.text)
-                                if segments_text:
-                                    return ' '.join(segments_text)
-        
-        return "I couldn't extract a clear final answer from the assistant response."
+        answer = extract_final_answer(final_answer_parts, final_response)
+        if cache is not None and answer != NO_ANSWER:
+            cache.put(ENGINE_ID, question, answer)
+        return answer
         
     except Exception as e:
         return f"❌ Error: {str(e)}"
 
+
+async def _ask_one(client, question: str, engine_id: str) -> dict:
+    """Answers one question on the shared async client, timing first answer text (TTFT) and stream end (TTLT)"""
+    start = time.perf_counter()
+    ttft_ms = None
+    final_answer_parts = []
+    final_response = None
+    try:
+        stream = await client.stream_assist(request=build_request(question, engine_id))
+        async for response in stream:
+            final_response = response
+            parts = answer_parts(response)
+            if parts and ttft_ms is None:
+                ttft_ms = (time.perf_counter() - start) * 1000.0
+            final_answer_parts.extend(parts)
+        answer, error = extract_final_answer(final_answer_parts, final_response), None
+    except Exception as e:
+        answer, error = None, str(e)
+    ttlt_ms = (time.perf_counter() - start) * 1000.0
+    return {
+        "question": question,
+        "answer": answer,
+        "error": error,
+        "ttft_ms": round(ttft_ms, 1) if ttft_ms is not None else None,
+        "ttlt_ms": round(ttlt_ms, 1),
+        "cached": False,
+        "shared": False,
+    }
+
+
+async def ask_many(questions: list, concurrency: int = 16, output_path: str = None,
+                   engine_id: str = ENGINE_ID, client=None, cache: AnswerCache = None) -> list:
+    """
+    Answer many questions concurrently over one shared AssistantServiceAsyncClient
+    
+    Args:
+        questions: Questions to ask
+        concurrency: Maximum number of streamAssist calls in flight
+        output_path: Optional JSONL file; each result is appended as soon as it completes
+        engine_id: Engine to ask (defaults to ENGINE_ID)
+        client: Optional AssistantServiceAsyncClient to reuse
+        cache: Optional AnswerCache; hits skip the engine and identical questions
+               in flight at the same time share one streamAssist call
+        
+    Returns:
+        One result per question, in input order:
+        {"index", "question", "answer", "error", "ttft_ms", "ttlt_ms", "cached", "shared"}
+        ("shared": the answer, or error, of an identical question's call that was in flight)
+    """
+    if client is None:
+        client = discoveryengine_v1.AssistantServiceAsyncClient(client_options=client_options())
+    semaphore = asyncio.Semaphore(concurrency)
+    in_flight = {}
+    
+    async def fetch(question):
+        async with semaphore:
+            result = await _ask_one(client, question, engine_id)
+        if cache is not None and not result["error"] and result["answer"] != NO_ANSWER:
+            cache.put(engine_id, question, result["answer"])
+        return result
+    
+    async def run(index, question):
+        if cache is None:
+            result = await fetch(question)
+        else:
+            start = time.perf_counter()
+            answer = cache.get(engine_id, question)
+            key = normalize_question(question)
+            if answer is not None:
+                elapsed = round((time.perf_counter() - start) * 1000.0, 3)
+                result = {"question": question, "answer": answer, "error": None,
+                          "ttft_ms": elapsed, "ttlt_ms": elapsed, "cached": True, "shared": False}
+            elif key in in_flight:
+                # Same normalised question already on its way to the engine: share its answer (or error),
+                # timed by this question's own wait
+                result = dict(await in_flight[key], question=question, cached=False, shared=True)
+                result["ttft_ms"] = result["ttlt_ms"] = round((time.perf_counter() - start) * 1000.0, 1)
+            else:
+                in_flight[key] = asyncio.ensure_future(fetch(question))
+                try:
+                    result = await in_flight[key]
+                finally:
+                    del in_flight[key]
+        result["index"] = index
+        return result
+    
+    results = [None] * len(questions)
+    output = open(output_path, "w", encoding="utf-8") if output_path else None
+    try:
+        tasks = [asyncio.create_task(run(i, q)) for i, q in enumerate(questions)]
+        for done, task in enumerate(asyncio.as_completed(tasks), 1):
+            result = await task
+            results[result["index"]] = result
+            if output:
+                output.write(json.dumps(result, ensure_ascii=False) + "\n")
+                output.flush()
+            status = "error" if result["error"] else ("cached" if result["cached"] else
+                                                      "shared" if result["shared"] else f"TTFT {result['ttft_ms']} ms")
+            print(f"[{done}/{len(questions)}] {status}, TTLT {result['ttlt_ms']} ms: {result['question'][:60]}", file=sys.stderr)
+    finally:
+        if output:
+            output.close()
+    return results
+
+
+def percentile(values: list, pct: float):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))]
+
+
+def print_summary(results: list, elapsed: float, cache: AnswerCache = None):
+    """Per-run latency summary of ask_many results (engine calls only; cache hits and shared calls are counted separately)"""
+    errors = sum(1 for r in results if r["error"])
+    shared_errors = sum(1 for r in results if r["error"] and r["shared"])
+    engine_calls = [r for r in results if not r["cached"] and not r["shared"]]
+    ttft = [r["ttft_ms"] for r in engine_calls if r["ttft_ms"] is not None]
+    ttlt = [r["ttlt_ms"] for r in engine_calls if not r["error"]]
+    print(f"\n{len(results)} question(s) in {elapsed:.1f}s ({len(results) / elapsed:.2f}/s), {errors} error(s)"
+          + (f" ({shared_errors} shared from an in-flight call)" if shared_errors else ""), file=sys.stderr)
+    if cache is not None:
+        stats = cache.stats()
+        print(f"Cache: {sum(1 for r in results if r['cached'])} answered from cache, "
+              f"{sum(1 for r in results if r['shared'])} shared an identical in-flight call; "
+              f"{stats['hits']} hit(s), {stats['misses']} miss(es) (hit rate {stats['hit_rate']:.1%}), "
+              f"{stats['expired']} expired, {stats['evictions']} evicted", file=sys.stderr)
+    for name, values in (("TTFT", ttft), ("TTLT", ttlt)):
+        if values:
+            print(f"{name} ms: p50 {percentile(values, 50)}  p90 {percentile(values, 90)}  "
+                  f"p99 {percentile(values, 99)}  max {max(values)}", file=sys.stderr)
+
+
+def read_questions(path: str) -> list:
+    """One question per line, or JSONL objects with a "question" field; '-' reads stdin"""
+    stream = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    questions = []
+    try:
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            questions.append(json.loads(line)["question"] if line.startswith("{") else line)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    return questions
+
 # def ask_data_store_question() -> str:
 #     """Quick function specifically for Alice's birth date"""
 #     return ask_fast("Jam berapa Bank Jakarta beroperasi?")
 
 def main():
     """Test the fast assistant Q&A"""
+    parser = argparse.ArgumentParser(description="Ask the assistant a set of questions concurrently.")
+    parser.add_argument("--questions", help="File with one question per line (or JSONL with a \"question\" field); '-' reads stdin. Default: the built-in test questions.")
+    parser.add_argument("--output", help="JSONL file receiving each answer with its TTFT/TTLT as soon as it completes.")
+    parser.add_argument("--concurrency", type=int, default=16, help="streamAssist calls in flight at once (default: 16).")
+    parser.add_argument("--engine-id", default=ENGINE_ID, help=f"Engine to ask (default: {ENGINE_ID}).")
+    parser.add_argument("--sequential", action="store_true", help="Answer the built-in test questions one by one with ask_fast().")
+    parser.add_argument("--cache", action="store_true", help="Answer repeated (normalised) questions from an in-memory cache.")
+    parser.add_argument("--cache-db", help="Persist the answer cache in this SQLite file (implies --cache).")
+    parser.add_argument("--cache-ttl", type=float, default=3600, help="Seconds a cached answer stays valid (default: 3600).")
+    parser.add_argument("--cache-size", type=int, default=1024, help="Most recently used answers kept (default: 1024).")
+    args = parser.parse_args()
+    if args.concurrency < 1 or args.cache_size < 1:
+        parser.error("--concurrency and --cache-size must be at least 1")
+    cache = AnswerCache(args.cache_ttl, args.cache_size, path=args.cache_db) if args.cache or args.cache_db else None
+    
+    if args.questions:
+        questions = read_questions(args.questions)
+        start = time.perf_counter()
+        results = asyncio.run(ask_many(questions, concurrency=args.concurrency, output_path=args.output,
+                                       engine_id=args.engine_id, cache=cache))
+        print_summary(results, time.perf_counter() - start, cache)
+        return
     
     print("=== Fast Assistant Q&A System ===")
     print("Using the powerful AssistantService for direct answers\n")
@@ -119,12 +336,24 @@ def main():
         " Does Fried Rice offer training or professional development opportunities?"
     ]
     
-    for i, question in enumerate(test_questions, 1):
-        print(f"Test {i}:")
-        print("-" * 50)
-        answer = ask_fast(question)
-        print(f"Answer: {answer}")
-        print()
+    if args.sequential:
+        for i, question in enumerate(test_questions, 1):
+            print(f"Test {i}:")
+            print("-" * 50)
+            answer = ask_fast(question, cache=cache)
+            print(f"Answer: {answer}")
+            print()
+    else:
+        start = time.perf_counter()
+        results = asyncio.run(ask_many(test_questions, concurrency=args.concurrency, output_path=args.output,
+                                       engine_id=args.engine_id, cache=cache))
+        for i, result in enumerate(results, 1):
+            print(f"Test {i}: {result['question'].strip()}")
+            print("-" * 50)
+            print(f"Answer: {result['answer'] if not result['error'] else '❌ Error: ' + result['error']}")
+            print(f"TTFT: {result['ttft_ms']} ms, TTLT: {result['ttlt_ms']} ms")
+            print()
+        print_summary(results, time.perf_counter() - start, cache)
     
     print("="*50)
     print("✅ Fast Assistant ready!")
@@ -21,10 +21,12 @@ Usage:
 """
 
 import os
+import sys
 import json
-import requests
-from google.auth.transport.requests import Request
-import google.auth
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ge_common import discoveryengine_client
+import stream_parser
 
 
 # ============================================================================
@@ -61,6 +63,10 @@ SAMPLE_QUERY = "What can you help me with?"
 # END CONFIGURATION
 # ============================================================================
 
+# One keep-alive session for every call in the process; the token is cached and
+# refreshed ahead of expiry instead of being fetched from google.auth per request
+SESSION = discoveryengine_client.Session()
+
 
 def get_access_token():
     """
@@ -70,38 +76,24 @@ def get_access_token():
         gcloud auth application-default login
 
     Or set GOOGLE_APPLICATION_CREDENTIALS environment variable to a service account key file.
+    The token comes from the shared credential cache, so repeated calls reuse it until it
+    is close to expiry.
 
     Returns:
         str: Valid OAuth2 access token
     """
-    credentials, project = google.auth.default(
-        scopes=['https://www.googleapis.com/auth/cloud-platform']
-    )
-
-    # Refresh token if expired
-    if not credentials.valid:
-        credentials.refresh(Request())
-
-    return credentials.token
+    return SESSION.credential_cache.token()
 
 
-def invoke_agent_streamassist(query: str, verbose: bool = True) -> str:
+def build_stream_assist_request(query: str):
     """
-    Invoke a Gemini Enterprise agent using the v1alpha streamAssist REST API.
-
-    This function sends a query to a specific agent and processes the streaming response.
-    The agent must be registered in your Gemini Enterprise app.
+    Build the v1alpha streamAssist request for a query to the configured agent.
 
     Args:
         query: The text query to send to the agent. Can include @mentions if needed.
-        verbose: If True, prints detailed logging information during execution.
 
     Returns:
-        str: The complete response text from the agent, with streaming chunks concatenated.
-             Returns empty string if request fails or no response received.
-
-    API Reference:
-        https://cloud.google.com/generative-ai-app-builder/docs/reference/rest/v1alpha/projects.locations.collections.engines.assistants/streamAssist
+        tuple: (url, headers, body) for a POST to the streamAssist endpoint.
     """
 
     # Construct the full resource name for the assistant
@@ -111,24 +103,11 @@ def invoke_agent_streamassist(query: str, verbose: bool = True) -> str:
         f"engines/{ENGINE_ID}/assistants/{ASSISTANT_ID}"
     )
 
-    # Construct the v1alpha streamAssist endpoint URL
-    url = f"https://discoveryengine.googleapis.com/v1alpha/{assistant_name}:streamAssist"
-
-    if verbose:
-        print("=" * 60)
-        print("GEMINI ENTERPRISE - AGENT INVOCATION")
-        print("=" * 60)
-        print(f"Agent: {AGENT_DISPLAY_NAME} (ID: {AGENT_ID})")
-        print(f"URL: {url}")
-        print(f"Query: {query}")
-        print("=" * 60)
-
-    # Get OAuth2 access token for authentication
-    token = get_access_token()
+    # Construct the v1alpha streamAssist endpoint URL (regional host for non-global locations)
+    url = discoveryengine_client.api_url(LOCATION, f"{assistant_name}:streamAssist")
 
-    # Prepare HTTP request headers
+    # Prepare HTTP request headers (the shared session adds the OAuth2 bearer token)
     headers = {
-        "Authorization": f"Bearer {token}",
         "Content-Type": "application/json"
     }
 
@@ -146,90 +125,98 @@ def invoke_agent_streamassist(query: str, verbose: bool = True) -> str:
             ]
         }
     }
+    return url, headers, body
+
+
+def stream_agent_replies(query: str, include_thoughts: bool = False):
+    """
+    Invoke the configured agent and yield its groundedContent objects as they stream in.
+
+    Each answer.replies[*].groundedContent is yielded as soon as the server has sent it,
+    so the first text is available after the first streamed chunk rather than after the
+    whole answer. Only the chunk being received is buffered.
+
+    Args:
+        query: The text query to send to the agent.
+        include_thoughts: If True, also yield "thought" parts (the agent's internal reasoning).
+
+    Yields:
+        dict: groundedContent objects; the text is in ["content"]["text"].
+
+    Raises:
+        RuntimeError: If the API returns a non-200 status.
+    """
+    url, headers, body = build_stream_assist_request(query)
+    response = SESSION.post(url, headers=headers, json=body, stream=True)
+    try:
+        if response.status_code != 200:
+            raise RuntimeError(f"Error {response.status_code}: {response.text}")
+        # chunk_size=None hands over the bytes as they arrive on the socket
+        yield from stream_parser.iter_grounded_contents(response.iter_content(chunk_size=None),
+                                                        include_thoughts=include_thoughts)
+    finally:
+        response.close()
+
+
+def invoke_agent_streamassist(query: str, verbose: bool = True) -> str:
+    """
+    Invoke a Gemini Enterprise agent using the v1alpha streamAssist REST API.
+
+    This function sends a query to a specific agent and processes the streaming response,
+    printing each piece of the answer as soon as it arrives.
+    The agent must be registered in your Gemini Enterprise app.
+
+    Args:
+        query: The text query to send to the agent. Can include @mentions if needed.
+        verbose: If True, prints detailed logging information during execution.
+
+    Returns:
+        str: The complete response text from the agent, with streaming chunks concatenated.
+             Returns empty string if request fails or no response received.
+
+    API Reference:
+        https://cloud.google.com/generative-ai-app-builder/docs/reference/rest/v1alpha/projects.locations.collections.engines.assistants/streamAssist
+    """
 
     if verbose:
+        url, _, body = build_stream_assist_request(query)
+        print("=" * 60)
+        print("GEMINI ENTERPRISE - AGENT INVOCATION")
+        print("=" * 60)
+        print(f"Agent: {AGENT_DISPLAY_NAME} (ID: {AGENT_ID})")
+        print(f"URL: {url}")
+        print(f"Query: {query}")
+        print("=" * 60)
         print("\nRequest body:")
         print(json.dumps(body, indent=2))
         print()
-
-    # Make the HTTP POST request
-    if verbose:
         print("Making request...")
 
-    response = requests.post(url, headers=headers, json=body, stream=True)
-
-    if verbose:
-        print(f"Response status: {response.status_code}\n")
-
-    # Handle error responses
-    if response.status_code != 200:
-        error_msg = f"Error {response.status_code}: {response.text}"
+    full_response = []
+    started = False
+    try:
+        for grounded in stream_agent_replies(query):
+            if verbose and not started:
+                # Process the streaming response
+                print("Response:")
+                print("-" * 60)
+            started = True
+            # Response structure: groundedContent["content"]["text"] ("thought" parts are already filtered out)
+            text = grounded.get("content", {}).get("text")
+            if text:
+                if verbose:
+                    print(text, end="", flush=True)
+                full_response.append(text)
+    except RuntimeError as e:
+        # Handle error responses
         if verbose:
             print("ERROR:")
             print("-" * 60)
-            print(error_msg)
+            print(e)
             print("-" * 60)
         return ""
 
-    # Process the streaming response
-    if verbose:
-        print("Response:")
-        print("-" * 60)
-
-    full_response = []
-    response_text = response.text
-
-    try:
-        # Try to parse the response as a complete JSON array
-        # The API may return responses in JSON array format
-        if response_text.startswith('['):
-            data_array = json.loads(response_text)
-            for data in data_array:
-                # Extract text from each response chunk
-                # Response structure: data["answer"]["replies"][n]["groundedContent"]["content"]["text"]
-                if "answer" in data and "replies" in data["answer"]:
-                    for reply in data["answer"]["replies"]:
-                        if "groundedContent" in reply and "content" in reply["groundedContent"]:
-                            if "text" in reply["groundedContent"]["content"]:
-                                text = reply["groundedContent"]["content"]["text"]
-                                # Filter out "thought" text (internal reasoning from agents)
-                                # Only include actual response content
-                                if not reply["groundedContent"]["content"].get("thought", False):
-                                    if verbose:
-                                        print(text, end="", flush=True)
-                                    full_response.append(text)
-    except json.JSONDecodeError:
-        # Fallback: parse line by line if array parsing fails
-        # Some responses may be newline-delimited JSON objects
-        for line in response_text.split('\n'):
-            line = line.strip().rstrip(',')
-            if line and (line.startswith('{') or line.startswith('[')):
-                try:
-                    # Remove array brackets if present
-                    if line.startswith('['):
-                        line = line[1:]
-                    if line.endswith(']'):
-                        line = line[:-1]
-                    line = line.strip().rstrip(',')
-
-                    if line:
-                        data = json.loads(line)
-                        # Extract text using the same structure as above
-                        if "answer" in data and "replies" in data["answer"]:
-                            for reply in data["answer"]["replies"]:
-                                if "groundedContent" in reply and "content" in reply["groundedContent"]:
-                                    if "text" in reply["groundedContent"]["content"]:
-                                        text = reply["groundedContent"]["content"]["text"]
-                                        # Filter out internal "thought" content
-                                        if not reply["groundedContent"]["content"].get("thought", False):
-                                            if verbose:
-                                                print(text, end="", flush=True)
-                                            full_response.append(text)
-                except json.JSONDecodeError:
-                    # Skip lines that aren't valid JSON
-                    continue
-
-    if verbose:
+    if verbose and started:
         print("\n" + "-" * 60)
 
     # Return the concatenated response text
@@ -34,6 +34,10 @@
 
 from google.cloud import discoveryengine_v1
 from google.api_core.client_options import ClientOptions
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 # Update accordingly
 project_id = "weizhong-project01"
@@ -43,6 +47,38 @@ search_query = "tell me about dyson singapore"
 another_search_query = "what is their address?"
 last_search_query = "how can i get there from google singapore?"
 
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(location: str):
+    """One AssistantServiceClient (and gRPC channel) per location, shared by every turn"""
+    with _clients_lock:
+        if location not in _clients:
+            # Client options
+            client_options = (
+                ClientOptions(api_endpoint=f"{location}-discoveryengine.googleapis.com")
+                if location != "global"
+                else None
+            )
+            _clients[location] = discoveryengine_v1.AssistantServiceClient(client_options=client_options)
+        return _clients[location]
+
+
+def build_request(assistant_name: str, search_query: str, session_id=None):
+    """StreamAssistRequest for a query; with a session_id the turn continues that session"""
+    if session_id is None:
+        return discoveryengine_v1.StreamAssistRequest(
+            name=assistant_name,
+            query=discoveryengine_v1.types.Query(text=search_query),
+        )
+    return discoveryengine_v1.StreamAssistRequest(
+        name=assistant_name,
+        query=discoveryengine_v1.types.Query(text=search_query),
+        session=session_id,
+    )
+
+
 def sample_stream_assist(
     project_id: str,
     location: str,
@@ -50,66 +86,214 @@ def sample_stream_assist(
     search_query: str,
     session_id=None,
 ):
-    # Client options
-    client_options = (
-        ClientOptions(api_endpoint=f"{location}-discoveryengine.googleapis.com")
-        if location != "global"
-        else None
+    # Reuse the shared client
+    client = get_client(location)
+
+    # Initialize request argument(s)
+    request = build_request(
+        f"projects/{project_id}/locations/{location}/collections/default_collection/engines/{engine_id}/assistants/default_assistant",
+        search_query,
+        session_id,
     )
-    # Create a client
-    client = discoveryengine_v1.AssistantServiceClient(client_options=client_options)
 
-    # Check is session_id is present
-    if session_id is None:
-        # Initialize request argument(s)
-        request = discoveryengine_v1.StreamAssistRequest(
-            name=f"projects/{project_id}/locations/{location}/collections/default_collection/engines/{engine_id}/assistants/default_assistant",
-            query=discoveryengine_v1.types.Query(text=search_query),
-        )
+    # Make the request
+    stream = client.stream_assist(request=request)
+
+    # Handle the response
+    return_value = None
+    for response in stream:
+        #print(response)
+        return_value = response
+
+    return return_value # This contains the session_info
+
+
+class Turn:
+    """
+    One streamAssist call of a conversation. session_id is published as soon as the
+    first chunk carrying session_info arrives, while the rest of the answer keeps streaming.
+    Latencies are measured from the moment the call is sent; queued_ms is the time the turn
+    waited before that (behind the previous turn of the same user, or for a worker).
+    """
+
+    def __init__(self, user: str, query: str):
+        self.user = user
+        self.query = query
+        self.session_id = None
+        self.responses = []
+        self.error = None
+        self.created = time.perf_counter()
+        self.started = None
+        self.queued_ms = None
+        self.session_ms = None       # time until the session id was known
+        self.first_chunk_ms = None
+        self.total_ms = None
+        self._session_known = threading.Event()
+        self._done = threading.Event()
+
+    def _start(self):
+        self.started = time.perf_counter()
+        self.queued_ms = (self.started - self.created) * 1000.0
+
+    def _on_response(self, response):
+        elapsed = (time.perf_counter() - self.started) * 1000.0
+        if self.first_chunk_ms is None:
+            self.first_chunk_ms = elapsed
+        self.responses.append(response)
+        if self.session_id is None and response.session_info.session:
+            self.session_id = response.session_info.session
+            self.session_ms = elapsed
+            self._session_known.set()
+
+    def _finish(self, error=None):
+        self.error = error
+        if self.started is not None:
+            self.total_ms = (time.perf_counter() - self.started) * 1000.0
+        self._session_known.set()
+        self._done.set()
+
+    def wait_session(self, timeout=None):
+        """Blocks until the session id is known (or the turn ended without one); returns it."""
+        self._session_known.wait(timeout)
+        return self.session_id
+
+    def result(self, timeout=None):
+        """Blocks until the stream ends; returns the last response (as sample_stream_assist does)."""
+        self._done.wait(timeout)
+        if self.error:
+            raise self.error
+        return self.responses[-1] if self.responses else None
+
+    def text(self, timeout=None) -> str:
+        """The answer text of the finished turn, without thought parts"""
+        self.result(timeout)
+        parts = []
+        for response in self.responses:
+            for reply in response.answer.replies:
+                content = reply.grounded_content.content
+                if content.text and not content.thought:
+                    parts.append(content.text)
+        return "".join(parts)
+
+
+class ConversationManager:
+    """
+    Multi-turn conversations for many users over one AssistantServiceClient.
+    Keeps a pool of live sessions keyed by user (least recently used evicted beyond
+    max_sessions, expired after session_ttl seconds idle). With pipeline=True a
+    follow-up turn starts as soon as the previous turn's session id is known instead
+    of after its whole answer has streamed.
+    """
+
+    def __init__(self, project_id: str, location: str, engine_id: str, client=None,
+                 max_sessions: int = 1000, session_ttl: float = 1800, max_workers: int = 16,
+                 pipeline: bool = True):
+        self.name = (f"projects/{project_id}/locations/{location}/collections/default_collection/"
+                     f"engines/{engine_id}/assistants/default_assistant")
+        self.client = client or get_client(location)
+        self.max_sessions = max_sessions
+        self.session_ttl = session_ttl
+        self.pipeline = pipeline
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="turn")
+        self.lock = threading.Lock()
+        self.sessions = OrderedDict()    # user -> {"session": id, "last_turn": Turn, "used_at": time}
+
+    def ask(self, user: str, query: str) -> Turn:
+        """Starts a turn for the user (continuing their live session, if any) and returns it immediately."""
+        turn = Turn(user, query)
+        now = time.monotonic()
+        with self.lock:
+            entry = self.sessions.get(user)
+            if entry is not None and now - entry["used_at"] > self.session_ttl:
+                entry = None
+            previous = entry["last_turn"] if entry else None
+            session = entry["session"] if entry else None
+            self.sessions[user] = {"session": session, "last_turn": turn, "used_at": now}
+            self.sessions.move_to_end(user)
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+        self.executor.submit(self._run, turn, previous, session)
+        return turn
+
+    def _run(self, turn, previous, session):
+        try:
+            if previous is not None:
+                # The follow-up needs the session id of the turn before it; with pipelining that
+                # is known from its first chunk, otherwise wait for its whole answer
+                if self.pipeline:
+                    session = previous.wait_session() or session
+                else:
+                    previous._done.wait()
+                    session = previous.session_id or session
+                if session is None:
+                    # Sending without a session would quietly start a new conversation
+                    raise RuntimeError(f"previous turn of {turn.user} ended without a session id "
+                                       f"({previous.error!r}); its follow-ups are not sent")
+            turn._start()
+            for response in self.client.stream_assist(request=build_request(self.name, turn.query, session)):
+                known = turn.session_id
+                turn._on_response(response)
+                if known is None and turn.session_id:
+                    self._remember_session(turn)
+            if turn.session_id is None:
+                turn.session_id = session
+        except Exception as e:
+            turn._finish(e)
+            if session is None and turn.session_id is None:
+                # No conversation to continue: the user's next turn starts a new one
+                self._forget(turn)
+            return
+        turn._finish()
+
+    def _remember_session(self, turn):
+        with self.lock:
+            entry = self.sessions.get(turn.user)
+            if entry is not None:
+                entry["session"] = turn.session_id
+
+    def _forget(self, turn):
+        with self.lock:
+            entry = self.sessions.get(turn.user)
+            if entry is not None and entry["last_turn"] is turn:
+                del self.sessions[turn.user]
+
+    def session_of(self, user: str):
+        with self.lock:
+            entry = self.sessions.get(user)
+            return entry["session"] if entry else None
+
+    def reset(self, user: str):
+        """Forgets the user's session; their next turn starts a new conversation."""
+        with self.lock:
+            self.sessions.pop(user, None)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
 
-        # Make the request
-        stream = client.stream_assist(request=request)
-
-        # Handle the response
-        for response in stream:
-            #print(response)
-            return_value = response
-        
-        return return_value # This contains the session_info
-
-    # With Session ID
-    else:
-        #print(search_query)
-        request = discoveryengine_v1.StreamAssistRequest(
-            name=f"projects/{project_id}/locations/{location}/collections/default_collection/engines/{engine_id}/assistants/default_assistant",
-            query=discoveryengine_v1.types.Query(text=search_query),
-            session=session_id,
-        )
-        stream = client.stream_assist(request=request)
-        
-        for response in stream:
-            #print(response)
-            return_value = response
-        
-        return return_value 
 
 def main():
     print("Querying discovery engine...")
+    manager = ConversationManager(project_id, location, engine_id)
+    user = "demo-user"
+
     print(f"First search query: {search_query}")
-    result = sample_stream_assist(project_id, location, engine_id, search_query)
+    first = manager.ask(user, search_query)
 
-    # Get the session info
-    # Continue the conversation
-    session_id = result.session_info.session
-    print(f"Session ID: {session_id}")
+    # The session id arrives with the first chunks; the follow-ups are queued right behind it
+    session_id = first.wait_session()
+    print(f"Session ID: {session_id} (after {first.session_ms or 0:.0f} ms)")
 
-    # Run sample_stream_assist again
     print(f"Second search query: {another_search_query}")
-    result2 = sample_stream_assist(project_id, location, engine_id, another_search_query, session_id=session_id)
+    second = manager.ask(user, another_search_query)
 
-    # Run sample_stream_assist last time
     print(f"Last search query: {last_search_query}")
-    result3 = sample_stream_assist(project_id, location, engine_id, last_search_query, session_id=session_id)
+    last = manager.ask(user, last_search_query)
+
+    for turn in (first, second, last):
+        turn.result()
+        print(f"[{turn.total_ms:.0f} ms, first chunk {turn.first_chunk_ms or 0:.0f} ms, "
+              f"queued {turn.queued_ms:.0f} ms] {turn.query}")
+    manager.close()
 
 if __name__ == "__main__":
    main()
@@ -0,0 +1,122 @@
+"""
+Incremental parser for the streamAssist REST response.
+The REST API streams one JSON array ("[{...},\r\n{...}]") whose elements are the
+StreamAssistResponse chunks. These generators consume the raw byte chunks of
+`response.iter_content()` and yield each chunk as soon as its closing brace arrives,
+buffering only the element being received instead of the whole response;
+ObjectStreamParser is the push-style core for async readers.
+Newline-delimited objects (no enclosing array) are accepted as well.
+"""
+
+import json
+import re
+
+# Outside strings: a complete string (skipped in one match), a bracket, or the opening
+# quote of a string that continues in the next chunk
+_TOKEN = re.compile(rb'(?P<string>"(?:[^"\\]|\\.)*")|(?P<bracket>[{}\[\]])|(?P<quote>")', re.DOTALL)
+# Inside a string continued from the previous chunk: its closing quote or an escape
+_IN_STRING = re.compile(rb'["\\]')
+_OPENING = (ord("{"), ord("["))
+
+
+class ObjectStreamParser:
+    """
+    Push parser for a streamed JSON array (or concatenated / newline-delimited objects):
+    feed() it byte chunks as they arrive and it returns the top-level objects completed
+    by each chunk. Only the element being received is buffered.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.depth = 0
+        self.base = None        # 1 inside an enclosing array, 0 for bare objects
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, chunk):
+        """Consumes one chunk (bytes or str); returns the list of objects it completed."""
+        if not chunk:
+            return []
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        if self.base is None:
+            stripped = chunk.lstrip()
+            if not stripped:
+                return []
+            self.base = 1 if stripped[:1] == b"[" else 0
+        objects = []
+        base = self.base
+        start = 0 if self.depth > base else None
+        position = 0
+        while position < len(chunk):
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                    position += 1
+                    continue
+                match = _IN_STRING.search(chunk, position)
+                if not match:
+                    break
+                position = match.end()
+                if match.group() == b"\\":
+                    self.escaped = True
+                else:
+                    self.in_string = False
+                continue
+            for match in _TOKEN.finditer(chunk, position):
+                kind = match.lastgroup
+                if kind == "string":
+                    continue
+                if kind == "quote":
+                    self.in_string = True
+                    position = match.end()
+                    break
+                if chunk[match.start()] in _OPENING:
+                    if self.depth == base:
+                        start = match.start()
+                    self.depth += 1
+                else:
+                    self.depth -= 1
+                    if self.depth == base and start is not None:
+                        self.buffer += chunk[start:match.end()]
+                        objects.append(json.loads(bytes(self.buffer)))
+                        self.buffer.clear()
+                        start = None
+            else:
+                break
+        if start is not None:
+            self.buffer += chunk[start:]
+        return objects
+
+
+def iter_json_objects(chunks):
+    """
+    Yields every top-level object of a streamed JSON array (or of concatenated /
+    newline-delimited objects) from an iterable of bytes chunks, as soon as it is complete.
+    """
+    parser = ObjectStreamParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+
+
+def iter_grounded_contents(chunks, include_thoughts=False):
+    """
+    Yields the answer.replies[*].groundedContent objects of a streamAssist response in
+    arrival order, skipping "thought" parts (the agent's internal reasoning) by default.
+    """
+    for response in iter_json_objects(chunks):
+        for reply in response.get("answer", {}).get("replies", []):
+            grounded = reply.get("groundedContent")
+            if not grounded:
+                continue
+            if not include_thoughts and grounded.get("content", {}).get("thought", False):
+                continue
+            yield grounded
+
+
+def iter_reply_text(chunks):
+    """Yields the answer text of a streamAssist response piece by piece, without thoughts."""
+    for grounded in iter_grounded_contents(chunks):
+        text = grounded.get("content", {}).get("text")
+        if text:
+            yield text
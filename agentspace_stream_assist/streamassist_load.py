@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""
+Open-loop / closed-loop load generator for the streamAssist REST API.
+Sends the request shape of invoke_agent_streamassist_generic.py at one or more stages:
+fixed Poisson arrival rates (open loop, e.g. 5, 50 and 200 requests per second) or fixed
+numbers of back-to-back workers (closed loop). Records time to first answer text (TTFT),
+gap between streamed answer chunks and time to last chunk (TTLT) into HDR-style histograms, and writes
+percentile reports plus the raw per-request samples to an output directory.
+
+Open-loop latencies are measured from each request's scheduled arrival time, so a
+client or server that falls behind shows up in the percentiles instead of being hidden
+(coordinated omission). --stub runs the test against a local streamassist_stub.py.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ge_common import discoveryengine_client
+import stream_parser
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+METRICS = ("ttft", "gap", "ttlt")
+REPORT_PERCENTILES = (50, 90, 95, 99, 99.9, 100)
+
+
+class LatencyHistogram:
+    """
+    HDR-style histogram of latencies recorded in microseconds: exact below 2048 us and
+    1024 linear sub-buckets per power of two above, i.e. better than 0.1% relative
+    precision at any magnitude with a fixed, small memory footprint.
+    """
+
+    SUB_BUCKET_BITS = 10
+
+    def __init__(self):
+        self.counts = {}
+        self.total = 0
+        self.sum = 0.0
+        self.sum_squares = 0.0
+        self.max = 0
+
+    def _index(self, value):
+        if value < 2 << self.SUB_BUCKET_BITS:
+            return value
+        shift = value.bit_length() - self.SUB_BUCKET_BITS - 1
+        return ((shift + 1) << self.SUB_BUCKET_BITS) + (value >> shift)
+
+    def _highest_equivalent(self, index):
+        if index < 2 << self.SUB_BUCKET_BITS:
+            return index
+        shift = (index >> self.SUB_BUCKET_BITS) - 2
+        top = index - ((shift + 1) << self.SUB_BUCKET_BITS)
+        return ((top + 1) << shift) - 1
+
+    def record(self, ms):
+        value = max(0, int(round(ms * 1000.0)))
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.total += 1
+        self.sum += value
+        self.sum_squares += value * value
+        self.max = max(self.max, value)
+
+    def percentile(self, pct):
+        """Value (ms) at or below which pct percent of the recorded values fall."""
+        if not self.total:
+            return None
+        target = max(1, int(math.ceil(pct / 100.0 * self.total)))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self._highest_equivalent(index), self.max) / 1000.0
+        return self.max / 1000.0
+
+    def mean(self):
+        return self.sum / self.total / 1000.0 if self.total else None
+
+    def stddev(self):
+        if not self.total:
+            return None
+        mean = self.sum / self.total
+        return math.sqrt(max(0.0, self.sum_squares / self.total - mean * mean)) / 1000.0
+
+    def summary(self):
+        summary = {"count": self.total, "mean": _round(self.mean()), "stddev": _round(self.stddev())}
+        for pct in REPORT_PERCENTILES:
+            summary[f"p{pct:g}"] = _round(self.percentile(pct))
+        return summary
+
+    def write_percentile_distribution(self, path, ticks_per_half_distance=5):
+        """Writes the HdrHistogram percentile distribution (.hgrm) text format, values in milliseconds."""
+        with open(path, "w") as f:
+            f.write(f"{'Value':>12} {'Percentile':>14} {'TotalCount':>10} {'1/(1-Percentile)':>14}\n\n")
+            if self.total:
+                indexes = sorted(self.counts)
+                cumulative, position = 0, 0
+                pct = 0.0
+                while True:
+                    target = max(1, int(math.ceil(pct / 100.0 * self.total)))
+                    while cumulative < target:
+                        cumulative += self.counts[indexes[position]]
+                        position += 1
+                    value = min(self._highest_equivalent(indexes[position - 1]), self.max) / 1000.0
+                    fraction = cumulative / self.total
+                    inverse = f"{1.0 / (1.0 - fraction):14.2f}" if fraction < 1.0 else ""
+                    f.write(f"{value:12.3f} {fraction:14.12f} {cumulative:10d} {inverse}\n")
+                    if cumulative >= self.total:
+                        break
+                    # HdrHistogram tick spacing: halve the step each time the remaining distance halves
+                    half_distance = 2 ** (math.floor(math.log2(100.0 / (100.0 - pct))) + 1)
+                    pct = min(100.0, pct + 100.0 / (half_distance * ticks_per_half_distance))
+            f.write(f"#[Mean    = {_round(self.mean()) or 0:12.3f}, StdDeviation   = {_round(self.stddev()) or 0:12.3f}]\n")
+            f.write(f"#[Max     = {self.max / 1000.0:12.3f}, Total count    = {self.total:12d}]\n")
+            f.write(f"#[Buckets = {len(self.counts):12d}, SubBuckets     = {1 << self.SUB_BUCKET_BITS:12d}]\n")
+
+
+def _round(value, digits=3):
+    return round(value, digits) if value is not None else None
+
+
+class Stage:
+    """Samples and histograms of one load level."""
+
+    def __init__(self, name, mode, level):
+        self.name = name
+        self.mode = mode
+        self.level = level
+        self.histograms = {metric: LatencyHistogram() for metric in METRICS}
+        # Scheduled arrival -> actual send: grows when the load generator itself falls behind
+        self.start_delay = LatencyHistogram()
+        self.sent = 0
+        self.ok = 0
+        self.errors = {}
+        self.dropped = 0
+        self.started = None
+        self.elapsed = None
+        self.warmup_used = 0.0
+
+
+def build_request(args, query):
+    """URL and body of the streamAssist call (same shape as invoke_agent_streamassist_generic.py)."""
+    assistant_name = (f"projects/{args.project_id}/locations/{args.location}/collections/{args.collection}/"
+                      f"engines/{args.engine_id}/assistants/{args.assistant_id}")
+    body = {"query": {"text": query}}
+    if args.agent_id:
+        body["agentsSpec"] = {"agentSpecs": [{"agentId": args.agent_id}]}
+    return discoveryengine_client.api_url(args.location, f"{assistant_name}:streamAssist"), body
+
+
+async def send_one(client, args, stage, queries, scheduled, measure_window, samples):
+    """
+    Sends one streamAssist request and records its sample. Latencies are measured from
+    `scheduled` (the arrival time for open-loop, the send time for closed-loop).
+    """
+    query = random.choice(queries)
+    url, body = build_request(args, query)
+    loop = asyncio.get_running_loop()
+    sent = loop.time()
+    sample = {"stage": stage.name, "offset_s": round(scheduled - stage.started, 4),
+              "start_delay_ms": round((sent - scheduled) * 1000.0, 3), "status": None, "error": None,
+              "ttft_ms": None, "ttlt_ms": None, "chunks": 0, "max_gap_ms": None, "bytes": 0}
+    gaps = []
+    stage.sent += 1
+    try:
+        async with client.stream("POST", url, json=body, headers={"Content-Type": "application/json"},
+                                 timeout=args.timeout) as response:
+            sample["status"] = response.status_code
+            if response.status_code != 200:
+                sample["error"] = f"HTTP {response.status_code}"
+                await response.aread()
+            else:
+                parser = stream_parser.ObjectStreamParser()
+                last = None
+                async for data in response.aiter_bytes():
+                    sample["bytes"] += len(data)
+                    for element in parser.feed(data):
+                        now = loop.time()
+                        sample["chunks"] += 1
+                        # Gaps are measured between chunks once the answer text has started streaming
+                        if last is not None:
+                            gaps.append((now - last) * 1000.0)
+                            last = now
+                        elif _has_answer_text(element):
+                            sample["ttft_ms"] = round((now - scheduled) * 1000.0, 3)
+                            last = now
+                sample["ttlt_ms"] = round((loop.time() - scheduled) * 1000.0, 3)
+    except Exception as e:
+        sample["error"] = f"{type(e).__name__}: {e}"[:300]
+    if gaps:
+        sample["max_gap_ms"] = round(max(gaps), 3)
+
+    if measure_window(scheduled):
+        stage.start_delay.record(sample["start_delay_ms"])
+        if sample["error"]:
+            stage.errors[sample["error"]] = stage.errors.get(sample["error"], 0) + 1
+        else:
+            stage.ok += 1
+            if sample["ttft_ms"] is not None:
+                stage.histograms["ttft"].record(sample["ttft_ms"])
+            stage.histograms["ttlt"].record(sample["ttlt_ms"])
+            for gap in gaps:
+                stage.histograms["gap"].record(gap)
+        samples.write(json.dumps(sample) + "\n")
+
+
+def _has_answer_text(element):
+    for reply in element.get("answer", {}).get("replies", []):
+        content = reply.get("groundedContent", {}).get("content", {})
+        if content.get("text") and not content.get("thought", False):
+            return True
+    return False
+
+
+async def run_open_loop(client, args, stage, queries, samples):
+    """Poisson arrivals at stage.level requests per second for --duration seconds."""
+    loop = asyncio.get_running_loop()
+    rng = random.Random(args.seed)
+    in_flight = set()
+    stage.started = next_arrival = loop.time()
+    end = stage.started + args.duration
+    measure_from = stage.started + args.warmup
+    while True:
+        next_arrival += rng.expovariate(stage.level)
+        if next_arrival >= end:
+            break
+        delay = next_arrival - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(in_flight) >= args.max_in_flight:
+            # Client-side cap reached: count the arrival instead of silently slowing the schedule
+            if next_arrival >= measure_from:
+                stage.dropped += 1
+            continue
+        task = asyncio.create_task(send_one(client, args, stage, queries, next_arrival,
+                                            lambda t: t >= measure_from, samples))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+    if in_flight:
+        await asyncio.gather(*in_flight)
+    stage.elapsed = loop.time() - stage.started
+
+
+async def run_closed_loop(client, args, stage, queries, samples):
+    """stage.level workers each sending back-to-back requests for --duration seconds."""
+    loop = asyncio.get_running_loop()
+    stage.started = loop.time()
+    end = stage.started + args.duration
+    measure_from = stage.started + args.warmup
+
+    async def worker():
+        while loop.time() < end:
+            await send_one(client, args, stage, queries, loop.time(), lambda t: t >= measure_from, samples)
+
+    await asyncio.gather(*(worker() for _ in range(stage.level)))
+    stage.elapsed = loop.time() - stage.started
+
+
+def print_stage(stage, file=sys.stderr):
+    measured = stage.ok + sum(stage.errors.values())
+    window = max(1e-9, stage.elapsed - stage.warmup_used)
+    unit = "req/s" if stage.mode == "open" else "workers"
+    print(f"\n=== {stage.name}: {stage.level:g} {unit}, {measured} measured request(s) "
+          f"({measured / window:.1f}/s achieved), {stage.ok} ok, {sum(stage.errors.values())} error(s), "
+          f"{stage.dropped} dropped ===", file=file)
+    print(f"{'metric':<6} | {'count':>7} | {'p50':>9} | {'p90':>9} | {'p95':>9} | {'p99':>9} | {'p99.9':>9} | {'max':>9}  (ms)", file=file)
+    for metric in METRICS:
+        summary = stage.histograms[metric].summary()
+        cells = " | ".join(f"{summary[key]:>9.1f}" if summary[key] is not None else f"{'-':>9}"
+                           for key in ("p50", "p90", "p95", "p99", "p99.9", "p100"))
+        print(f"{metric:<6} | {summary['count']:>7} | {cells}", file=file)
+    for error, count in sorted(stage.errors.items(), key=lambda item: -item[1])[:5]:
+        print(f"  {count} x {error}", file=file)
+    start_delay = stage.start_delay.percentile(99)
+    if start_delay is not None and start_delay > 100:
+        print(f"  Warning: p99 send delay {start_delay:.0f} ms behind schedule; the load generator is saturated "
+              f"(install httpx[http2], use more cores or split the rate across machines).", file=file)
+
+
+def write_report(out_dir, args, stages):
+    report = {
+        "mode": args.mode,
+        "duration_s": args.duration,
+        "warmup_s": args.warmup,
+        "target": discoveryengine_client.api_base(args.location),
+        "engine_id": args.engine_id,
+        "agent_id": args.agent_id,
+        "stages": [],
+    }
+    for stage in stages:
+        measured = stage.ok + sum(stage.errors.values())
+        report["stages"].append({
+            "name": stage.name,
+            "level": stage.level,
+            "sent": stage.sent,
+            "requests": measured,
+            "ok": stage.ok,
+            "errors": stage.errors,
+            "dropped": stage.dropped,
+            "achieved_rps": round(measured / max(1e-9, stage.elapsed - stage.warmup_used), 3),
+            "latency_ms": {metric: stage.histograms[metric].summary() for metric in METRICS},
+            "send_delay_ms": stage.start_delay.summary(),
+        })
+        for metric in METRICS:
+            stage.histograms[metric].write_percentile_distribution(os.path.join(out_dir, f"{stage.name}_{metric}.hgrm"))
+    with open(os.path.join(out_dir, "report.json"), "w") as f:
+        json.dump(report, f, indent=2)
+
+
+def start_stub(stub_args):
+    """Runs streamassist_stub.py in its own process (so it does not share the load generator's GIL); returns (process, base URL)."""
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    process = subprocess.Popen([sys.executable, os.path.join(DIR, "streamassist_stub.py"), "--port", str(port)] + stub_args)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    print("Error: the local stub server did not start.", file=sys.stderr)
+    sys.exit(1)
+
+
+async def run(args, queries, levels, out_dir):
+    # The thread-backed client fallback needs one worker thread per in-flight stream
+    max_streams = args.max_in_flight if args.mode == "open" else max(levels)
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=max_streams + 8))
+    stages = []
+    with open(os.path.join(out_dir, "samples.jsonl"), "w") as samples:
+        async with discoveryengine_client.AsyncClient(max_connections=max_streams, quota_project=args.project_id,
+                                                      timeout=args.timeout) as client:
+            for level in levels:
+                stage = Stage(f"{args.mode}_{level:g}", args.mode, level)
+                stage.warmup_used = min(args.warmup, args.duration)
+                unit = "req/s (Poisson)" if args.mode == "open" else "closed-loop workers"
+                print(f"Stage {stage.name}: {level:g} {unit} for {args.duration:g}s "
+                      f"(first {args.warmup:g}s not measured)...", file=sys.stderr)
+                if args.mode == "open":
+                    await run_open_loop(client, args, stage, queries, samples)
+                else:
+                    await run_closed_loop(client, args, stage, queries, samples)
+                samples.flush()
+                print_stage(stage)
+                stages.append(stage)
+                if args.pause and level != levels[-1]:
+                    await asyncio.sleep(args.pause)
+    return stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test a Gemini Enterprise engine's streamAssist API with open- or closed-loop traffic.")
+    parser.add_argument("--project-id", default=os.getenv("PROJECT_ID"), help="Project ID (default: PROJECT_ID env var).")
+    parser.add_argument("--location", default="global", help="Engine location (default: global).")
+    parser.add_argument("--engine-id", default=os.getenv("ENGINE_ID"), help="Engine (app) ID (default: ENGINE_ID env var).")
+    parser.add_argument("--collection", default="default_collection", help="Collection ID (default: default_collection).")
+    parser.add_argument("--assistant-id", default="default_assistant", help="Assistant ID (default: default_assistant).")
+    parser.add_argument("--agent-id", help="Registered agent to invoke via agentsSpec (default: the assistant itself).")
+    parser.add_argument("--query", action="append", help="Query text; repeat for several (picked at random per request).")
+    parser.add_argument("--queries", help="File with one query per line (picked at random per request).")
+    parser.add_argument("--mode", choices=["open", "closed"], default="open", help="open: Poisson arrivals at --rates; closed: --concurrency back-to-back workers (default: open).")
+    parser.add_argument("--rates", default="5,50,200", help="Open-loop stages: comma-separated requests per second (default: 5,50,200).")
+    parser.add_argument("--concurrency", default="1,8,32", help="Closed-loop stages: comma-separated worker counts (default: 1,8,32).")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds per stage (default: 60).")
+    parser.add_argument("--warmup", type=float, default=5, help="Seconds at the start of each stage left out of the histograms (default: 5).")
+    parser.add_argument("--pause", type=float, default=5, help="Seconds between stages (default: 5).")
+    parser.add_argument("--max-in-flight", type=int, default=1000, help="Open-loop cap on concurrent requests; arrivals beyond it are counted as dropped (default: 1000).")
+    parser.add_argument("--timeout", type=float, default=120, help="Per-request timeout in seconds (default: 120).")
+    parser.add_argument("--seed", type=int, help="Random seed for arrivals and query choice.")
+    parser.add_argument("--out-dir", help="Output directory (default: loadtest_<mode>_<timestamp>).")
+    parser.add_argument("--stub", action="store_true", help="Dry run against a local streamassist_stub.py started for this run.")
+    parser.add_argument("--stub-args", default="", help="Extra streamassist_stub.py arguments, e.g. \"--ttft-ms 500 --error-rate 0.01\".")
+    args = parser.parse_args()
+
+    try:
+        levels = [float(x) if args.mode == "open" else int(x)
+                  for x in (args.rates if args.mode == "open" else args.concurrency).split(",") if x.strip()]
+    except ValueError:
+        parser.error("--rates must be numbers and --concurrency integers")
+    if not levels or min(levels) <= 0 or args.duration <= 0 or args.max_in_flight < 1:
+        parser.error("stage levels, --duration and --max-in-flight must be positive")
+    if args.stub:
+        args.project_id = args.project_id or "stub-project"
+        args.engine_id = args.engine_id or "stub-engine"
+    if not args.project_id or not args.engine_id:
+        parser.error("--project-id and --engine-id are required (or set PROJECT_ID / ENGINE_ID, or use --stub)")
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    queries = list(args.query or [])
+    if args.queries:
+        with open(args.queries, "r", encoding="utf-8") as f:
+            queries += [line.strip() for line in f if line.strip()]
+    queries = queries or ["What can you help me with?"]
+
+    stub = None
+    if args.stub:
+        stub, base_url = start_stub(args.stub_args.split())
+        os.environ[discoveryengine_client.ENDPOINT_OVERRIDE_ENV] = base_url
+        print(f"Dry run against local stub {base_url}", file=sys.stderr)
+
+    out_dir = args.out_dir or f"loadtest_{args.mode}_{time.strftime('%Y%m%d_%H%M%S')}"
+    os.makedirs(out_dir, exist_ok=True)
+    try:
+        stages = asyncio.run(run(args, queries, levels, out_dir))
+    except KeyboardInterrupt:
+        print("\nInterrupted.", file=sys.stderr)
+        sys.exit(130)
+    finally:
+        if stub:
+            stub.terminate()
+    write_report(out_dir, args, stages)
+    print(f"\nReport: {os.path.join(out_dir, 'report.json')}; raw samples: {os.path.join(out_dir, 'samples.jsonl')}; "
+          f"histograms: {os.path.join(out_dir, '*.hgrm')}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
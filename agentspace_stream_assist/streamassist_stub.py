@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the streamAssist REST endpoint, for dry runs of streamassist_load.py.
+Answers every POST .../assistants/<id>:streamAssist with a chunked JSON array shaped like
+the real API: a session chunk, a thought chunk, then answer text chunks separated by a
+configurable gap. The first answer text arrives after a configurable (jittered) delay,
+and a fraction of requests can be rejected with HTTP 429.
+
+Point clients at it with GE_API_ENDPOINT_OVERRIDE=http://127.0.0.1:<port>.
+"""
+
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Open-loop bursts open many connections at once; the default listen backlog is 5
+    request_queue_size = 1024
+
+
+def make_handler(ttft_ms, chunks, gap_ms, jitter, error_rate):
+    class StreamAssistHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def send_json(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def write_chunk(self, data):
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            self.wfile.flush()
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if not self.path.split("?")[0].endswith(":streamAssist"):
+                return self.send_json(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+            try:
+                request = json.loads(body or b"{}")
+                query = request["query"]["text"]
+            except (ValueError, KeyError, TypeError):
+                return self.send_json(400, {"error": {"code": 400, "message": "query.text is required", "status": "INVALID_ARGUMENT"}})
+            if random.random() < error_rate:
+                return self.send_json(429, {"error": {"code": 429, "message": "Quota exceeded", "status": "RESOURCE_EXHAUSTED"}})
+
+            assistant = self.path.split(":streamAssist")[0].split("/", 2)[-1]
+            session = request.get("session") or f"{assistant.split('/assistants/')[0]}/sessions/{uuid.uuid4().hex[:16]}"
+            elements = [{"sessionInfo": {"session": session}},
+                        {"answer": {"replies": [{"groundedContent": {"content": {"text": f"Looking into: {query}", "thought": True}}}]}}]
+            elements += [{"answer": {"state": "IN_PROGRESS", "replies": [{"groundedContent": {"content": {"text": f"Part {n} of the answer. "}}}]}}
+                         for n in range(chunks)]
+            elements.append({"answer": {"state": "SUCCEEDED"}, "sessionInfo": {"session": session}})
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            first_text = 2
+            for n, element in enumerate(elements):
+                if n == first_text:
+                    time.sleep(max(0.0, random.gauss(ttft_ms, ttft_ms * jitter)) / 1000.0)
+                elif n > first_text:
+                    time.sleep(max(0.0, random.gauss(gap_ms, gap_ms * jitter)) / 1000.0)
+                self.write_chunk((("[" if n == 0 else ",\r\n") + json.dumps(element)).encode())
+            self.write_chunk(b"]")
+            self.write_chunk(b"")
+
+    return StreamAssistHandler
+
+
+def start_server(host="127.0.0.1", port=0, ttft_ms=800.0, chunks=10, gap_ms=50.0, jitter=0.2, error_rate=0.0):
+    """Starts the stub in a background thread; returns the server (server.server_port holds the port)."""
+    server = StubServer((host, port), make_handler(ttft_ms, chunks, gap_ms, jitter, error_rate))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local streamAssist stub server for load-test dry runs.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to bind (default: 127.0.0.1).")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on (default: 8080).")
+    parser.add_argument("--ttft-ms", type=float, default=800.0, help="Mean delay before the first answer text (default: 800).")
+    parser.add_argument("--chunks", type=int, default=10, help="Answer text chunks per response (default: 10).")
+    parser.add_argument("--gap-ms", type=float, default=50.0, help="Mean gap between answer chunks (default: 50).")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Relative standard deviation of the delays (default: 0.2).")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests rejected with HTTP 429 (default: 0).")
+    args = parser.parse_args()
+
+    server = StubServer((args.host, args.port),
+                        make_handler(args.ttft_ms, args.chunks, args.gap_ms, args.jitter, args.error_rate))
+    print(f"streamAssist stub listening on http://{args.host}:{server.server_port}", file=sys.stderr, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -11,13 +11,14 @@ import argparse
 import concurrent.futures
 import json
 import os
-import subprocess
 import sys
 import time
 from typing import Any, Dict, List, Optional, Tuple
 import requests
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(SCRIPT_DIR, "..", "..", ".."))
+from ge_common import discoveryengine_client
 
 
 def load_config(config_path: str = "config.json") -> Dict[str, Any]:
@@ -37,16 +38,15 @@ def load_test_cases(test_cases_path: str) -> List[Dict[str, Any]]:
         return json.load(f)
 
 
-def get_access_token() -> str:
-    """Retrieves access token from environment or active gcloud session."""
-    env_token = os.environ.get("GCP_ACCESS_TOKEN")
-    if env_token:
-        return env_token.strip()
+def create_session(concurrency: int) -> requests.Session:
+    """Shared keep-alive session for all probes; token from GCP_ACCESS_TOKEN or Application Default Credentials."""
+    session = discoveryengine_client.Session(pool_size=concurrency)
     try:
-        return subprocess.check_output(["gcloud", "auth", "print-access-token"], text=True).strip()
+        session.credential_cache.token()
     except Exception as e:
-        print(f"❌ Failed to obtain access token via gcloud: {e}")
+        print(f"❌ Failed to obtain access token from Application Default Credentials: {e}")
         sys.exit(1)
+    return session
 
 
 def execute_probe(
@@ -54,7 +54,7 @@ def execute_probe(
     project_id: str,
     location: str,
     engine_id: str,
-    token: str,
+    session: requests.Session,
     data_store_ids: List[str],
     timeout: float = 45.0,
 ) -> Dict[str, Any]:
@@ -68,14 +68,13 @@ def execute_probe(
     max_ttlt = slo.get("max_ttlt_ms", 12000.0)
     assertions = tc.get("assertions", {})
 
-    url = (
-        f"https://{location}-discoveryengine.googleapis.com/v1alpha/projects/{project_id}/"
-        f"locations/{location}/collections/default_collection/engines/{engine_id}/"
-        f"assistants/default_assistant:streamAssist"
+    url = discoveryengine_client.api_url(
+        location,
+        f"projects/{project_id}/locations/{location}/collections/default_collection/engines/{engine_id}/"
+        f"assistants/default_assistant:streamAssist",
     )
 
     headers = {
-        "Authorization": f"Bearer {token}",
         "Content-Type": "application/json",
     }
 
@@ -103,7 +102,7 @@ def execute_probe(
     has_citations = False
 
     try:
-        res = requests.post(url, headers=headers, json=body, timeout=timeout)
+        res = session.post(url, headers=headers, json=body, timeout=timeout)
         status_code = res.status_code
 
         if res.status_code == 200:
@@ -198,13 +197,13 @@ def main():
     timeout = cfg.get("timeout_seconds", 45.0)
 
     test_cases = load_test_cases(args.test_cases)
-    token = get_access_token()
+    session = create_session(concurrency)
 
     print(f"\n================================================================================")
     print(f"🚀 GEMINI ENTERPRISE SYNTHETIC SMOKE TEST PROBER")
     print(f"================================================================================")
     print(f"🎯 Target Project : {project_id}")
-    print(f"📍 Location / Reg : {location} ({location}-discoveryengine.googleapis.com)")
+    print(f"📍 Location / Reg : {location} ({discoveryengine_client.api_base(location)})")
     print(f"⚙️ Target Engine  : {engine_id}")
     print(f"📦 Test Cases     : {len(test_cases)} probes across {len(set(tc.get('subsystem') for tc in test_cases))} subsystems")
     print(f"⚡ Concurrency    : {concurrency} parallel workers")
@@ -216,7 +215,7 @@ def main():
     with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as executor:
         future_to_tc = {
             executor.submit(
-                execute_probe, tc, project_id, location, engine_id, token, data_store_ids, timeout
+                execute_probe, tc, project_id, location, engine_id, session, data_store_ids, timeout
             ): tc
             for tc in test_cases
         }
@@ -0,0 +1,309 @@
+"""
+Shared Discovery Engine HTTP client for the scripts in this repository.
+One keep-alive connection pool per session, a thread- and asyncio-safe credential cache that
+refreshes the access token ahead of expiry, regional endpoint resolution, and two faces:
+a drop-in requests.Session for synchronous code and an AsyncClient for asyncio code
+(httpx with HTTP/2 when httpx and h2 are installed, otherwise threads over the pooled session).
+
+Scripts in sibling folders import it with:
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from ge_common import discoveryengine_client
+"""
+
+import asyncio
+import contextlib
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+import google.auth
+import requests
+from google.auth.credentials import AnonymousCredentials
+from google.auth.transport.requests import Request
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import h2  # noqa: F401 (lets httpx negotiate HTTP/2)
+    HTTP2_AVAILABLE = httpx is not None
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+SCOPES = ["https://www.googleapis.com/auth/cloud-platform"]
+# Sends every call to a local stand-in server with anonymous credentials (benchmarks, dry runs)
+ENDPOINT_OVERRIDE_ENV = "GE_API_ENDPOINT_OVERRIDE"
+# Pre-minted access token, e.g. from `gcloud auth print-access-token` in CI
+ACCESS_TOKEN_ENV = "GCP_ACCESS_TOKEN"
+# Refresh this long before the token expires so no request goes out with a nearly stale token
+REFRESH_MARGIN_SECONDS = 300
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+# Bills API quota to this project; google-auth sends it from the ADC quota_project_id
+QUOTA_PROJECT_HEADER = "X-Goog-User-Project"
+
+
+def endpoint_override():
+    """Returns the stand-in server base URL configured in the environment, or None."""
+    return os.getenv(ENDPOINT_OVERRIDE_ENV) or None
+
+
+def api_base(location="global"):
+    """Discovery Engine base URL of a location: the global host or the {location}- regional host."""
+    override = endpoint_override()
+    if override:
+        return override.rstrip("/")
+    if not location or location == "global":
+        return "https://discoveryengine.googleapis.com"
+    return f"https://{location}-discoveryengine.googleapis.com"
+
+
+def api_url(location, resource, version="v1alpha"):
+    """Full URL of a resource path (e.g. "projects/p/locations/us/collections/c/dataConnector")."""
+    return f"{api_base(location)}/{version}/{resource.lstrip('/')}"
+
+
+class CredentialCache:
+    """
+    Access tokens for any number of threads and event loops from one set of credentials.
+    The token is refreshed once (under a lock) when it is within `margin` seconds of expiry;
+    async callers refresh on a worker thread so the event loop never blocks on the token endpoint.
+    """
+
+    def __init__(self, credentials=None, static_token=None, margin=REFRESH_MARGIN_SECONDS, scopes=SCOPES):
+        self.credentials = credentials
+        self.static_token = static_token
+        self.margin = margin
+        self.scopes = scopes
+        self.lock = threading.Lock()
+        self.refreshes = 0
+        self._request = None
+
+    def _credentials(self):
+        if self.credentials is None:
+            if endpoint_override():
+                self.credentials = AnonymousCredentials()
+            else:
+                self.credentials, _ = google.auth.default(scopes=self.scopes)
+        return self.credentials
+
+    def _fresh(self):
+        credentials = self.credentials
+        if credentials is None or not credentials.token:
+            return False
+        if credentials.expiry is None:
+            return True
+        # google-auth keeps expiry as naive UTC
+        remaining = credentials.expiry - datetime.now(timezone.utc).replace(tzinfo=None)
+        return remaining.total_seconds() > self.margin
+
+    def token(self):
+        """Returns a valid access token (None for anonymous credentials)."""
+        if self.static_token:
+            return self.static_token
+        if isinstance(self.credentials, AnonymousCredentials):
+            return None
+        if self._fresh():
+            return self.credentials.token
+        with self.lock:
+            credentials = self._credentials()
+            if isinstance(credentials, AnonymousCredentials):
+                return None
+            if not self._fresh():
+                if self._request is None:
+                    self._request = Request()
+                credentials.refresh(self._request)
+                self.refreshes += 1
+            return credentials.token
+
+    async def atoken(self):
+        """Async token(): no thread hop while the cached token is fresh."""
+        if self.static_token:
+            return self.static_token
+        if self._fresh():
+            return self.credentials.token
+        return await asyncio.to_thread(self.token)
+
+    def invalidate(self):
+        """Forces a refresh on the next call (e.g. after an HTTP 401)."""
+        with self.lock:
+            if self.credentials is not None and not isinstance(self.credentials, AnonymousCredentials):
+                self.credentials.expiry = datetime(1970, 1, 1)
+
+    def _headers(self, token):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        # As credentials.apply() does: user ADC carry the quota project some APIs require
+        quota_project = getattr(self.credentials, "quota_project_id", None)
+        if quota_project:
+            headers[QUOTA_PROJECT_HEADER] = quota_project
+        return headers
+
+    def headers(self):
+        """Authorization and quota project headers for one request."""
+        return self._headers(self.token())
+
+    async def aheaders(self):
+        return self._headers(await self.atoken())
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def default_credential_cache():
+    """Process-wide cache over Application Default Credentials (or GCP_ACCESS_TOKEN when set)."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = CredentialCache(static_token=(os.getenv(ACCESS_TOKEN_ENV) or "").strip() or None)
+        return _default_cache
+
+
+class Session(requests.Session):
+    """
+    requests.Session with a keep-alive connection pool sized for `pool_size` concurrent callers
+    and a bearer token from a shared CredentialCache on every request (retried once on HTTP 401).
+    quota_project overrides the quota project of the credentials.
+    """
+
+    def __init__(self, credential_cache=None, pool_size=32, quota_project=None):
+        super().__init__()
+        self.credential_cache = credential_cache or default_credential_cache()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=max(10, pool_size), pool_maxsize=pool_size)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+        self.quota_project = quota_project
+
+    def _with_auth(self, headers):
+        auth = self.credential_cache.headers()
+        if self.quota_project:
+            auth[QUOTA_PROJECT_HEADER] = self.quota_project
+        return dict(headers or {}, **auth)
+
+    def request(self, method, url, headers=None, **kwargs):
+        response = super().request(method, url, headers=self._with_auth(headers), **kwargs)
+        if response.status_code == 401 and self.credential_cache.token():
+            self.credential_cache.invalidate()
+            response = super().request(method, url, headers=self._with_auth(headers), **kwargs)
+        return response
+
+
+def call(session, method, url, max_retries=5, timeout=60, max_delay=30, **kwargs):
+    """
+    Sends a request on a Session, retrying HTTP 429/5xx (honouring Retry-After) and connection
+    errors with jittered exponential backoff; returns the last response.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            response = session.request(method, url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == max_retries:
+                raise
+            time.sleep(random.uniform(0, min(max_delay, 2 ** attempt)))
+            continue
+        if response.status_code not in RETRYABLE_STATUS_CODES or attempt == max_retries:
+            return response
+        retry_after = response.headers.get("Retry-After")
+        time.sleep(float(retry_after) if retry_after and retry_after.isdigit()
+                   else random.uniform(0, min(max_delay, 2 ** attempt)))
+    return response
+
+
+class _ThreadedStream:
+    """Streaming response of the AsyncClient fallback: a requests response read on worker threads."""
+
+    def __init__(self, response, chunk_size):
+        self.response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.chunk_size = chunk_size
+
+    async def aiter_bytes(self):
+        # One worker thread reads the whole body and hands chunks to the loop, instead of a thread hop per chunk
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+
+        def read():
+            try:
+                for chunk in self.response.iter_content(chunk_size=self.chunk_size):
+                    loop.call_soon_threadsafe(queue.put_nowait, chunk)
+                loop.call_soon_threadsafe(queue.put_nowait, None)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+
+        reader = loop.run_in_executor(None, read)
+        while True:
+            chunk = await queue.get()
+            if chunk is None:
+                break
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+        await reader
+
+    async def aread(self):
+        return b"".join([chunk async for chunk in self.aiter_bytes()])
+
+
+class AsyncClient:
+    """
+    Async face of the client. With httpx installed it uses one httpx.AsyncClient (HTTP/2 when h2
+    is installed); otherwise requests run on worker threads over a pooled Session. Responses
+    expose status_code, headers, text and json() either way.
+    """
+
+    def __init__(self, credential_cache=None, max_connections=100, quota_project=None, timeout=60.0):
+        self.credential_cache = credential_cache or default_credential_cache()
+        self.timeout = timeout
+        self.headers = {QUOTA_PROJECT_HEADER: quota_project} if quota_project else {}
+        if httpx is not None:
+            self.client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE, timeout=timeout,
+                limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections))
+            self.session = None
+        else:
+            self.client = None
+            self.session = Session(self.credential_cache, pool_size=max_connections, quota_project=quota_project)
+
+    async def _headers(self, headers):
+        return {**(headers or {}), **await self.credential_cache.aheaders(), **self.headers}
+
+    async def request(self, method, url, headers=None, **kwargs):
+        if self.client is None:
+            kwargs.setdefault("timeout", self.timeout)
+            return await asyncio.to_thread(self.session.request, method, url, headers=headers, **kwargs)
+        return await self.client.request(method, url, headers=await self._headers(headers), **kwargs)
+
+    async def get(self, url, **kwargs):
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.request("POST", url, **kwargs)
+
+    @contextlib.asynccontextmanager
+    async def stream(self, method, url, headers=None, chunk_size=8192, **kwargs):
+        """Async context manager yielding a response with status_code and aiter_bytes()."""
+        if self.client is not None:
+            async with self.client.stream(method, url, headers=await self._headers(headers), **kwargs) as response:
+                yield response
+            return
+        kwargs.setdefault("timeout", self.timeout)
+        response = await asyncio.to_thread(self.session.request, method, url, headers=headers, stream=True, **kwargs)
+        try:
+            yield _ThreadedStream(response, chunk_size)
+        finally:
+            response.close()
+
+    async def aclose(self):
+        if self.client is not None:
+            await self.client.aclose()
+        else:
+            self.session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
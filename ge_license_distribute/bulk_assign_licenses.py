@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Bulk license assignment engine: the Python counterpart of assign_user_license.sh for large rosters.
+Reads users from a file or stdin, splits them into batchUpdateUserLicenses chunks and runs the
+chunks concurrently over one authorized, pooled session. Completed chunks are checkpointed so an
+interrupted run resumes where it stopped; --dry-run diffs the roster against list_user_licenses.sh output.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import license_api
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_checkpoint(path):
+    """Returns the lowercased users of every chunk recorded as completed in the checkpoint file."""
+    done = set()
+    if os.path.isfile(path):
+        with open(path, "r") as f:
+            for line in f:
+                if line.strip():
+                    done.update(user.lower() for user in json.loads(line)["users"])
+    return done
+
+
+def diff_against_current(users, current_licenses, license_config_id):
+    """Splits users into (new, moved {user: other config}, already assigned) against a license listing."""
+    current = license_api.index_licenses(current_licenses)
+    new, moved, assigned = [], {}, []
+    for user in users:
+        entry = current.get(user.lower())
+        if entry is None:
+            new.append(user)
+        elif entry["licenseConfig"].split("/")[-1] == license_config_id:
+            assigned.append(user)
+        else:
+            moved[user] = entry["licenseConfig"]
+    return new, moved, assigned
+
+
+def print_diff(new, moved, assigned):
+    for user in new:
+        print(f"+ {user}")
+    for user, config in moved.items():
+        print(f"~ {user} (from {config})")
+    print(f"\nDry run: {len(new)} to assign, {len(moved)} to move from another license config, "
+          f"{len(assigned)} already assigned.", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Assign a Gemini Enterprise license to many users in concurrent batches.")
+    parser.add_argument("license_config_id", help="License config or subscription ID to assign.")
+    parser.add_argument("--users", required=True, help="File with one user email per line (or CSV with emails in the first column); '-' reads stdin.")
+    parser.add_argument("--env", default=os.path.join(DIR, "env.sh"), help="Configuration file (default: env.sh next to this script).")
+    parser.add_argument("--project-id", help="Target project ID (default: TARGET_PROJECT_ID from env.sh).")
+    parser.add_argument("--project-number", help="Target project number (default: TARGET_PROJECT_NUMBER from env.sh).")
+    parser.add_argument("--location", help="License config location (default: LOCATION from env.sh, else global).")
+    parser.add_argument("--chunk-size", type=int, default=license_api.MAX_BATCH_SIZE, help=f"Users per batchUpdateUserLicenses call (default: {license_api.MAX_BATCH_SIZE}).")
+    parser.add_argument("--workers", type=int, default=4, help="Chunks in flight at once (default: 4).")
+    parser.add_argument("--checkpoint", help="Checkpoint file of completed chunks (default: assign_<license_config_id>.checkpoint.jsonl).")
+    parser.add_argument("--restart", action="store_true", help="Ignore and overwrite an existing checkpoint instead of resuming.")
+    parser.add_argument("--current", help="Saved list_user_licenses.sh output; users already holding this license are skipped.")
+    parser.add_argument("--dry-run", action="store_true", help="Print the users that would be assigned (+) or moved from another config (~) and exit.")
+    args = parser.parse_args()
+    if args.chunk_size < 1 or args.chunk_size > license_api.MAX_BATCH_SIZE or args.workers < 1:
+        parser.error(f"--chunk-size must be between 1 and {license_api.MAX_BATCH_SIZE} and --workers at least 1")
+
+    license_api.load_env_file(args.env)
+    project_id = license_api.require_setting(args.project_id or os.getenv("TARGET_PROJECT_ID"), "TARGET_PROJECT_ID")
+    project_number = license_api.require_setting(args.project_number or os.getenv("TARGET_PROJECT_NUMBER"), "TARGET_PROJECT_NUMBER")
+    location = args.location or os.getenv("LOCATION") or "global"
+    endpoint_location = os.getenv("ENDPOINT_LOCATION") or "global"
+    config_path = license_api.license_config_path(project_number, location, args.license_config_id)
+
+    users = license_api.read_users(args.users)
+    if not users:
+        print("Error: No user emails found in the input.", file=sys.stderr)
+        sys.exit(1)
+
+    checkpoint = args.checkpoint or f"assign_{args.license_config_id}.checkpoint.jsonl"
+    if args.restart and os.path.exists(checkpoint) and not args.dry_run:
+        os.remove(checkpoint)
+    done = set() if args.restart else load_checkpoint(checkpoint)
+    pending = [user for user in users if user.lower() not in done]
+    if done:
+        print(f"Resuming from {checkpoint}: {len(users) - len(pending)} of {len(users)} user(s) already done.", file=sys.stderr)
+
+    if args.current:
+        with open(args.current, "r", encoding="utf-8") as f:
+            current = license_api.parse_license_listing(f.read())
+        new, moved, assigned = diff_against_current(pending, current, args.license_config_id)
+        if args.dry_run:
+            print_diff(new, moved, assigned)
+            return
+        pending = new + list(moved)
+    elif args.dry_run:
+        for user in pending:
+            print(f"+ {user}")
+        print(f"\nDry run: {len(pending)} to assign (pass --current to skip users already holding the license).", file=sys.stderr)
+        return
+
+    chunks = [pending[i:i + args.chunk_size] for i in range(0, len(pending), args.chunk_size)]
+    if not chunks:
+        print("Nothing to assign.", file=sys.stderr)
+        return
+    print(f"Assigning license ({args.license_config_id}) to {len(pending)} user(s) in project {project_id} "
+          f"in {len(chunks)} chunk(s), {args.workers} at a time...", file=sys.stderr)
+
+    session = license_api.create_session(project_id, pool_size=args.workers)
+    store_url = license_api.user_store_url(endpoint_location, project_id, location)
+    start = time.perf_counter()
+
+    def checkpoint_chunk(batch, operation_name):
+        # Only clean chunks are checkpointed; reassigning a license is idempotent, so a resume retries the rest
+        with open(checkpoint, "a") as f:
+            f.write(json.dumps({"operation": operation_name, "users": [entry["userPrincipal"] for entry in batch]}) + "\n")
+
+    batches = [[{"userPrincipal": user, "licenseConfig": config_path} for user in chunk] for chunk in chunks]
+    failed = license_api.run_batches(session, store_url, endpoint_location, batches, workers=args.workers, on_done=checkpoint_chunk)
+
+    print(f"\nAssigned {len(chunks) - failed} of {len(chunks)} chunk(s) in {time.perf_counter() - start:.1f}s.", file=sys.stderr)
+    if failed:
+        print(f"{failed} chunk(s) did not complete cleanly; rerun the same command to retry them.", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Shared helpers for the Python license tools.
+Reads the same env.sh as the shell scripts, opens one authorized, pooled session and wraps the
+Discovery Engine user license calls (batchUpdateUserLicenses, operations, userLicenses listing).
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ge_common import discoveryengine_client
+from ge_common.discoveryengine_client import call
+
+# Entries per batchUpdateUserLicenses request
+MAX_BATCH_SIZE = 1000
+LIST_PAGE_SIZE = 1000
+# Partial response of the userLicenses listing: only the keys the tools compare
+LICENSE_FIELDS = "nextPageToken,userLicenses(userPrincipal,licenseConfig,licenseAssignmentState)"
+
+
+def load_env_file(filepath):
+    """Loads the `export KEY="VALUE"` lines of env.sh into the environment, like `source env.sh`."""
+    if not os.path.isfile(filepath):
+        print(f"Error: {filepath} not found.", file=sys.stderr)
+        print("Please copy env.sh.template to env.sh and configure your variables.", file=sys.stderr)
+        sys.exit(1)
+    with open(filepath, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("export "):
+                line = line[len("export "):]
+            if line and not line.startswith("#") and "=" in line:
+                key, value = line.split("=", 1)
+                os.environ[key.strip()] = value.strip().strip('"').strip("'")
+
+
+def require_setting(value, name):
+    """Exits with the shell scripts' error if a setting is missing or still a template placeholder."""
+    if not value or value.startswith("YOUR_"):
+        print(f"Error: {name} is not configured in env.sh or passed as an argument.", file=sys.stderr)
+        sys.exit(1)
+    return value
+
+
+def api_base(endpoint_location):
+    """Base URL of the Discovery Engine API for the ENDPOINT_LOCATION prefix."""
+    # GE_API_ENDPOINT_OVERRIDE points every call at a local stand-in server (same variable as ge_list_agents)
+    override = discoveryengine_client.endpoint_override()
+    return (override or f"https://{endpoint_location}-discoveryengine.googleapis.com").rstrip("/")
+
+
+def user_store_url(endpoint_location, project_id, location):
+    return f"{api_base(endpoint_location)}/v1/projects/{project_id}/locations/{location}/userStores/default_user_store"
+
+
+def license_config_path(project_number, location, license_config_id):
+    return f"projects/{project_number}/locations/{location}/licenseConfigs/{license_config_id}"
+
+
+def create_session(quota_project, pool_size=10):
+    """One shared-client session: process-wide token cache and a connection pool per worker."""
+    session = discoveryengine_client.Session(pool_size=pool_size, quota_project=quota_project)
+    session.headers["Content-Type"] = "application/json"
+    return session
+
+
+def batch_update_user_licenses(session, store_url, user_licenses, delete_unassigned=False):
+    """Starts one batchUpdateUserLicenses call; returns its long-running operation."""
+    payload = {
+        "inlineSource": {
+            "userLicenses": user_licenses,
+            "updateMask": {"paths": ["userPrincipal", "licenseConfig"]},
+        },
+        "deleteUnassignedUserLicenses": delete_unassigned,
+    }
+    response = call(session, "POST", f"{store_url}:batchUpdateUserLicenses", json=payload)
+    if response.status_code != 200:
+        raise RuntimeError(f"HTTP {response.status_code}: {response.text[:500]}")
+    return response.json()
+
+
+def wait_for_operation(session, endpoint_location, operation, poll_interval=1.0, max_interval=10.0, timeout=900):
+    """Polls a long-running operation until done; returns its response or raises on error/timeout."""
+    deadline = time.monotonic() + timeout
+    while not operation.get("done"):
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"Operation {operation.get('name')} still running after {timeout}s")
+        time.sleep(poll_interval)
+        poll_interval = min(max_interval, poll_interval * 2)
+        response = call(session, "GET", f"{api_base(endpoint_location)}/v1/{operation['name']}")
+        if response.status_code != 200:
+            raise RuntimeError(f"Polling {operation['name']}: HTTP {response.status_code}: {response.text[:500]}")
+        operation = response.json()
+    if "error" in operation:
+        raise RuntimeError(f"Operation failed: {operation['error'].get('message', operation['error'])}")
+    return operation.get("response", {})
+
+
+def run_batches(session, store_url, endpoint_location, batches, workers=4, delete_unassigned=False, on_done=None):
+    """
+    Sends each batch of userLicenses entries as one batchUpdateUserLicenses call, `workers` at a
+    time, and waits for its operation. on_done(batch, operation_name) runs (serialized) for every
+    batch that finished without errors. Returns the number of batches that failed or reported errors.
+    """
+    lock = threading.Lock()
+
+    def run(batch):
+        operation = batch_update_user_licenses(session, store_url, batch, delete_unassigned=delete_unassigned)
+        errors = wait_for_operation(session, endpoint_location, operation).get("errorSamples", [])
+        if not errors and on_done:
+            with lock:
+                on_done(batch, operation.get("name"))
+        return errors
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run, batch): n for n, batch in enumerate(batches, 1)}
+        for finished, future in enumerate(as_completed(futures), 1):
+            n = futures[future]
+            try:
+                errors = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"Batch {n}/{len(batches)} failed: {e}", file=sys.stderr)
+                continue
+            if errors:
+                failed += 1
+                print(f"Batch {n}/{len(batches)} finished with {len(errors)} error(s), e.g. {errors[0].get('message', errors[0])}", file=sys.stderr)
+            else:
+                print(f"Batch {n}/{len(batches)} done ({finished}/{len(batches)} finished)", file=sys.stderr)
+    return failed
+
+
+def list_user_licenses(session, store_url, page_size=LIST_PAGE_SIZE):
+    """Pages every userLicenses entry of the user store; returns (licenses, pages)."""
+    licenses, pages, token = [], 0, ""
+    while True:
+        params = {"pageSize": page_size, "fields": LICENSE_FIELDS}
+        if token:
+            params["pageToken"] = token
+        response = call(session, "GET", f"{store_url}/userLicenses", params=params)
+        if response.status_code != 200:
+            print(f"Error: listing user licenses failed after {len(licenses)} entries (HTTP {response.status_code}): {response.text[:500]}", file=sys.stderr)
+            sys.exit(1)
+        data = response.json()
+        pages += 1
+        licenses.extend(data.get("userLicenses", []))
+        token = data.get("nextPageToken")
+        if not token:
+            return licenses, pages
+
+
+def index_licenses(licenses):
+    """Hash index of assigned licenses: {lowercased userPrincipal: userLicenses entry}."""
+    index = {}
+    for entry in licenses:
+        principal = entry.get("userPrincipal", "").lower()
+        if principal and entry.get("licenseAssignmentState", "ASSIGNED") == "ASSIGNED" and entry.get("licenseConfig"):
+            index[principal] = entry
+    return index
+
+
+def read_users(path):
+    """
+    Reads user emails from a file or "-" (stdin): one per line, blank lines and # comments
+    skipped, first column of CSV rows. Duplicates are dropped case-insensitively, order is kept.
+    """
+    stream = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    users, seen = [], set()
+    try:
+        for line in stream:
+            user = line.split(",", 1)[0].strip().strip('"')
+            if not user or user.startswith("#") or "@" not in user:
+                continue
+            if user.lower() not in seen:
+                seen.add(user.lower())
+                users.append(user)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    return users
+
+
+def parse_license_listing(text):
+    """
+    Returns the userLicenses of saved list_user_licenses.sh output: the echoed status line
+    followed by one or more JSON pages.
+    """
+    decoder = json.JSONDecoder()
+    licenses = []
+    position = text.find("{")
+    while position != -1:
+        page, end = decoder.raw_decode(text, position)
+        licenses.extend(page.get("userLicenses", []))
+        position = text.find("{", end)
+    return licenses
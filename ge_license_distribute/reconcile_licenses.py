@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+License reconciliation: makes the holders of one license config match a desired-state user list.
+Pages every userLicenses entry once into an in-memory hash index, joins it against the desired
+users (e.g. resolve_entra_users.py output or an HR roster) and applies only the minimal add and
+remove sets, packed into as few batchUpdateUserLicenses calls as possible.
+"""
+
+import argparse
+import os
+import sys
+import time
+import license_api
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def plan(desired, index, license_config_id):
+    """
+    Joins desired users against the license index. Returns (add, move {user: other config},
+    remove, unchanged count): desired users without this license are added (or moved from
+    another config); holders of this license that are not desired are removed.
+    """
+    desired_keys = set()
+    add, move, unchanged = [], {}, 0
+    for user in desired:
+        key = user.lower()
+        desired_keys.add(key)
+        entry = index.get(key)
+        if entry is None:
+            add.append(user)
+        elif entry["licenseConfig"].split("/")[-1] == license_config_id:
+            unchanged += 1
+        else:
+            move[user] = entry["licenseConfig"]
+    remove = sorted(entry["userPrincipal"] for key, entry in index.items()
+                    if entry["licenseConfig"].split("/")[-1] == license_config_id and key not in desired_keys)
+    return add, move, remove, unchanged
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcile the users holding a Gemini Enterprise license config with a desired-state list.")
+    parser.add_argument("license_config_id", help="License config ID whose holders are reconciled.")
+    parser.add_argument("--desired", required=True, help="Desired holders: one email per line (or CSV with emails in the first column); '-' reads stdin.")
+    parser.add_argument("--env", default=os.path.join(DIR, "env.sh"), help="Configuration file (default: env.sh next to this script).")
+    parser.add_argument("--project-id", help="Target project ID (default: TARGET_PROJECT_ID from env.sh).")
+    parser.add_argument("--project-number", help="Target project number (default: TARGET_PROJECT_NUMBER from env.sh).")
+    parser.add_argument("--location", help="License config location (default: LOCATION from env.sh, else global).")
+    parser.add_argument("--current", help="Use saved list_user_licenses.sh output instead of listing the user store.")
+    parser.add_argument("--no-remove", action="store_true", help="Only add missing holders; never unassign anyone.")
+    parser.add_argument("--max-removals", type=int, default=500, help="Refuse to run if more holders than this would be unassigned (default: 500).")
+    parser.add_argument("--max-removal-share", type=float, default=0.5, help="Refuse to run if more than this share of the current holders would be unassigned (default: 0.5).")
+    parser.add_argument("--allow-empty", action="store_true", help="Accept an empty desired list, i.e. unassign every holder of the license config.")
+    parser.add_argument("--batch-size", type=int, default=license_api.MAX_BATCH_SIZE, help=f"Entries per batchUpdateUserLicenses call (default: {license_api.MAX_BATCH_SIZE}).")
+    parser.add_argument("--workers", type=int, default=4, help="Batch calls in flight at once (default: 4).")
+    parser.add_argument("--dry-run", action="store_true", help="Print the additions (+), moves (~) and removals (-) and exit.")
+    args = parser.parse_args()
+    if args.batch_size < 1 or args.batch_size > license_api.MAX_BATCH_SIZE or args.workers < 1:
+        parser.error(f"--batch-size must be between 1 and {license_api.MAX_BATCH_SIZE} and --workers at least 1")
+    if not 0 < args.max_removal_share <= 1:
+        parser.error("--max-removal-share must be greater than 0 and at most 1")
+
+    license_api.load_env_file(args.env)
+    project_id = license_api.require_setting(args.project_id or os.getenv("TARGET_PROJECT_ID"), "TARGET_PROJECT_ID")
+    project_number = license_api.require_setting(args.project_number or os.getenv("TARGET_PROJECT_NUMBER"), "TARGET_PROJECT_NUMBER")
+    location = args.location or os.getenv("LOCATION") or "global"
+    endpoint_location = os.getenv("ENDPOINT_LOCATION") or "global"
+    config_path = license_api.license_config_path(project_number, location, args.license_config_id)
+
+    desired = license_api.read_users(args.desired)
+    if not desired and not args.allow_empty:
+        # An empty export or pipe would otherwise plan to unassign every current holder
+        print(f"Error: no users read from {'stdin' if args.desired == '-' else args.desired}. "
+              "Pass --allow-empty to unassign every holder of the license config.", file=sys.stderr)
+        sys.exit(1)
+    session = license_api.create_session(project_id, pool_size=args.workers)
+    store_url = license_api.user_store_url(endpoint_location, project_id, location)
+
+    start = time.perf_counter()
+    if args.current:
+        with open(args.current, "r", encoding="utf-8") as f:
+            licenses, pages = license_api.parse_license_listing(f.read()), 0
+    else:
+        print(f"Listing user licenses for project {project_id} in location {location}...", file=sys.stderr)
+        licenses, pages = license_api.list_user_licenses(session, store_url)
+    listed = time.perf_counter()
+    index = license_api.index_licenses(licenses)
+    add, move, remove, unchanged = plan(desired, index, args.license_config_id)
+    if args.no_remove:
+        remove = []
+    planned = time.perf_counter()
+
+    entries = ([{"userPrincipal": user, "licenseConfig": config_path} for user in add + list(move)] +
+               [{"userPrincipal": user} for user in remove])
+    batches = [entries[i:i + args.batch_size] for i in range(0, len(entries), args.batch_size)]
+    print(f"Indexed {len(index)} assigned license(s) from {len(licenses)} entries "
+          f"({pages} page(s), {listed - start:.1f}s); plan computed in {(planned - listed) * 1000:.0f} ms.", file=sys.stderr)
+    print(f"{len(desired)} desired holder(s): {len(add)} to add, {len(move)} to move from another config, "
+          f"{len(remove)} to remove, {unchanged} unchanged -> {len(batches)} batch call(s).", file=sys.stderr)
+
+    if args.dry_run:
+        for user in add:
+            print(f"+ {user}")
+        for user, config in move.items():
+            print(f"~ {user} (from {config})")
+        for user in remove:
+            print(f"- {user}")
+        return
+    if len(remove) > args.max_removals:
+        print(f"Error: {len(remove)} removals exceed --max-removals {args.max_removals}. "
+              "Check the desired-state file with --dry-run, then raise the limit.", file=sys.stderr)
+        sys.exit(1)
+    holders = len(remove) + unchanged
+    if remove and desired and len(remove) > args.max_removal_share * holders:
+        print(f"Error: {len(remove)} of {holders} current holder(s) would be removed, more than "
+              f"--max-removal-share {args.max_removal_share:g}. Check the desired-state file with --dry-run, "
+              "then raise the share.", file=sys.stderr)
+        sys.exit(1)
+    if not batches:
+        print("Already reconciled.", file=sys.stderr)
+        return
+
+    # Additions and removals share batches: removed entries carry no licenseConfig, and
+    # deleteUnassignedUserLicenses only deletes the entries this leaves unassigned
+    failed = license_api.run_batches(session, store_url, endpoint_location, batches, workers=args.workers,
+                                     delete_unassigned=bool(remove))
+    print(f"\nApplied {len(batches) - failed} of {len(batches)} batch call(s) in {time.perf_counter() - planned:.1f}s.", file=sys.stderr)
+    if failed:
+        print(f"{failed} batch call(s) did not complete cleanly; rerun the same command to reconcile the rest.", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
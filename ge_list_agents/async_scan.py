@@ -0,0 +1,64 @@
+"""
+Concurrent scan engine shared by the Gemini Enterprise agent listers.
+Fans out engine and agent listing across locations and engines with asyncio, using a
+bounded worker pool that shares one keep-alive connection pool on the authorized session.
+"""
+
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+
+
+def configure_connection_pool(session, concurrency):
+    """Mounts a keep-alive HTTPS connection pool sized for the number of concurrent workers."""
+    pool_size = max(10, concurrency)
+    current = session.get_adapter("https://")
+    if getattr(current, "_pool_maxsize", 0) >= pool_size:
+        # Keep an existing, large enough pool (e.g. shared by several concurrent project scans)
+        return session
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    return session
+
+
+async def _scan_location(session, project_id, location, list_engines, list_agents, run):
+    """Lists the engines of one location and starts listing the agents of every engine concurrently."""
+    print(f"Scanning location: {location} ...", file=sys.stderr)
+    engines = await run(list_engines, session, project_id, location)
+    engine_ids = [engine.get("name", "").split("/")[-1] for engine in engines]
+    return [(engine_id, asyncio.ensure_future(run(list_agents, session, project_id, location, engine_id)))
+            for engine_id in engine_ids]
+
+
+async def _cancel(tasks):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def scan_listings(session, project_id, locations, list_engines, list_agents, concurrency):
+    """
+    Scans all locations concurrently and yields (location, engine_id, agents) tuples in the same
+    location -> engine order as a sequential scan, each as soon as it and every listing before
+    it are complete, so callers can write rows while later engines are still being listed.
+    """
+    configure_connection_pool(session, concurrency)
+    loop = asyncio.new_event_loop()
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="scan")
+
+    async def run(func, *args):
+        return await loop.run_in_executor(executor, func, *args)
+
+    try:
+        location_tasks = [loop.create_task(_scan_location(session, project_id, loc, list_engines, list_agents, run))
+                          for loc in locations]
+        for location, location_task in zip(locations, location_tasks):
+            # The loop only advances while the caller waits here; submitted listings keep running on the workers
+            for engine_id, agents_task in loop.run_until_complete(location_task):
+                yield location, engine_id, loop.run_until_complete(agents_task)
+    finally:
+        # Also reached when the caller stops early or a listing raised: drop the listings still pending
+        loop.run_until_complete(_cancel(asyncio.all_tasks(loop)))
+        executor.shutdown(wait=True, cancel_futures=True)
+        loop.close()
@@ -0,0 +1,345 @@
+"""
+Sharded Cloud Audit Log lookups of agent creators, shared by the agent listers.
+Unresolved agent IDs are split into bounded batches and their createTime values are
+clustered into time windows; the resulting shards page through entries:list concurrently
+under the shared request layer's quota-aware rate limit and merge into one agent_id -> creator map.
+"""
+
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+LOGGING_URL = "https://logging.googleapis.com/v2/entries:list"
+
+# Creation log entries are written when the agent is created; pad windows to absorb clock skew
+TIMESTAMP_BUFFER = timedelta(hours=1)
+
+# Consecutive createTime values further apart than this start a new time window
+DEFAULT_WINDOW_GAP = timedelta(days=1)
+
+
+def parse_timestamp(ts):
+    """Parses an ISO 8601 timestamp (e.g. 2026-08-01T12:34:56.789Z) into a naive UTC datetime."""
+    main_part = ts.rstrip("Z").split(".")[0]
+    return datetime.strptime(main_part, "%Y-%m-%dT%H:%M:%S")
+
+
+def parse_timestamp_ceil(ts):
+    """Like parse_timestamp, but rounds a timestamp with fractional seconds up to the next whole second."""
+    fraction = ts.rstrip("Z").partition(".")[2]
+    return parse_timestamp(ts) + (timedelta(seconds=1) if fraction.strip("0") else timedelta())
+
+
+def format_timestamp(dt):
+    """Formats a naive UTC datetime for use in a Cloud Logging filter."""
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def principal_email(auth_info):
+    """Extracts the creator email from authenticationInfo (standard Google identities)."""
+    return auth_info.get("principalEmail")
+
+
+CREATE_AGENT_FILTER = (
+    'protoPayload.serviceName="discoveryengine.googleapis.com" AND '
+    'protoPayload.methodName:"AgentService.CreateAgent"'
+)
+
+
+def _id_clause(agent_ids):
+    id_filter_str = " OR ".join(f'"{aid}"' for aid in agent_ids)
+    return f'(protoPayload.response.name:({id_filter_str}) OR protoPayload.resourceName:({id_filter_str}))'
+
+
+def _time_clause(start=None, end=None):
+    clause = ""
+    if start:
+        clause += f' AND timestamp >= "{format_timestamp(start)}"'
+    if end:
+        clause += f' AND timestamp <= "{format_timestamp(end)}"'
+    return clause
+
+
+def build_log_filter(agent_ids, start=None, end=None):
+    """Builds a CreateAgent filter restricted to the given agent IDs and optional time window."""
+    return f"{CREATE_AGENT_FILTER} AND {_id_clause(agent_ids)}{_time_clause(start, end)}"
+
+
+def merge_windows(agent_create_times, buffer=TIMESTAMP_BUFFER):
+    """
+    Groups agent IDs into (agent_ids, start, end) windows of createTime +/- buffer, merging
+    windows that overlap. Agents without a parseable createTime share one unbounded window.
+    """
+    timed, untimed = [], []
+    for agent_id, create_time in agent_create_times.items():
+        try:
+            timed.append((parse_timestamp(create_time), agent_id))
+        except (AttributeError, TypeError, ValueError):
+            untimed.append(agent_id)
+    timed.sort()
+
+    windows = []
+    for created, agent_id in timed:
+        start, end = created - buffer, created + buffer
+        if windows and start <= windows[-1][2]:
+            windows[-1][0].append(agent_id)
+            windows[-1][2] = end
+        else:
+            windows.append([[agent_id], start, end])
+    if untimed:
+        windows.append([untimed, None, None])
+    return [tuple(window) for window in windows]
+
+
+def build_windowed_filter(agent_create_times, upper=None, buffer=TIMESTAMP_BUFFER):
+    """
+    Builds a CreateAgent filter matching each agent only within its own createTime +/- buffer
+    window, capped at upper (entries newer than upper have already been scanned).
+    Returns (log_filter, skipped_ids); skipped agents' windows lie entirely above upper.
+    """
+    clauses = []
+    skipped = []
+    for agent_ids, start, end in merge_windows(agent_create_times, buffer):
+        if upper and start and start > upper:
+            skipped.extend(agent_ids)
+            continue
+        if upper:
+            end = min(end, upper) if end else upper
+        clauses.append(f"({_id_clause(agent_ids)}{_time_clause(start, end)})")
+    if not clauses:
+        return None, skipped
+    return f"{CREATE_AGENT_FILTER} AND ({' OR '.join(clauses)})", skipped
+
+
+class LogScanStats:
+    """Thread-safe counters describing how much audit log paging a resolver performed and avoided."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pages = 0
+        self.bytes = 0
+        self.early_exits = 0
+        self.narrowed_queries = 0
+
+    def record_page(self, num_bytes):
+        with self.lock:
+            self.pages += 1
+            self.bytes += num_bytes
+
+    def record_early_exit(self):
+        with self.lock:
+            self.early_exits += 1
+
+    def record_narrowed_query(self):
+        with self.lock:
+            self.narrowed_queries += 1
+
+    def report(self, file=sys.stderr):
+        """Prints pages and bytes fetched and a lower bound of the pages and bytes saved."""
+        avg_page_bytes = self.bytes / self.pages if self.pages else 0
+        print(
+            f"Audit log paging: {self.pages} page(s), {self.bytes / 1e6:.2f} MB fetched; "
+            f"{self.narrowed_queries} narrowed re-query(ies); stopped early {self.early_exits} time(s), "
+            f"saving at least {self.early_exits} page(s) (~{self.early_exits * avg_page_bytes / 1e6:.2f} MB).",
+            file=file,
+        )
+
+
+def collect_creators(entries, extract_creator, creators):
+    """Records the creator of every CreateAgent entry not seen yet; returns the newly resolved agent IDs."""
+    resolved = []
+    for entry in entries:
+        proto_payload = entry.get("protoPayload", {})
+        response_obj = proto_payload.get("response", {})
+        agent_name = response_obj.get("name") if response_obj else None
+        if not agent_name:
+            agent_name = proto_payload.get("resourceName", "")
+        auth_info = proto_payload.get("authenticationInfo", {})
+        creator = extract_creator(auth_info)
+        if agent_name and creator:
+            # Match by agent ID (last part of resource name path)
+            agent_id = agent_name.split("/")[-1]
+            if agent_id and agent_id != "default_assistant" and agent_id not in creators:
+                creators[agent_id] = creator
+                resolved.append(agent_id)
+    return resolved
+
+
+def page_creators(session, project_id, log_filter, extract_creator, timeout=30):
+    """Pages through every entry matching the filter and returns the agent_id -> creator map."""
+    creators = {}
+    next_page_token = ""
+    while True:
+        payload = {
+            "resourceNames": [f"projects/{project_id}"],
+            "filter": log_filter,
+            "pageSize": 1000,
+            "orderBy": "timestamp desc"  # Scan newest logs first
+        }
+        if next_page_token:
+            payload["pageToken"] = next_page_token
+        try:
+            response = session.post(LOGGING_URL, json=payload, timeout=timeout)
+            if response.status_code != 200:
+                print(f"Error fetching logs (HTTP {response.status_code}): {response.text}", file=sys.stderr)
+                break
+            data = response.json()
+            collect_creators(data.get("entries", []), extract_creator, creators)
+            next_page_token = data.get("nextPageToken")
+            if not next_page_token:
+                break
+        except Exception as e:
+            print(f"Exception while fetching logs: {e}", file=sys.stderr)
+            break
+    return creators
+
+
+def page_creators_early_exit(session, project_id, agent_create_times, extract_creator,
+                             timeout=30, stats=None, buffer=TIMESTAMP_BUFFER):
+    """
+    Pages through CreateAgent entries only until every requested agent ID has a creator.
+    Whenever a page resolves IDs, the query restarts with a smaller filter that drops the
+    resolved IDs, matches each remaining agent within its own createTime +/- buffer window
+    and stops at the oldest timestamp already scanned (results are ordered newest first).
+    """
+    stats = stats or LogScanStats()
+    outstanding = dict(agent_create_times)
+    creators = {}
+    log_filter, _ = build_windowed_filter(outstanding, buffer=buffer)
+    next_page_token = ""
+    while outstanding and log_filter:
+        payload = {
+            "resourceNames": [f"projects/{project_id}"],
+            "filter": log_filter,
+            "pageSize": 1000,
+            "orderBy": "timestamp desc"  # Scan newest logs first
+        }
+        if next_page_token:
+            payload["pageToken"] = next_page_token
+        try:
+            response = session.post(LOGGING_URL, json=payload, timeout=timeout)
+            if response.status_code != 200:
+                print(f"Error fetching logs (HTTP {response.status_code}): {response.text}", file=sys.stderr)
+                break
+            stats.record_page(len(response.content))
+            data = response.json()
+            entries = data.get("entries", [])
+            resolved = [aid for aid in collect_creators(entries, extract_creator, creators) if aid in outstanding]
+            for agent_id in resolved:
+                del outstanding[agent_id]
+            next_page_token = data.get("nextPageToken")
+            if not outstanding:
+                if next_page_token:
+                    stats.record_early_exit()
+                break
+            if not next_page_token:
+                break
+            if resolved and entries[-1].get("timestamp"):
+                # Restart with a smaller filter bounded by the oldest entry scanned so far; the filter
+                # has whole seconds, so round up to keep older entries of that same second
+                upper = parse_timestamp_ceil(entries[-1]["timestamp"])
+                log_filter, skipped = build_windowed_filter(outstanding, upper=upper, buffer=buffer)
+                for agent_id in skipped:
+                    outstanding.pop(agent_id, None)
+                if log_filter and outstanding:
+                    stats.record_narrowed_query()
+                else:
+                    stats.record_early_exit()
+                next_page_token = ""
+        except Exception as e:
+            print(f"Exception while fetching logs: {e}", file=sys.stderr)
+            break
+    return creators
+
+
+def get_agent_creators_early_exit(session, project_id, agent_create_times, extract_creator=principal_email, timeout=30):
+    """Resolves agent creators with a single early-exit query and reports the paging saved."""
+    if not agent_create_times:
+        return {}
+    stats = LogScanStats()
+    creators = page_creators_early_exit(session, project_id, agent_create_times, extract_creator,
+                                        timeout=timeout, stats=stats)
+    stats.report()
+    return creators
+
+
+def plan_shards(agent_create_times, batch_size=50, window_gap=DEFAULT_WINDOW_GAP):
+    """
+    Splits agent IDs into (agent_ids, start, end) shards.
+    IDs are ordered by createTime and a new shard starts whenever the batch is full or the
+    gap to the previous createTime exceeds window_gap, so each shard scans a narrow window.
+    Agents without a parseable createTime are batched into shards without a time window.
+    """
+    timed, untimed = [], []
+    for agent_id, create_time in agent_create_times.items():
+        try:
+            timed.append((parse_timestamp(create_time), agent_id))
+        except (AttributeError, TypeError, ValueError):
+            untimed.append(agent_id)
+    timed.sort()
+
+    shards = []
+    batch = []
+    for created, agent_id in timed:
+        if batch and (len(batch) >= batch_size or created - batch[-1][0] > window_gap):
+            shards.append(([aid for _, aid in batch], batch[0][0] - TIMESTAMP_BUFFER, batch[-1][0] + TIMESTAMP_BUFFER))
+            batch = []
+        batch.append((created, agent_id))
+    if batch:
+        shards.append(([aid for _, aid in batch], batch[0][0] - TIMESTAMP_BUFFER, batch[-1][0] + TIMESTAMP_BUFFER))
+    for i in range(0, len(untimed), batch_size):
+        shards.append((untimed[i:i + batch_size], None, None))
+    return shards
+
+
+def iter_agent_creators_sharded(session, project_id, agent_create_times, extract_creator=principal_email,
+                                batch_size=50, workers=4, timeout=30, early_exit=False):
+    """
+    Runs time-windowed ID batches concurrently and yields (agent_ids, creators) for each
+    shard as soon as it completes. Pass a request_layer.RetryingSession to pace the shards
+    under the Cloud Logging read quota and retry throttled pages.
+    With early_exit, each shard stops paging as soon as all of its agent IDs are resolved.
+    """
+    if not agent_create_times:
+        return
+
+    shards = plan_shards(agent_create_times, batch_size=batch_size)
+    print(f"Querying Cloud Audit Logs in {len(shards)} shard(s) with {workers} worker(s)...", file=sys.stderr)
+
+    stats = LogScanStats()
+    resolved = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="audit-log") as executor:
+        if early_exit:
+            futures = {
+                executor.submit(page_creators_early_exit, session, project_id,
+                                {aid: agent_create_times[aid] for aid in ids}, extract_creator, timeout, stats): ids
+                for ids, _, _ in shards
+            }
+        else:
+            futures = {
+                executor.submit(page_creators, session, project_id, build_log_filter(ids, shard_start, shard_end),
+                                extract_creator, timeout): ids
+                for ids, shard_start, shard_end in shards
+            }
+        for future in as_completed(futures):
+            shard_creators = future.result()
+            resolved += sum(1 for aid in futures[future] if aid in shard_creators)
+            yield futures[future], shard_creators
+    print(f"Resolved {resolved} creator(s) in {time.perf_counter() - start:.1f}s.", file=sys.stderr)
+    if early_exit:
+        stats.report()
+
+
+def get_agent_creators_sharded(session, project_id, agent_create_times, extract_creator=principal_email,
+                               batch_size=50, workers=4, timeout=30, early_exit=False):
+    """Resolves agent creators with concurrent shards and merges them into one agent_id -> creator map."""
+    creators = {}
+    for _, shard_creators in iter_agent_creators_sharded(
+            session, project_id, agent_create_times, extract_creator, batch_size=batch_size, workers=workers,
+            timeout=timeout, early_exit=early_exit):
+        for agent_id, creator in shard_creators.items():
+            creators.setdefault(agent_id, creator)
+    return creators
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Discovery Engine and Cloud Logging APIs used by the agent listers.
+Serves paginated engines, agents and entries:list responses and single agent GETs from a synthetic
+tenant (or a recorded fixture file) with configurable latency, page size and HTTP 429 injection.
+Listings honour `fields=` partial response masks and gzip responses for clients that ask like Google APIs.
+Point the scanners at it with GE_API_ENDPOINT_OVERRIDE=http://127.0.0.1:<port>.
+"""
+
+import argparse
+import gzip
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+ENGINES_PATH = re.compile(r"^/v1alpha/projects/[^/]+/locations/([^/]+)/collections/[^/]+/engines$")
+AGENTS_PATH = re.compile(r"^/v1alpha/projects/[^/]+/locations/([^/]+)/collections/[^/]+/engines/([^/]+)/assistants/[^/]+/agents$")
+AGENT_PATH = re.compile(r"^/v1alpha/projects/[^/]+/locations/[^/]+/collections/[^/]+/engines/([^/]+)/assistants/[^/]+/agents/([^/]+)$")
+ENTRIES_PATH = "/v2/entries:list"
+QUOTED = re.compile(r'"([^"]+)"')
+
+# (agent type definition field, owner field path) cycled over the synthetic agents
+AGENT_KINDS = [
+    ("noCodeAgentDefinition", ("owner",)),
+    ("lowCodeAgentDefinition", ("ownerName",)),
+    ("agentDesignerAgentDefinition", ("chatAgentDefinition", "owner")),
+    ("workflowAgentDefinition", ("owner",)),
+    ("adkAgentDefinition", None),
+]
+
+
+def generate_fixture(engines=10, agents_per_engine=10, locations=("global",), payload_ratio=0.5,
+                     definition_bytes=1024, wif=False, seed=0):
+    """
+    Builds a synthetic tenant: {"engines": {location: [engine]}, "agents": {engine_id: [agent]},
+    "entries": [CreateAgent audit log entry]}. Agents whose owner is not in the payload get an
+    audit log entry, so every creator resolution path is exercised.
+    """
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 1)
+    fixture = {"engines": {loc: [] for loc in locations}, "agents": {}, "entries": []}
+    agent_number = 0
+    for e in range(engines):
+        location = locations[e % len(locations)]
+        engine_id = f"engine-{e:06d}"
+        base = f"projects/fake-project/locations/{location}/collections/default_collection/engines/{engine_id}"
+        fixture["engines"][location].append({"name": base, "displayName": f"Engine {e}"})
+        agents = []
+        for _ in range(agents_per_engine):
+            agent_id = str(10 ** 15 + agent_number)
+            field, owner_path = AGENT_KINDS[agent_number % len(AGENT_KINDS)]
+            created = start + timedelta(minutes=agent_number * 7 + rng.randint(0, 5))
+            creator = f"user{rng.randint(0, 999)}@example.com"
+            definition = {"instructions": "x" * definition_bytes}
+            if field == "adkAgentDefinition":
+                definition["provisionedReasoningEngine"] = {
+                    "reasoningEngine": f"projects/fake-project/locations/us-central1/reasoningEngines/{agent_number}"}
+            if owner_path and rng.random() < payload_ratio:
+                node = definition
+                for key in owner_path[:-1]:
+                    node = node.setdefault(key, {})
+                node[owner_path[-1]] = creator
+            elif owner_path:
+                auth_info = {"principalEmail": creator}
+                if wif:
+                    auth_info = {"principalSubject": "principal://iam.googleapis.com/locations/global/workforcePools/"
+                                                     f"pool/subject/{uuid.UUID(int=rng.getrandbits(128))}"}
+                fixture["entries"].append({
+                    "timestamp": created.strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+                    "protoPayload": {
+                        "methodName": "google.cloud.discoveryengine.v1alpha.AgentService.CreateAgent",
+                        "resourceName": f"{base}/assistants/default_assistant/agents/{agent_id}",
+                        "authenticationInfo": auth_info,
+                    },
+                })
+            agents.append({
+                "name": f"{base}/assistants/default_assistant/agents/{agent_id}",
+                "displayName": f"Agent {agent_number}",
+                "description": f"Synthetic agent {agent_number}",
+                "createTime": created.strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+                "updateTime": created.strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+                field: definition,
+            })
+            agent_number += 1
+        fixture["agents"][engine_id] = agents
+    return fixture
+
+
+class FakeTenant:
+    """Fixture plus the serving knobs and request counters shared by all handler threads."""
+
+    def __init__(self, fixture, page_size=100, log_page_size=1000, latency_ms=0.0, jitter_ms=0.0,
+                 throttle_rate=0.0, retry_after=1, seed=0):
+        self.fixture = fixture
+        self.page_size = page_size
+        self.log_page_size = log_page_size
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        # agent ID -> entry, newest first, for entries:list filtering
+        entries = sorted(fixture.get("entries", []), key=lambda entry: entry["timestamp"], reverse=True)
+        self.entries = entries
+        self.entry_index = {entry["protoPayload"]["resourceName"].split("/")[-1]: i for i, entry in enumerate(entries)}
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.stats = {"requests": 0, "bytes": 0, "throttled": 0, "endpoints": {}}
+
+    def record(self, endpoint, num_bytes, throttled):
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["bytes"] += num_bytes
+            self.stats["throttled"] += int(throttled)
+            counters = self.stats["endpoints"].setdefault(endpoint, {"requests": 0, "bytes": 0})
+            counters["requests"] += 1
+            counters["bytes"] += num_bytes
+
+    def should_throttle(self):
+        with self.lock:
+            return self.throttle_rate > 0 and self.rng.random() < self.throttle_rate
+
+    def delay(self):
+        if self.latency_ms or self.jitter_ms:
+            with self.lock:
+                jitter = self.rng.uniform(0, self.jitter_ms)
+            time.sleep((self.latency_ms + jitter) / 1000.0)
+
+
+def parse_fields(mask):
+    """Parses a partial response mask ("a,b(c,d/e)") into a nested {field: subtree or None} dict."""
+    tokens = re.findall(r"[^,()/\s]+|[,()/]", mask)
+    position = 0
+
+    def parse_list():
+        nonlocal position
+        tree = {}
+        while position < len(tokens) and tokens[position] != ")":
+            node, name = tree, tokens[position]
+            position += 1
+            while position < len(tokens) and tokens[position] == "/":
+                node = node.setdefault(name, {})
+                name = tokens[position + 1]
+                position += 2
+            if position < len(tokens) and tokens[position] == "(":
+                position += 1
+                node[name] = parse_list()
+                position += 1
+            else:
+                node[name] = None
+            if position < len(tokens) and tokens[position] == ",":
+                position += 1
+        return tree
+
+    return parse_list()
+
+
+def project(value, tree):
+    """Applies a parsed mask; like Google partial responses, a message none of whose masked children are set is omitted."""
+    if tree is None:
+        return value
+    if isinstance(value, list):
+        return [project(item, tree) for item in value]
+    if not isinstance(value, dict):
+        return value
+    projected = {}
+    for key, subtree in tree.items():
+        if key not in value:
+            continue
+        child = project(value[key], subtree)
+        if subtree is not None and child == {}:
+            continue
+        projected[key] = child
+    return projected
+
+
+def page(items, token, size, key):
+    offset = int(token or 0)
+    body = {key: items[offset:offset + size]}
+    if offset + size < len(items):
+        body["nextPageToken"] = str(offset + size)
+    return body
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    tenant = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, endpoint, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        # Like Google APIs, only compress for clients that accept gzip and say so in the User-Agent
+        if "gzip" in self.headers.get("Accept-Encoding", "") and "gzip" in self.headers.get("User-Agent", ""):
+            data = gzip.compress(data)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+        if endpoint:
+            self.tenant.record(endpoint, len(data), status == 429)
+
+    def _throttled(self, endpoint):
+        if self.tenant.should_throttle():
+            self._send(429, {"error": {"code": 429, "status": "RESOURCE_EXHAUSTED"}}, endpoint,
+                       {"Retry-After": str(self.tenant.retry_after)})
+            return True
+        return False
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        token = query.get("pageToken", [""])[0]
+        size = min(int(query.get("pageSize", [self.tenant.page_size])[0]), self.tenant.page_size)
+        fields = parse_fields(query["fields"][0]) if "fields" in query else None
+        if url.path == "/_stats":
+            with self.tenant.lock:
+                return self._send(200, self.tenant.stats, None)
+        match = ENGINES_PATH.match(url.path)
+        if match:
+            self.tenant.delay()
+            if self._throttled("engines"):
+                return
+            engines = self.tenant.fixture["engines"].get(match.group(1))
+            if engines is None:
+                return self._send(404, {"error": {"code": 404, "status": "NOT_FOUND"}}, "engines")
+            return self._send(200, project(page(engines, token, size, "engines"), fields), "engines")
+        match = AGENTS_PATH.match(url.path)
+        if match:
+            self.tenant.delay()
+            if self._throttled("agents"):
+                return
+            agents = self.tenant.fixture["agents"].get(match.group(2), [])
+            return self._send(200, project(page(agents, token, size, "agents"), fields), "agents")
+        match = AGENT_PATH.match(url.path)
+        if match:
+            self.tenant.delay()
+            if self._throttled("agent"):
+                return
+            suffix = f"/agents/{match.group(2)}"
+            for agent in self.tenant.fixture["agents"].get(match.group(1), []):
+                if agent["name"].endswith(suffix):
+                    return self._send(200, project(agent, fields), "agent")
+            return self._send(404, {"error": {"code": 404, "status": "NOT_FOUND"}}, "agent")
+        self._send(404, {"error": {"code": 404, "message": f"Unknown path {url.path}"}}, None)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        if self.path == "/_reset":
+            self.tenant.reset()
+            return self._send(200, {}, None)
+        if urlparse(self.path).path != ENTRIES_PATH:
+            return self._send(404, {"error": {"code": 404}}, None)
+        self.tenant.delay()
+        if self._throttled("entries:list"):
+            return
+        # Match the agent IDs quoted in the filter; entries are served newest first
+        ids = {token for token in QUOTED.findall(payload.get("filter", "")) if token in self.tenant.entry_index}
+        matched = [self.tenant.entries[i] for i in sorted(self.tenant.entry_index[aid] for aid in ids)]
+        size = min(int(payload.get("pageSize", self.tenant.log_page_size)), self.tenant.log_page_size)
+        self._send(200, page(matched, payload.get("pageToken"), size, "entries"), "entries:list")
+
+
+def start_server(tenant, host="127.0.0.1", port=0):
+    """Starts the server on a background thread; returns (server, base URL)."""
+    handler = type("TenantHandler", (Handler,), {"tenant": tenant})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-server", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fake Discovery Engine / Cloud Logging tenant for scanner benchmarks.")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on (default: 8080).")
+    parser.add_argument("--fixture", help="Serve a recorded fixture JSON file ({engines, agents, entries}) instead of a synthetic tenant.")
+    parser.add_argument("--dump-fixture", help="Write the synthetic fixture to this JSON file and exit.")
+    parser.add_argument("--engines", type=int, default=10, help="Synthetic engines (default: 10).")
+    parser.add_argument("--agents-per-engine", type=int, default=10, help="Synthetic agents per engine (default: 10).")
+    parser.add_argument("--locations", default="global", help="Comma-separated locations to spread engines over (default: global).")
+    parser.add_argument("--payload-ratio", type=float, default=0.5, help="Share of agents whose owner is in the payload (default: 0.5).")
+    parser.add_argument("--definition-bytes", type=int, default=1024, help="Padding per agent definition to mimic large payloads (default: 1024).")
+    parser.add_argument("--wif", action="store_true", help="Audit log entries carry WIF principalSubject UUIDs instead of emails.")
+    parser.add_argument("--page-size", type=int, default=100, help="Maximum engines/agents per page (default: 100).")
+    parser.add_argument("--log-page-size", type=int, default=1000, help="Maximum log entries per page (default: 1000).")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added latency per request in ms (default: 0).")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Random extra latency per request, up to this many ms (default: 0).")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 429 (default: 0).")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with injected 429s (default: 1).")
+    args = parser.parse_args()
+
+    if args.fixture:
+        with open(args.fixture, "r") as f:
+            fixture = json.load(f)
+    else:
+        fixture = generate_fixture(args.engines, args.agents_per_engine, [l.strip() for l in args.locations.split(",") if l.strip()],
+                                   payload_ratio=args.payload_ratio, definition_bytes=args.definition_bytes, wif=args.wif)
+    if args.dump_fixture:
+        with open(args.dump_fixture, "w") as f:
+            json.dump(fixture, f)
+        print(f"Wrote fixture to {args.dump_fixture}", file=sys.stderr)
+        return
+
+    tenant = FakeTenant(fixture, page_size=args.page_size, log_page_size=args.log_page_size, latency_ms=args.latency_ms,
+                        jitter_ms=args.jitter_ms, throttle_rate=args.throttle_rate, retry_after=args.retry_after)
+    server, base_url = start_server(tenant, port=args.port)
+    print(f"Serving fake tenant on {base_url} (export GE_API_ENDPOINT_OVERRIDE={base_url}). Ctrl+C to stop.", file=sys.stderr)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
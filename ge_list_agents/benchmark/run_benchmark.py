@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Scan benchmark for the agent listers against the local fake tenant (fake_server.py).
+Runs the scanner as a subprocess at several tenant scales and scanner configurations and
+records wall time, HTTP requests, response bytes, injected 429s and the scanner's peak RSS.
+"""
+
+import argparse
+import json
+import os
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from fake_server import FakeTenant, generate_fixture, start_server
+
+SCANNER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_SCALES = "10x10,100x10,100x100"
+DEFAULT_CONFIGS = ["sequential=", "concurrent=--concurrency 16", "concurrent+sharded=--concurrency 16 --sharded-logs --log-rpm 6000"]
+
+
+def parse_scales(value):
+    """Parses "ENGINESxAGENTS,..." into [(engines, agents_per_engine)]."""
+    scales = []
+    for item in value.split(","):
+        engines, agents = item.lower().split("x")
+        scales.append((int(engines), int(agents)))
+    return scales
+
+
+def parse_config(value):
+    name, _, scanner_args = value.partition("=")
+    return name, shlex.split(scanner_args)
+
+
+def server_call(base_url, path, method="GET"):
+    request = urllib.request.Request(base_url + path, method=method, data=b"{}" if method == "POST" else None)
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def run_scanner(scanner, base_url, scanner_args, workdir):
+    """Runs one scan and returns (exit code, wall seconds, peak RSS in MB)."""
+    env = dict(os.environ, GE_API_ENDPOINT_OVERRIDE=base_url)
+    command = [sys.executable, os.path.join(SCANNER_DIR, scanner), "--project_id", "fake-project",
+               "--format", "csv", "--output", os.devnull, *scanner_args]
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    stderr = process.stderr.read()
+    # wait4 reports the resource usage of this child alone (ru_maxrss is in KB on Linux)
+    _, status, usage = os.wait4(process.pid, 0)
+    seconds = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode != 0:
+        print(stderr.decode("utf-8", "replace")[-2000:], file=sys.stderr)
+    return process.returncode, seconds, usage.ru_maxrss / 1024.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the agent scanners against a local fake tenant.")
+    parser.add_argument("--scanner", default="list_agents.py", help="Scanner script in ge_list_agents to run (default: list_agents.py).")
+    parser.add_argument("--scales", default=DEFAULT_SCALES, help=f"Comma-separated ENGINESxAGENTS_PER_ENGINE scales (default: {DEFAULT_SCALES}).")
+    parser.add_argument("--config", action="append", help="NAME=SCANNER ARGS to benchmark; repeatable (default: sequential, concurrent, concurrent+sharded).")
+    parser.add_argument("--locations", default="global", help="Locations to spread engines over; the scanner scans the same list (default: global).")
+    parser.add_argument("--page-size", type=int, default=100, help="Fake server page size (default: 100).")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Fake server latency per request in ms (default: 20).")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="Fake server random extra latency in ms (default: 10).")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 429 (default: 0).")
+    parser.add_argument("--definition-bytes", type=int, default=1024, help="Padding per agent definition (default: 1024).")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per scale and configuration; the fastest is reported (default: 1).")
+    parser.add_argument("--json-out", help="Also write the results as JSON to this file.")
+    args = parser.parse_args()
+
+    configs = [parse_config(value) for value in (args.config or DEFAULT_CONFIGS)]
+    locations = [loc.strip() for loc in args.locations.split(",") if loc.strip()]
+    results = []
+    template = "{:<14} | {:<22} | {:>9} | {:>9} | {:>10} | {:>6} | {:>9} | {}"
+    print(template.format("Scale", "Config", "Wall (s)", "Requests", "MB", "429s", "RSS (MB)", "Status"))
+    print("-" * 105)
+    with tempfile.TemporaryDirectory() as workdir:
+        for engines, agents_per_engine in parse_scales(args.scales):
+            fixture = generate_fixture(engines, agents_per_engine, locations, definition_bytes=args.definition_bytes,
+                                       wif="wif" in args.scanner)
+            tenant = FakeTenant(fixture, page_size=args.page_size, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                                throttle_rate=args.throttle_rate)
+            server, base_url = start_server(tenant)
+            try:
+                for name, scanner_args in configs:
+                    best = None
+                    for _ in range(args.repeat):
+                        server_call(base_url, "/_reset", "POST")
+                        code, seconds, rss = run_scanner(args.scanner, base_url, ["--location", ",".join(locations), *scanner_args], workdir)
+                        stats = server_call(base_url, "/_stats")
+                        run = {
+                            "scale": f"{engines}x{agents_per_engine}", "engines": engines, "agents": engines * agents_per_engine,
+                            "config": name, "args": scanner_args, "exit_code": code, "wall_seconds": round(seconds, 3),
+                            "requests": stats["requests"], "bytes": stats["bytes"], "throttled": stats["throttled"],
+                            "endpoints": stats["endpoints"], "peak_rss_mb": round(rss, 1),
+                        }
+                        if best is None or run["wall_seconds"] < best["wall_seconds"]:
+                            best = run
+                    results.append(best)
+                    print(template.format(best["scale"], name, f"{best['wall_seconds']:.2f}", best["requests"],
+                                          f"{best['bytes'] / 1e6:.2f}", best["throttled"], f"{best['peak_rss_mb']:.1f}",
+                                          "OK" if best["exit_code"] == 0 else f"exit {best['exit_code']}"), flush=True)
+            finally:
+                server.shutdown()
+                server.server_close()
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {len(results)} result(s) to {args.json_out}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Local index of the Entra ID tenant directory, kept current with Microsoft Graph delta queries.
+The first sync pages through /users/delta once; later syncs replay the stored deltaLink and
+only apply the users added, changed or removed since, so resolving UUIDs becomes a local lookup.
+"""
+
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+from graph_batch import GRAPH_URL, RETRYABLE_STATUS_CODES, USER_SELECT
+
+DELTA_URL = f"{GRAPH_URL}/users/delta?$select={USER_SELECT}"
+
+MAX_RETRIES = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    mail TEXT,
+    user_principal_name TEXT,
+    display_name TEXT
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sync_state (
+    tenant_id TEXT PRIMARY KEY,
+    delta_link TEXT NOT NULL,
+    synced_at TEXT NOT NULL
+);
+"""
+
+# Graph property -> index column
+COLUMNS = {"mail": "mail", "userPrincipalName": "user_principal_name", "displayName": "display_name"}
+
+
+class DeltaTokenExpired(Exception):
+    """Raised when Graph no longer accepts the stored deltaLink (HTTP 410) and a full sync is needed."""
+
+
+class DirectoryIndex:
+    """SQLite index of one tenant's users keyed by lower-case object ID."""
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def delta_link(self, tenant_id):
+        row = self.conn.execute("SELECT delta_link FROM sync_state WHERE tenant_id = ?", (tenant_id,)).fetchone()
+        return row["delta_link"] if row else None
+
+    def apply(self, users):
+        """Applies one page of delta results; returns (upserted, removed) counts."""
+        upserted = removed = 0
+        with self.conn:
+            for user in users:
+                user_id = (user.get("id") or "").lower()
+                if not user_id:
+                    continue
+                if "@removed" in user:
+                    self.conn.execute("DELETE FROM users WHERE id = ?", (user_id,))
+                    removed += 1
+                    continue
+                # Changed users may only carry the properties that changed: keep the others
+                self.conn.execute("INSERT OR IGNORE INTO users (id) VALUES (?)", (user_id,))
+                present = [(column, user[prop]) for prop, column in COLUMNS.items() if prop in user]
+                if present:
+                    assignments = ", ".join(f"{column} = ?" for column, _ in present)
+                    self.conn.execute(f"UPDATE users SET {assignments} WHERE id = ?", [v for _, v in present] + [user_id])
+                upserted += 1
+        return upserted, removed
+
+    def save_delta_link(self, tenant_id, delta_link):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sync_state (tenant_id, delta_link, synced_at) VALUES (?, ?, ?)",
+                (tenant_id, delta_link, datetime.now(timezone.utc).isoformat()),
+            )
+
+    def reset(self, tenant_id):
+        with self.conn:
+            self.conn.execute("DELETE FROM users")
+            self.conn.execute("DELETE FROM sync_state WHERE tenant_id = ?", (tenant_id,))
+
+    def lookup(self, uuid):
+        """Returns the indexed Graph user object of a UUID, or None if the tenant has no such user."""
+        row = self.conn.execute("SELECT * FROM users WHERE id = ?", (uuid.lower(),)).fetchone()
+        if not row:
+            return None
+        return {"id": row["id"], "mail": row["mail"], "userPrincipalName": row["user_principal_name"],
+                "displayName": row["display_name"]}
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+def _get_page(session, url, headers, timeout):
+    for attempt in range(MAX_RETRIES + 1):
+        res = session.get(url, headers=headers, timeout=timeout)
+        if res.status_code == 410:
+            raise DeltaTokenExpired(res.text)
+        if res.status_code in RETRYABLE_STATUS_CODES and attempt < MAX_RETRIES:
+            retry_after = res.headers.get("Retry-After")
+            time.sleep(float(retry_after) if retry_after and retry_after.isdigit() else 5.0 * (attempt + 1))
+            continue
+        if res.status_code != 200:
+            raise RuntimeError(f"HTTP Error {res.status_code}: {res.text}")
+        return res.json()
+
+
+def _run_delta(session, access_token, index, tenant_id, url, timeout):
+    headers = {"Authorization": f"Bearer {access_token}"}
+    pages = upserted = removed = 0
+    while url:
+        data = _get_page(session, url, headers, timeout)
+        page_upserted, page_removed = index.apply(data.get("value", []))
+        pages += 1
+        upserted += page_upserted
+        removed += page_removed
+        if data.get("@odata.deltaLink"):
+            index.save_delta_link(tenant_id, data["@odata.deltaLink"])
+            break
+        url = data.get("@odata.nextLink")
+    return pages, upserted, removed
+
+
+def sync_directory(session, access_token, index, tenant_id, timeout=60):
+    """
+    Brings the index up to date: a full /users/delta enumeration on the first run (or when
+    the stored delta token has expired), otherwise only the changes since the last sync.
+    """
+    delta_link = index.delta_link(tenant_id)
+    mode = "incremental" if delta_link else "full"
+    if not delta_link:
+        # A full enumeration replaces whatever a previous, interrupted sync left behind
+        index.reset(tenant_id)
+    start = time.perf_counter()
+    try:
+        pages, upserted, removed = _run_delta(session, access_token, index, tenant_id, delta_link or DELTA_URL, timeout)
+    except DeltaTokenExpired:
+        print("Stored delta token expired. Running a full directory sync...", file=sys.stderr)
+        index.reset(tenant_id)
+        mode = "full"
+        pages, upserted, removed = _run_delta(session, access_token, index, tenant_id, DELTA_URL, timeout)
+    print(f"Directory sync ({mode}): {pages} page(s), {upserted} user(s) added or changed, {removed} removed; "
+          f"{index.count()} user(s) indexed in {time.perf_counter() - start:.1f}s.", file=sys.stderr)
@@ -0,0 +1,209 @@
+"""
+Microsoft Graph JSON batching for the Entra ID identity resolver.
+Packs user lookups into $batch requests of up to 20 and sends several batches concurrently
+over one pooled session, retrying throttled items (HTTP 429/503) after their Retry-After.
+StreamingResolver accepts UUIDs one at a time while they are being discovered.
+"""
+
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+from requests.adapters import HTTPAdapter
+
+GRAPH_URL = "https://graph.microsoft.com/v1.0"
+BATCH_URL = f"{GRAPH_URL}/$batch"
+
+# Graph rejects JSON batches with more than 20 requests
+MAX_BATCH_SIZE = 20
+
+USER_SELECT = "id,mail,userPrincipalName,displayName"
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+DEFAULT_RETRY_AFTER = 5.0
+
+
+def create_session(pool_size=10):
+    """Returns a requests session with a keep-alive connection pool sized for the batch workers."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    return session
+
+
+def dedupe(uuids):
+    """Removes blank and duplicate UUIDs (case-insensitively), keeping the first occurrence order."""
+    seen = set()
+    unique = []
+    for uuid in uuids:
+        uuid = uuid.strip()
+        if uuid and uuid.lower() not in seen:
+            seen.add(uuid.lower())
+            unique.append(uuid)
+    return unique
+
+
+def parse_user(data):
+    """Returns (email, display_name) of a Graph user object, as the single-user lookup does."""
+    email = data.get("mail") or data.get("userPrincipalName") or "N/A"
+    name = data.get("displayName") or "N/A"
+    return email, name
+
+
+def _retry_after(headers, attempt):
+    value = (headers or {}).get("Retry-After") or (headers or {}).get("retry-after")
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER * (attempt + 1)
+
+
+def resolve_batch(session, access_token, uuids, max_retries=5, timeout=60):
+    """
+    Resolves up to MAX_BATCH_SIZE UUIDs with one $batch request per attempt.
+    Returns {uuid: (email, name, user)} using the same (None, reason) failure convention as
+    resolve_uuid; user is the Graph user object, {} if the user was not found, None on errors.
+    """
+    headers = {"Authorization": f"Bearer {access_token}", "Content-Type": "application/json"}
+    results = {}
+    pending = list(uuids)
+    for attempt in range(max_retries + 1):
+        body = {"requests": [
+            {"id": str(i), "method": "GET", "url": f"/users/{uuid}?$select={USER_SELECT}"}
+            for i, uuid in enumerate(pending)
+        ]}
+        try:
+            res = session.post(BATCH_URL, json=body, headers=headers, timeout=timeout)
+        except Exception as e:
+            if attempt == max_retries:
+                return {**results, **{uuid: (None, f"Exception: {e}", None) for uuid in pending}}
+            time.sleep(_retry_after(None, attempt))
+            continue
+        if res.status_code in RETRYABLE_STATUS_CODES and attempt < max_retries:
+            time.sleep(_retry_after(res.headers, attempt))
+            continue
+        if res.status_code != 200:
+            return {**results, **{uuid: (None, f"HTTP Error {res.status_code}: {res.text}", None) for uuid in pending}}
+
+        throttled = []
+        delay = 0.0
+        for item in res.json().get("responses", []):
+            uuid = pending[int(item["id"])]
+            status = item.get("status")
+            if status == 200:
+                user = item.get("body") or {}
+                results[uuid] = (*parse_user(user), user)
+            elif status == 404:
+                results[uuid] = (None, "User not found", {})
+            elif status in RETRYABLE_STATUS_CODES and attempt < max_retries:
+                throttled.append(uuid)
+                delay = max(delay, _retry_after(item.get("headers"), attempt))
+            else:
+                results[uuid] = (None, f"HTTP Error {status}: {item.get('body')}", None)
+        missing = [uuid for uuid in pending if uuid not in results and uuid not in throttled]
+        pending = throttled + missing
+        if not pending:
+            break
+        time.sleep(delay or _retry_after(None, attempt))
+    for uuid in pending:
+        results.setdefault(uuid, (None, "HTTP Error 429: retries exhausted", None))
+    return results
+
+
+def iter_resolved_batches(session, access_token, uuids, batch_size=MAX_BATCH_SIZE, workers=4, max_retries=5):
+    """
+    Dedupes the UUIDs, resolves them in concurrent $batch requests and yields
+    {uuid: (email, name, user)} per batch as soon as it completes.
+    """
+    batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+    unique = dedupe(uuids)
+    batches = [unique[i:i + batch_size] for i in range(0, len(unique), batch_size)]
+    if not batches:
+        return
+    print(f"Resolving {len(unique)} unique UUIDs in {len(batches)} batch(es) with {workers} worker(s)...", file=sys.stderr)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="graph-batch") as executor:
+        futures = [executor.submit(resolve_batch, session, access_token, batch, max_retries) for batch in batches]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def resolve_uuids_batched(session, access_token, uuids, batch_size=MAX_BATCH_SIZE, workers=4, max_retries=5):
+    """Resolves all UUIDs with concurrent $batch requests and returns one {uuid: (email, name, user)} map."""
+    results = {}
+    for batch_results in iter_resolved_batches(session, access_token, uuids, batch_size, workers, max_retries):
+        results.update(batch_results)
+    return results
+
+
+class StreamingResolver:
+    """
+    Resolves UUIDs submitted one at a time, e.g. while an inventory scan is still running.
+    UUIDs are deduped and packed into $batch requests, which are sent as soon as a batch is
+    full or flush_interval seconds after its first UUID. on_resolved(results) is called from
+    a worker thread with the {uuid: (email, name, user)} map of every completed batch.
+    """
+
+    def __init__(self, session, access_token, on_resolved, batch_size=MAX_BATCH_SIZE, workers=4,
+                 flush_interval=0.5, max_retries=5):
+        self.session = session
+        self.access_token = access_token
+        self.on_resolved = on_resolved
+        self.batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="graph-batch")
+        self.condition = threading.Condition()
+        self.seen = set()
+        self.pending = []
+        self.pending_since = None
+        self.closed = False
+        self.flusher = threading.Thread(target=self._flush_loop, name="graph-batch-flush", daemon=True)
+        self.flusher.start()
+
+    def submit(self, uuid):
+        """Queues a UUID for resolution; UUIDs submitted before are ignored."""
+        with self.condition:
+            if uuid.lower() in self.seen:
+                return
+            self.seen.add(uuid.lower())
+            self.pending.append(uuid)
+            if self.pending_since is None:
+                self.pending_since = time.monotonic()
+            if len(self.pending) >= self.batch_size:
+                self._dispatch()
+            self.condition.notify()
+
+    def _dispatch(self):
+        batch, self.pending, self.pending_since = self.pending, [], None
+        future = self.executor.submit(resolve_batch, self.session, self.access_token, batch, self.max_retries)
+        future.add_done_callback(lambda done: self._done(done, batch))
+
+    def _done(self, future, batch):
+        try:
+            results = future.result()
+        except Exception as e:
+            results = {uuid: (None, f"Exception: {e}", None) for uuid in batch}
+        self.on_resolved(results)
+
+    def _flush_loop(self):
+        with self.condition:
+            while not self.closed:
+                if self.pending_since is None:
+                    self.condition.wait()
+                    continue
+                remaining = self.pending_since + self.flush_interval - time.monotonic()
+                if remaining > 0:
+                    self.condition.wait(remaining)
+                elif self.pending:
+                    self._dispatch()
+
+    def close(self):
+        """Sends the last partial batch and waits until every submitted UUID has been resolved."""
+        with self.condition:
+            self.closed = True
+            if self.pending:
+                self._dispatch()
+            self.condition.notify()
+        self.flusher.join()
+        self.executor.shutdown(wait=True)
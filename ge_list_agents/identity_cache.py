@@ -0,0 +1,101 @@
+"""
+Local SQLite cache of Entra ID identities for the WIF identity resolver.
+Stores uuid -> (mail, userPrincipalName, displayName, fetched_at) with a TTL, remembers
+UUIDs that Microsoft Graph reported as not found (negative caching), and keeps the
+client-credentials access token until shortly before it expires.
+"""
+
+import os
+import sqlite3
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS identities (
+    uuid TEXT PRIMARY KEY,
+    mail TEXT,
+    user_principal_name TEXT,
+    display_name TEXT,
+    found INTEGER NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tokens (
+    key TEXT PRIMARY KEY,
+    access_token TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+# Refresh cached tokens this many seconds before they expire
+TOKEN_EXPIRY_MARGIN = 300
+
+
+class IdentityCache:
+    """Reads and writes cached Graph user lookups and access tokens."""
+
+    def __init__(self, path, ttl_seconds, negative_ttl_seconds):
+        self.path = path
+        is_new = not os.path.exists(path)
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        if is_new:
+            # The cache holds access tokens: keep it private to the current user
+            os.chmod(path, 0o600)
+        self.conn.executescript(SCHEMA)
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, uuids):
+        """
+        Returns {uuid: user} for every UUID with a fresh cache entry, where user is the cached
+        Graph user object ({} for a cached "not found"). Expired and unknown UUIDs are omitted.
+        """
+        now = time.time()
+        cached = {}
+        for i in range(0, len(uuids), 500):
+            chunk = uuids[i:i + 500]
+            placeholders = ",".join("?" for _ in chunk)
+            for row in self.conn.execute(f"SELECT * FROM identities WHERE uuid IN ({placeholders})", chunk):
+                ttl = self.ttl_seconds if row["found"] else self.negative_ttl_seconds
+                if now - row["fetched_at"] > ttl:
+                    continue
+                cached[row["uuid"]] = {
+                    "mail": row["mail"],
+                    "userPrincipalName": row["user_principal_name"],
+                    "displayName": row["display_name"],
+                } if row["found"] else {}
+        self.hits += len(cached)
+        self.misses += len(uuids) - len(cached)
+        return cached
+
+    def store(self, users):
+        """Caches {uuid: user} lookup results; user is a Graph user object, or {} for "not found"."""
+        now = time.time()
+        rows = [
+            (uuid, user.get("mail"), user.get("userPrincipalName"), user.get("displayName"), 1 if user else 0, now)
+            for uuid, user in users.items()
+        ]
+        with self.conn:
+            self.conn.executemany(
+                """INSERT OR REPLACE INTO identities (uuid, mail, user_principal_name, display_name, found, fetched_at)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                rows,
+            )
+
+    def get_token(self, key):
+        """Returns a cached access token that is still valid for at least TOKEN_EXPIRY_MARGIN seconds."""
+        row = self.conn.execute("SELECT access_token, expires_at FROM tokens WHERE key = ?", (key,)).fetchone()
+        if row and row["expires_at"] - TOKEN_EXPIRY_MARGIN > time.time():
+            return row["access_token"]
+        return None
+
+    def store_token(self, key, access_token, expires_in):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO tokens (key, access_token, expires_at) VALUES (?, ?, ?)",
+                (key, access_token, time.time() + float(expires_in)),
+            )
+
+    def close(self):
+        self.conn.close()
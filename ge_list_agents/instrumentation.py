@@ -0,0 +1,172 @@
+"""
+Scan instrumentation for the agent listers (--stats and --trace-out).
+Records every HTTP call (endpoint, status, latency, page items, payload bytes) and the time
+spent in each scan phase, then prints latency percentiles and phase totals or writes a
+Chrome trace (chrome://tracing, https://ui.perfetto.dev) of the whole scan.
+"""
+
+import json
+import math
+import sys
+import threading
+import time
+
+# Keys holding the listed items in the paged responses of the APIs the scanners call
+PAGE_ITEM_KEYS = ("engines", "agents", "entries", "projects", "folders")
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def count_page_items(data):
+    """Returns the number of listed items in a decoded JSON page, or None for other bodies."""
+    if not isinstance(data, dict):
+        return None
+    for key in PAGE_ITEM_KEYS:
+        if isinstance(data.get(key), list):
+            return len(data[key])
+    return 0
+
+
+def count_items_on_decode(recorder, endpoint, response, event=None):
+    """
+    Records a response's page items when the caller decodes it, so the body is parsed once
+    (by the caller) and never inside the timed request. Wrappers that decode the body
+    themselves (slim_fetch) hand their page to response.record_page instead.
+    """
+    decode = response.json
+    counted = []
+
+    def record_page(data):
+        if not counted:
+            counted.append(True)
+            recorder.add_items(endpoint, count_page_items(data), event)
+        return data
+
+    response.json = lambda **kwargs: record_page(decode(**kwargs))
+    response.record_page = record_page
+
+
+class Recorder:
+    """Thread-safe collector of HTTP calls and phase spans for one scan."""
+
+    def __init__(self, trace=False):
+        self.trace = trace
+        self.lock = threading.Lock()
+        self.start = time.perf_counter()
+        self.calls = {}
+        self.phases = {}
+        self.events = []
+        self.thread_names = {}
+
+    def _trace_event(self, name, category, start, duration, args=None):
+        if self.trace:
+            self.thread_names.setdefault(threading.get_ident(), threading.current_thread().name)
+            event = {
+                "name": name, "cat": category, "ph": "X", "pid": 1, "tid": threading.get_ident(),
+                "ts": round((start - self.start) * 1e6, 1), "dur": round(duration * 1e6, 1), "args": args or {},
+            }
+            self.events.append(event)
+            return event
+        return None
+
+    def record_call(self, endpoint, status, start, duration, num_bytes):
+        """
+        Records one HTTP attempt (retries are recorded as separate calls); returns its trace
+        event, if any, for add_items.
+        """
+        with self.lock:
+            stats = self.calls.setdefault(endpoint, {"latencies": [], "errors": 0, "bytes": 0, "items": 0})
+            stats["latencies"].append(duration)
+            stats["bytes"] += num_bytes
+            if status is None or status >= 400:
+                stats["errors"] += 1
+            return self._trace_event(endpoint, "http", start, duration,
+                                     {"status": status, "bytes": num_bytes, "items": None})
+
+    def add_items(self, endpoint, items, event=None):
+        """Adds the page items of a recorded call once its body has been decoded."""
+        with self.lock:
+            self.calls[endpoint]["items"] += items or 0
+            if event is not None:
+                event["args"]["items"] = items
+
+    def record_phase(self, phase, start, duration, trace=True, args=None):
+        with self.lock:
+            totals = self.phases.setdefault(phase, {"calls": 0, "seconds": 0.0})
+            totals["calls"] += 1
+            totals["seconds"] += duration
+            if trace:
+                self._trace_event(phase, "phase", start, duration, args)
+
+    def timed(self, phase, func):
+        """Wraps func so that every call is recorded as a span of the given phase."""
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record_phase(phase, start, time.perf_counter() - start)
+        return wrapper
+
+    def timed_iter(self, phase, iterable):
+        """Yields from iterable, recording the time spent producing each item (not consuming it)."""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.record_phase(phase, start, time.perf_counter() - start)
+                return
+            self.record_phase(phase, start, time.perf_counter() - start)
+            yield item
+
+    def report(self, file=sys.stderr):
+        """Prints p50/p95/p99 latency per endpoint and the time spent in each phase."""
+        elapsed = time.perf_counter() - self.start
+        with self.lock:
+            calls = {endpoint: dict(stats, latencies=sorted(stats["latencies"])) for endpoint, stats in self.calls.items()}
+            phases = dict(self.phases)
+        template = "{:<36} | {:>6} | {:>6} | {:>9} | {:>9} | {:>9} | {:>9} | {:>8} | {:>8}"
+        print("\nHTTP latency by endpoint:", file=file)
+        print(template.format("Endpoint", "Calls", "Errors", "p50 (ms)", "p95 (ms)", "p99 (ms)", "Max (ms)", "Items", "MB"), file=file)
+        print("-" * 122, file=file)
+        for endpoint, stats in sorted(calls.items()):
+            latencies = stats["latencies"]
+            print(template.format(
+                endpoint, len(latencies), stats["errors"],
+                *(f"{percentile(latencies, pct) * 1000:.1f}" for pct in (50, 95, 99)),
+                f"{latencies[-1] * 1000:.1f}", stats["items"], f"{stats['bytes'] / 1e6:.2f}"), file=file)
+        print("\nPhase totals (summed across workers):", file=file)
+        print("{:<24} | {:>8} | {:>10}".format("Phase", "Calls", "Total (s)"), file=file)
+        print("-" * 48, file=file)
+        for phase, totals in phases.items():
+            print("{:<24} | {:>8} | {:>10.2f}".format(phase, totals["calls"], totals["seconds"]), file=file)
+        print(f"Wall time: {elapsed:.2f}s", file=file)
+
+    def write_trace(self, path):
+        """Writes the recorded spans as Chrome trace JSON."""
+        with self.lock:
+            events = list(self.events)
+            thread_names = dict(self.thread_names)
+        metadata = [{"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": name}}
+                    for tid, name in thread_names.items()]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms"}, f)
+        print(f"Wrote {len(events)} trace event(s) to {path}", file=sys.stderr)
+
+
+def finish(recorder, stats=False, trace_out=None):
+    """Prints the --stats report and writes the --trace-out file of a finished scan."""
+    if not recorder:
+        return
+    if stats:
+        recorder.report()
+    if trace_out:
+        recorder.write_trace(trace_out)
@@ -0,0 +1,262 @@
+"""
+Streaming agent inventory pipeline shared by the agent listers.
+Rows are yielded as soon as each agent's creator is known: payload-resolved rows while the
+listing is still running, log-resolved rows as each audit log batch completes.
+"""
+
+import os
+import re
+import sys
+import threading
+import time
+import async_scan
+import audit_logs
+import offline_audit_logs
+import output_writers
+import snapshot_store
+
+# Exclude ADK, A2A, Managed (1P), and other developer/integration agents
+ALLOWED_TYPES = ["Low-Code", "No-Code", "Workflow", "Agent Designer"]
+
+UNRESOLVED_CREATOR = "N/A (No log entry found)"
+
+SNAPSHOT_BATCH_SIZE = 500
+
+DEFAULT_LOCATIONS = ["global", "us", "eu"]  # Broader default to scan common locations
+
+LISTING_SCOPE = re.compile(r"/locations/([^/]+)/collections/[^/]+/engines(?:/([^/]+))?")
+
+
+class ListingMonitor:
+    """
+    Wraps the scanner session for one scan or watch cycle and records the scope of every engine
+    or agent listing call that did not return HTTP 200: (location, None) for an engine listing,
+    (location, engine_id) for an agent listing. The listers stop paging on such a response,
+    so agents in those scopes may be missing from the scan without having been deleted.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self.lock = threading.Lock()
+        self.incomplete = set()
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+    def _mark(self, url):
+        match = LISTING_SCOPE.search(url)
+        if match:
+            with self.lock:
+                self.incomplete.add(match.groups())
+
+    def get(self, url, **kwargs):
+        try:
+            response = self.session.get(url, **kwargs)
+        except Exception:
+            self._mark(url)
+            raise
+        if response.status_code != 200:
+            self._mark(url)
+        return response
+
+    def covers(self, info):
+        """True when the agent's engine or location had an incomplete listing."""
+        return (info["location"], None) in self.incomplete or (info["location"], info["engine_id"]) in self.incomplete
+
+
+def add_scan_arguments(parser, modes=True):
+    """
+    Adds the project scan options shared by the lister entry points. With modes=False the
+    incremental, watch, slim and instrumentation options are left out (e.g. wif_pipeline.py).
+    """
+    parser.add_argument("--project_id", help="Google Cloud Project ID. Defaults to detecting from environment.")
+    parser.add_argument("--format", choices=output_writers.FORMATS, default="table", help="Output format: table, csv, jsonl or parquet (default: table).")
+    parser.add_argument("--output", help="Write rows to this file instead of stdout (required for --format parquet).")
+    parser.add_argument("--location", help="Comma-separated list of GCP locations to scan. Overrides default/env.")
+    parser.add_argument("--concurrency", type=int, default=1, help="Number of concurrent listing workers (default: 1, sequential scan).")
+    if modes:
+        parser.add_argument("--incremental", action="store_true", help="Diff listings against the local snapshot and only resolve creators of new agents.")
+        parser.add_argument("--snapshot", default="agent_snapshot.db", help="Path to the SQLite inventory snapshot used by --incremental (default: agent_snapshot.db).")
+    parser.add_argument("--sharded-logs", action="store_true", help="Resolve creators with concurrent, time-windowed audit log queries over bounded ID batches.")
+    parser.add_argument("--log-batch-size", type=int, default=50, help="Maximum agent IDs per audit log filter with --sharded-logs (default: 50).")
+    parser.add_argument("--log-workers", type=int, default=4, help="Concurrent audit log shards with --sharded-logs (default: 4).")
+    parser.add_argument("--log-rpm", type=int, default=60, help="Cloud Logging read requests per minute across all workers (default: 60).")
+    parser.add_argument("--de-qps", type=float, default=20.0, help="Discovery Engine requests per second across all workers (default: 20).")
+    parser.add_argument("--max-in-flight", type=int, default=32, help="Upper bound of concurrent requests per API; throttling halves it adaptively (default: 32).")
+    parser.add_argument("--max-retries", type=int, default=6, help="Retries of HTTP 429/5xx and connection errors per request (default: 6).")
+    if modes:
+        parser.add_argument("--watch", action="store_true", help="Keep running and emit JSONL change events (added/removed/updated agents) on every poll.")
+        parser.add_argument("--watch-interval", type=float, default=300, help="Seconds between --watch polls (default: 300).")
+        parser.add_argument("--watch-jitter", type=float, default=0.1, help="Random +/- fraction applied to --watch-interval (default: 0.1).")
+        parser.add_argument("--watch-cycles", type=int, default=None, help="Stop --watch after this many polls (default: run until interrupted).")
+        parser.add_argument("--watch-emit-initial", action="store_true", help="Emit an 'added' event for every agent found by the first --watch poll.")
+        parser.add_argument("--slim", action="store_true", help="Fetch engine/agent listings as gzip-compressed partial responses holding only the fields the scan reads, and report the bytes saved.")
+        parser.add_argument("--slim-sample-pages", type=int, default=1, help="Agent pages also fetched in full with --slim to estimate savings and check agent types (default: 1).")
+        parser.add_argument("--stats", action="store_true", help="Print p50/p95/p99 latency per API endpoint and time per scan phase to stderr.")
+        parser.add_argument("--trace-out", help="Write a Chrome trace JSON of every HTTP call and scan phase to this file.")
+    parser.add_argument("--early-exit", action="store_true", help="Stop paging audit logs once every agent ID is resolved, narrowing the filter as IDs resolve.")
+    parser.add_argument("--audit-log-dir", help="Resolve creators from exported audit log files (Log Router sink to GCS) in this directory instead of Cloud Logging.")
+    parser.add_argument("--audit-log-workers", type=int, default=None, help="Processes used to parse exported audit log files (default: CPU count).")
+
+
+def validate_scan_arguments(parser, args):
+    """Rejects invalid values of the options added by add_scan_arguments (exits through parser.error)."""
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    if args.log_batch_size < 1 or args.log_workers < 1 or args.log_rpm < 1:
+        parser.error("--log-batch-size, --log-workers and --log-rpm must be at least 1")
+    if getattr(args, "slim_sample_pages", 0) < 0:
+        parser.error("--slim-sample-pages must not be negative")
+    if args.de_qps <= 0 or args.max_in_flight < 1 or args.max_retries < 0:
+        parser.error("--de-qps must be positive, --max-in-flight at least 1 and --max-retries not negative")
+    if getattr(args, "watch", False) and (args.watch_interval <= 0 or not 0 <= args.watch_jitter < 1):
+        parser.error("--watch-interval must be positive and --watch-jitter between 0 and 1")
+
+
+def scan_locations(args):
+    """Locations to scan: --location, else the LOCATION/LOCATIONS environment variable, else DEFAULT_LOCATIONS."""
+    value = args.location or os.getenv("LOCATION") or os.getenv("LOCATIONS")
+    if value:
+        return [loc.strip() for loc in value.split(",") if loc.strip()]
+    return list(DEFAULT_LOCATIONS)
+
+
+class AgentLister:
+    """Bundles the listing and creator extraction functions of one agent lister script."""
+
+    def __init__(self, list_engines, list_agents, iter_listings, get_agent_type, get_payload_email,
+                 get_agent_creators, format_datetime, extract_creator=audit_logs.principal_email, recorder=None):
+        self.recorder = recorder
+        # With --stats/--trace-out every listing call is recorded as a span of its phase
+        self.list_engines = recorder.timed("engine listing", list_engines) if recorder else list_engines
+        self.list_agents = recorder.timed("agent listing", list_agents) if recorder else list_agents
+        self.iter_listings = iter_listings
+        self.get_agent_type = get_agent_type
+        self.get_payload_email = get_payload_email
+        self.get_agent_creators = get_agent_creators
+        self.format_datetime = format_datetime
+        self.extract_creator = extract_creator
+
+    def build_agent_info(self, agent, location, engine_id):
+        """Builds the output row of a listed agent, or None if its type is not reported."""
+        agent_type = self.get_agent_type(agent)
+        if agent_type not in ALLOWED_TYPES:
+            return None
+        agent_name = agent.get("name", "")
+        return {
+            "agent_id": agent_name.split("/")[-1],
+            "display_name": agent.get("displayName", ""),
+            "description": agent.get("description", ""),
+            "type": agent_type,
+            "engine_id": engine_id,
+            "location": location,
+            # Try to get creator email from payload first
+            "creator": self.get_payload_email(agent, agent_type),
+            "create_time": self.format_datetime(agent.get("createTime", "N/A")),
+            "resource_name": agent_name,
+            "create_time_iso": agent.get("createTime"),
+            "update_time": agent.get("updateTime")
+        }
+
+
+def iter_log_resolutions(lister, session, project_id, create_time_by_id, options):
+    """Yields (agent_ids, creators) batches from the audit log resolver selected by the options."""
+    agent_ids = list(create_time_by_id)
+    if options.audit_log_dir:
+        yield agent_ids, offline_audit_logs.get_agent_creators_offline(
+            options.audit_log_dir, agent_ids, extract_creator=lister.extract_creator, workers=options.audit_log_workers)
+    elif options.sharded_logs:
+        yield from audit_logs.iter_agent_creators_sharded(
+            session, project_id, create_time_by_id, extract_creator=lister.extract_creator,
+            batch_size=options.log_batch_size, workers=options.log_workers,
+            early_exit=options.early_exit)
+    elif options.early_exit:
+        yield agent_ids, audit_logs.get_agent_creators_early_exit(
+            session, project_id, create_time_by_id, extract_creator=lister.extract_creator)
+    else:
+        create_times = [ts for ts in create_time_by_id.values() if ts]
+        min_create_time = min(create_times) if create_times else None
+        yield agent_ids, lister.get_agent_creators(session, project_id, agent_ids, min_create_time=min_create_time)
+
+
+def stream_agent_rows(lister, session, project_id, locations, options, snapshot=None):
+    """
+    Scans the project and yields one row per reported agent as soon as its creator is known.
+    With a snapshot (--incremental), creators of known agents are reused, only new agents are
+    looked up in audit logs, and the snapshot is updated as rows stream out.
+    """
+    previous_snapshot = snapshot.load(project_id, locations) if snapshot else {}
+    diff_counts = {"new": 0, "updated": 0, "unchanged": 0}
+    snapshot_batch = []
+
+    def finish(info):
+        if snapshot:
+            snapshot_batch.append(info)
+            if len(snapshot_batch) >= SNAPSHOT_BATCH_SIZE:
+                snapshot.upsert(project_id, snapshot_batch)
+                snapshot_batch.clear()
+        return info
+
+    # 1. Scan locations for engines and agents
+    monitor = ListingMonitor(session)
+    if options.concurrency > 1:
+        listings = async_scan.scan_listings(monitor, project_id, locations, lister.list_engines, lister.list_agents, options.concurrency)
+    else:
+        listings = lister.iter_listings(monitor, project_id, locations, lister.list_engines, lister.list_agents)
+
+    found = 0
+    pending = {}
+    pending_create_times = {}
+    for loc, engine_id, agents in listings:
+        extract_start = time.perf_counter()
+        infos = [lister.build_agent_info(agent, loc, engine_id) for agent in agents]
+        if lister.recorder:
+            lister.recorder.record_phase("payload extraction", extract_start, time.perf_counter() - extract_start,
+                                         args={"engine_id": engine_id, "agents": len(agents)})
+        for info in infos:
+            if info is None:
+                continue
+            found += 1
+            if snapshot:
+                diff_counts[snapshot_store.classify_agent(previous_snapshot, info)] += 1
+                # Reuse creators from the previous snapshot so only new agents need an audit log lookup;
+                # creators that were not found last time (stored as NULL) are looked up again
+                if not info["creator"] and info["resource_name"] in previous_snapshot:
+                    info["creator"] = previous_snapshot[info["resource_name"]]["creator"]
+            if info["creator"]:
+                yield finish(info)
+            else:
+                pending.setdefault(info["agent_id"], []).append(info)
+                pending_create_times[info["agent_id"]] = info["create_time_iso"]
+
+    # 2. Resolve creator emails from audit logs for unresolved agents, batch by batch
+    print(f"Found {found} no-code/low-code agents.", file=sys.stderr)
+    if pending:
+        log_source = "exported audit logs" if options.audit_log_dir else "Cloud Audit Logs"
+        print(f"Resolving {len(pending)} creator emails from {log_source}...", file=sys.stderr)
+        resolutions = iter_log_resolutions(lister, session, project_id, pending_create_times, options)
+        if lister.recorder:
+            resolutions = lister.recorder.timed_iter("audit-log resolution", resolutions)
+        for agent_ids, creators_map in resolutions:
+            for agent_id in agent_ids:
+                for info in pending.pop(agent_id, []):
+                    info["creator"] = creators_map.get(agent_id, UNRESOLVED_CREATOR)
+                    yield finish(info)
+        for infos in pending.values():
+            for info in infos:
+                info["creator"] = UNRESOLVED_CREATOR
+                yield finish(info)
+    elif snapshot:
+        print("No new or unresolved agents without a payload creator. Skipping Cloud Logging query.", file=sys.stderr)
+    else:
+        print("All creator emails resolved from agent definitions. Skipping Cloud Logging query.", file=sys.stderr)
+
+    if snapshot:
+        snapshot.upsert(project_id, snapshot_batch)
+        # Agents of an incomplete engine or location listing were not seen but may still exist
+        removed = snapshot.prune(project_id, locations, incomplete=monitor.incomplete)
+        print(f"Snapshot diff: {diff_counts['new']} new, {diff_counts['updated']} updated, "
+              f"{diff_counts['unchanged']} unchanged, {removed} removed.", file=sys.stderr)
+        if monitor.incomplete:
+            print(f"Warning: {len(monitor.incomplete)} engine or agent listing(s) were incomplete; "
+                  f"their snapshot rows were kept.", file=sys.stderr)
@@ -7,12 +7,22 @@ Combines fast payload metadata extraction with targeted Cloud Audit Log lookups.
 
 
 import argparse
-import csv
 import sys
 import os
+import time
 from datetime import datetime, timedelta
 import google.auth
-from google.auth.transport.requests import AuthorizedSession
+from google.auth.credentials import AnonymousCredentials
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ge_common import discoveryengine_client
+import instrumentation
+import inventory
+import org_scan
+import output_writers
+import request_layer
+import slim_fetch
+import snapshot_store
+import watch
 
 def load_env_file(filepath=".env"):
     """Loads environment variables from a .env file if it exists."""
@@ -44,13 +54,15 @@ def list_engines(session, project_id, location, timeout=30):
             if response.status_code in [403, 404]:
                 break
             if response.status_code != 200:
+                print(f"Warning: engine listing in {location} truncated after {len(engines)} engine(s) (HTTP {response.status_code}): {response.text}", file=sys.stderr)
                 break
             data = response.json()
             engines.extend(data.get("engines", []))
             next_page_token = data.get("nextPageToken")
             if not next_page_token:
                 break
-        except Exception:
+        except Exception as e:
+            print(f"Warning: engine listing in {location} truncated after {len(engines)} engine(s): {e}", file=sys.stderr)
             break
     return engines
 
@@ -66,16 +78,28 @@ def list_agents(session, project_id, location, engine_id, timeout=30):
         try:
             response = session.get(agents_url, params=params, timeout=timeout)
             if response.status_code != 200:
+                print(f"Warning: agent listing of engine {engine_id} truncated after {len(agents)} agent(s) (HTTP {response.status_code}): {response.text}", file=sys.stderr)
                 break
             data = response.json()
             agents.extend(data.get("agents", []))
             next_page_token = data.get("nextPageToken")
             if not next_page_token:
                 break
-        except Exception:
+        except Exception as e:
+            print(f"Warning: agent listing of engine {engine_id} truncated after {len(agents)} agent(s): {e}", file=sys.stderr)
             break
     return agents
 
+def iter_listings(session, project_id, locations, list_engines=list_engines, list_agents=list_agents):
+    """Sequentially scans locations and yields (location, engine_id, agents) for every engine."""
+    for loc in locations:
+        print(f"Scanning location: {loc} ...", file=sys.stderr)
+        engines = list_engines(session, project_id, loc)
+        for engine in engines:
+            engine_name = engine.get("name", "")
+            engine_id = engine_name.split("/")[-1]
+            yield loc, engine_id, list_agents(session, project_id, loc, engine_id)
+
 def get_agent_creators(session, project_id, agent_ids, min_create_time=None, timeout=30):
     """Retrieves agent creator emails from Cloud Audit Logs for specific agent IDs."""
     if not agent_ids:
@@ -193,6 +217,8 @@ def get_payload_email(agent, agent_type):
         return payload_author
     return None
 
+CSV_FIELDS = ["agent_id", "display_name", "description", "type", "engine_id", "location", "creator", "create_time"]
+
 def format_datetime(dt_str):
     """Formats ISO 8601 datetime string to YYYY-MM-DD HH:MM:SS format."""
     if not dt_str or dt_str == "N/A":
@@ -204,122 +230,113 @@ def format_datetime(dt_str):
     except Exception:
         return dt_str
 
+def scan_organization(args, session, lister, locations):
+    """Scans every project of an organization, folder or projects file and writes rows with a project_id column."""
+    if args.projects_file:
+        project_ids = org_scan.read_projects_file(args.projects_file)
+    else:
+        parent = f"organizations/{args.organization}" if args.organization else f"folders/{args.folder}"
+        print(f"Enumerating projects under {parent} ...", file=sys.stderr)
+        project_ids = org_scan.discover_projects(session, parent)
+    if not project_ids:
+        print("No projects to scan.", file=sys.stderr)
+        return
+
+    print(f"Scanning {len(project_ids)} project(s) with {args.project_workers} project worker(s) ...", file=sys.stderr)
+    start = time.perf_counter()
+    writer = output_writers.open_writer(args.format, ["project_id"] + CSV_FIELDS, output=args.output)
+    try:
+        timings = org_scan.scan_projects(lister, session, project_ids, locations, args, writer.write,
+                                         project_workers=args.project_workers)
+    finally:
+        writer.close()
+    org_scan.print_timing_summary(timings, time.perf_counter() - start)
+    session.report()
+    if writer.rows == 0:
+        print("No no-code agents found.", file=sys.stderr)
+
 def main():
     parser = argparse.ArgumentParser(description="List Gemini Enterprise agents and their creator emails.")
-    parser.add_argument("--project_id", help="Google Cloud Project ID. Defaults to detecting from environment.")
-    parser.add_argument("--format", choices=["table", "csv"], default="table", help="Output format (default: table).")
-    parser.add_argument("--location", help="Comma-separated list of GCP locations to scan. Overrides default/env.")
+    inventory.add_scan_arguments(parser)
+    parser.add_argument("--organization", help="Scan every active project under this organization ID (recursively through folders).")
+    parser.add_argument("--folder", help="Scan every active project under this folder ID (recursively).")
+    parser.add_argument("--projects-file", help="Scan the project IDs listed in this file (one per line).")
+    parser.add_argument("--project-workers", type=int, default=4, help="Projects scanned concurrently in multi-project mode (default: 4).")
     args = parser.parse_args()
+    inventory.validate_scan_arguments(parser, args)
+    if args.watch and (args.organization or args.folder or args.projects_file):
+        parser.error("--watch scans a single project")
+    if sum(bool(opt) for opt in (args.organization, args.folder, args.projects_file)) > 1:
+        parser.error("--organization, --folder and --projects-file are mutually exclusive")
+    if args.project_workers < 1:
+        parser.error("--project-workers must be at least 1")
 
     # Determine locations to scan
-    if args.location:
-        locations = [loc.strip() for loc in args.location.split(",") if loc.strip()]
-    else:
-        env_locations = os.getenv("LOCATION") or os.getenv("LOCATIONS")
-        if env_locations:
-            locations = [loc.strip() for loc in env_locations.split(",") if loc.strip()]
-        else:
-            locations = ["global", "us", "eu"]  # Broader default to scan common locations
+    locations = inventory.scan_locations(args)
+
+    recorder = instrumentation.Recorder(trace=bool(args.trace_out)) if args.stats or args.trace_out else None
 
     # Authenticate and detect project
     try:
-        credentials, auto_project_id = google.auth.default()
-        session = AuthorizedSession(credentials)
+        override = discoveryengine_client.endpoint_override()
+        if override:
+            # Local stand-in server (e.g. benchmark/fake_server.py): no Google login needed
+            credentials, auto_project_id = AnonymousCredentials(), None
+        else:
+            credentials, auto_project_id = google.auth.default()
+        # Rate-limited, retrying session shared by every listing and audit log worker
+        session = request_layer.RetryingSession(
+            discoveryengine_client.Session(discoveryengine_client.CredentialCache(credentials)),
+            rates={"discoveryengine": args.de_qps, "logging": args.log_rpm / 60.0},
+            max_in_flight=args.max_in_flight, max_retries=args.max_retries, endpoint_override=override,
+            recorder=recorder)
+        if args.slim:
+            session = slim_fetch.SlimSession(session, sample_pages=args.slim_sample_pages)
     except Exception as e:
         print(f"Authentication Error: {e}", file=sys.stderr)
         print("Please run 'gcloud auth application-default login' first.", file=sys.stderr)
         sys.exit(1)
 
+    lister = inventory.AgentLister(list_engines, list_agents, iter_listings, get_agent_type, get_payload_email,
+                                   get_agent_creators, format_datetime, recorder=recorder)
+
+    if args.organization or args.folder or args.projects_file:
+        scan_organization(args, session, lister, locations)
+        instrumentation.finish(recorder, args.stats, args.trace_out)
+        return
+
     project_id = args.project_id or os.getenv("GOOGLE_CLOUD_PROJECT") or os.getenv("PROJECT_ID") or auto_project_id
     if not project_id:
         print("Error: Project ID could not be detected. Please specify using --project_id <PROJECT_ID>.", file=sys.stderr)
         sys.exit(1)
 
     print(f"Scanning project: {project_id} ...", file=sys.stderr)
-    
-    # 1. Scan locations for engines and agents
-    all_agents_info = []
-    unresolved_agent_ids = []
-    unresolved_agent_create_times = []
-    
-    for loc in locations:
-        print(f"Scanning location: {loc} ...", file=sys.stderr)
-        engines = list_engines(session, project_id, loc)
-        for engine in engines:
-            engine_name = engine.get("name", "")
-            engine_id = engine_name.split("/")[-1]
-            agents = list_agents(session, project_id, loc, engine_id)
-            for agent in agents:
-                agent_name = agent.get("name", "")
-                agent_id = agent_name.split("/")[-1]
-                
-                # Check if it's code-based or no-code
-                agent_type = get_agent_type(agent)
-                
-                # Exclude ADK, A2A, Managed (1P), and other developer/integration agents
-                allowed_types = ["Low-Code", "No-Code", "Workflow", "Agent Designer"]
-                if agent_type not in allowed_types:
-                    continue
-                
-                # Try to get creator email from payload first
-                creator = get_payload_email(agent, agent_type)
-                
-                agent_info = {
-                    "agent_id": agent_id,
-                    "display_name": agent.get("displayName", ""),
-                    "description": agent.get("description", ""),
-                    "type": agent_type,
-                    "engine_id": engine_id,
-                    "location": loc,
-                    "creator": creator,
-                    "create_time": format_datetime(agent.get("createTime", "N/A"))
-                }
-                
-                all_agents_info.append(agent_info)
-                
-                if not creator:
-                    unresolved_agent_ids.append(agent_id)
-                    if agent.get("createTime"):
-                        unresolved_agent_create_times.append(agent.get("createTime"))
-
-    # 2. Resolve creator emails from Cloud Audit Logs for unresolved agents
-    print(f"Found {len(all_agents_info)} no-code/low-code agents.", file=sys.stderr)
-    if unresolved_agent_ids:
-        print(f"Resolving {len(unresolved_agent_ids)} creator emails from Cloud Audit Logs...", file=sys.stderr)
-        min_create_time = min(unresolved_agent_create_times) if unresolved_agent_create_times else None
-        creators_map = get_agent_creators(session, project_id, unresolved_agent_ids, min_create_time=min_create_time)
-        for info in all_agents_info:
-            if not info["creator"]:
-                info["creator"] = creators_map.get(info["agent_id"], "N/A (No log entry found)")
-    else:
-        print("All creator emails resolved from agent definitions. Skipping Cloud Logging query.", file=sys.stderr)
 
-    # 3. Output results
-    if not all_agents_info:
-        print("No no-code agents found.", file=sys.stderr)
+    if args.watch:
+        watch.run_watch(lister, session, project_id, locations, args)
+        session.report()
+        instrumentation.finish(recorder, args.stats, args.trace_out)
         return
 
-    if args.format == "csv":
-        writer = csv.DictWriter(sys.stdout, fieldnames=["agent_id", "display_name", "description", "type", "engine_id", "location", "creator", "create_time"])
-        writer.writeheader()
-        for info in all_agents_info:
-            writer.writerow(info)
-    else:
-        # Table format
-        template = "{:<22} | {:<30} | {:<50} | {:<25} | {:<30}"
-        print(template.format("Agent ID", "Agent Name", "Description", "Create Time", "Creator Email"))
-        print("-" * 170)
-        for info in all_agents_info:
-            desc = info["description"]
-            if len(desc) > 47:
-                desc = desc[:44] + "..."
-            print(template.format(
-                info["agent_id"],
-                info["display_name"],
-                desc,
-                info["create_time"],
-                info["creator"]
-            ))
+    snapshot = snapshot_store.SnapshotStore(args.snapshot) if args.incremental else None
+
+    # Scan, resolve creators and write rows as soon as each creator is known
+    writer = output_writers.open_writer(args.format, CSV_FIELDS, output=args.output)
+    try:
+        for info in inventory.stream_agent_rows(lister, session, project_id, locations, args, snapshot=snapshot):
+            writer.write(info)
+    finally:
+        writer.close()
+        if snapshot:
+            snapshot.close()
+    session.report()
+    instrumentation.finish(recorder, args.stats, args.trace_out)
+
+    if snapshot:
+        print(f"Updated inventory snapshot: {args.snapshot}", file=sys.stderr)
+    if writer.rows == 0:
+        print("No no-code agents found.", file=sys.stderr)
+        return
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,89 @@
+"""
+Offline resolution of agent creators from Cloud Audit Logs exported by a Log Router sink.
+Exported newline-delimited JSON files are memory-mapped, lines are pre-filtered for
+AgentService.CreateAgent before any JSON parsing, and files are parsed in parallel with a
+process pool. Entries go through the same extraction logic as the online resolver.
+"""
+
+import json
+import mmap
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from audit_logs import collect_creators, principal_email
+
+CREATE_AGENT_MARKER = b"AgentService.CreateAgent"
+
+LOG_FILE_SUFFIXES = (".json", ".jsonl", ".ndjson")
+
+
+def find_log_files(audit_log_dir):
+    """Recursively lists exported log files (e.g. cloudaudit.googleapis.com/activity/YYYY/MM/DD/*.json)."""
+    log_files = []
+    for root, _, files in os.walk(audit_log_dir):
+        for name in files:
+            if name.endswith(LOG_FILE_SUFFIXES):
+                log_files.append(os.path.join(root, name))
+    return sorted(log_files)
+
+
+def _iter_candidate_lines(mapped):
+    """Yields only the lines of a mapped file that contain the CreateAgent marker."""
+    pos = mapped.find(CREATE_AGENT_MARKER)
+    while pos != -1:
+        line_start = mapped.rfind(b"\n", 0, pos) + 1
+        line_end = mapped.find(b"\n", pos)
+        if line_end == -1:
+            line_end = len(mapped)
+        yield mapped[line_start:line_end]
+        pos = mapped.find(CREATE_AGENT_MARKER, line_end)
+
+
+def scan_log_file(path, agent_ids, extract_creator=principal_email):
+    """Returns {agent_id: (timestamp, creator)} for the requested agents found in one exported file."""
+    found = {}
+    try:
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return found
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for line in _iter_candidate_lines(mapped):
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if entry.get("protoPayload", {}).get("serviceName") != "discoveryengine.googleapis.com":
+                        continue
+                    creators = {}
+                    for agent_id in collect_creators([entry], extract_creator, creators):
+                        timestamp = entry.get("timestamp", "")
+                        if agent_id in agent_ids and (agent_id not in found or timestamp > found[agent_id][0]):
+                            found[agent_id] = (timestamp, creators[agent_id])
+    except OSError as e:
+        print(f"Warning: Could not read exported log file {path}: {e}", file=sys.stderr)
+    return found
+
+
+def get_agent_creators_offline(audit_log_dir, agent_ids, extract_creator=principal_email, workers=None):
+    """
+    Resolves agent creators from exported audit log files instead of logging.googleapis.com.
+    When several entries match an agent, the newest one wins, as in the online resolver.
+    """
+    if not agent_ids:
+        return {}
+    log_files = find_log_files(audit_log_dir)
+    if not log_files:
+        print(f"Warning: No exported log files found in {audit_log_dir}", file=sys.stderr)
+        return {}
+
+    wanted = frozenset(agent_ids)
+    print(f"Scanning {len(log_files)} exported log file(s) in {audit_log_dir} ...", file=sys.stderr)
+    found = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(scan_log_file, log_files, [wanted] * len(log_files),
+                               [extract_creator] * len(log_files), chunksize=4)
+        for file_found in results:
+            for agent_id, (timestamp, creator) in file_found.items():
+                if agent_id not in found or timestamp > found[agent_id][0]:
+                    found[agent_id] = (timestamp, creator)
+    return {agent_id: creator for agent_id, (_, creator) in found.items()}
@@ -0,0 +1,117 @@
+"""
+Organization-wide multi-project scanning for the agent lister.
+Enumerates projects under an organization or folder (recursively, via Cloud Resource Manager)
+or from a file, then scans them concurrently on one shared credential and connection pool,
+giving each project its own listing worker budget and its own batched audit log lookups.
+"""
+
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import async_scan
+import inventory
+import snapshot_store
+
+RESOURCE_MANAGER_URL = "https://cloudresourcemanager.googleapis.com/v3"
+
+
+def _list_paged(session, url, params, key, timeout=30):
+    items = []
+    next_page_token = ""
+    while True:
+        page_params = dict(params)
+        if next_page_token:
+            page_params["pageToken"] = next_page_token
+        try:
+            response = session.get(url, params=page_params, timeout=timeout)
+            if response.status_code != 200:
+                print(f"Error listing {url} for {params.get('parent')} (HTTP {response.status_code}): {response.text}", file=sys.stderr)
+                break
+            data = response.json()
+            items.extend(data.get(key, []))
+            next_page_token = data.get("nextPageToken")
+            if not next_page_token:
+                break
+        except Exception as e:
+            print(f"Exception while listing {url}: {e}", file=sys.stderr)
+            break
+    return items
+
+
+def discover_projects(session, parent):
+    """Recursively lists the IDs of all active projects under an organizations/ID or folders/ID parent."""
+    project_ids = []
+    parents = [parent]
+    while parents:
+        current = parents.pop()
+        for project in _list_paged(session, f"{RESOURCE_MANAGER_URL}/projects", {"parent": current}, "projects"):
+            if project.get("state", "ACTIVE") == "ACTIVE" and project.get("projectId"):
+                project_ids.append(project["projectId"])
+        for folder in _list_paged(session, f"{RESOURCE_MANAGER_URL}/folders", {"parent": current}, "folders"):
+            if folder.get("state", "ACTIVE") == "ACTIVE" and folder.get("name"):
+                parents.append(folder["name"])
+    return sorted(set(project_ids))
+
+
+def read_projects_file(path):
+    """Reads project IDs from a text file (one per line, '#' starts a comment)."""
+    project_ids = []
+    with open(path, "r") as f:
+        for line in f:
+            project_id = line.split("#", 1)[0].strip()
+            if project_id and project_id not in project_ids:
+                project_ids.append(project_id)
+    return project_ids
+
+
+def scan_projects(lister, session, project_ids, locations, options, write_row, project_workers=4):
+    """
+    Scans several projects concurrently and hands every row (tagged with project_id) to write_row.
+    Returns per-project timings as {project_id: {"agents", "seconds", "error"}}.
+    """
+    # One keep-alive pool sized for every project's listing workers
+    async_scan.configure_connection_pool(session, project_workers * options.concurrency)
+    write_lock = threading.Lock()
+
+    def scan_one(project_id):
+        print(f"Scanning project: {project_id} ...", file=sys.stderr)
+        start = time.perf_counter()
+        count = 0
+        snapshot = snapshot_store.SnapshotStore(options.snapshot) if options.incremental else None
+        try:
+            for info in inventory.stream_agent_rows(lister, session, project_id, locations, options, snapshot=snapshot):
+                info["project_id"] = project_id
+                with write_lock:
+                    write_row(info)
+                count += 1
+        finally:
+            if snapshot:
+                snapshot.close()
+        return count, time.perf_counter() - start
+
+    timings = {}
+    with ThreadPoolExecutor(max_workers=project_workers, thread_name_prefix="project") as executor:
+        futures = {executor.submit(scan_one, project_id): project_id for project_id in project_ids}
+        for future in as_completed(futures):
+            project_id = futures[future]
+            try:
+                count, seconds = future.result()
+                timings[project_id] = {"agents": count, "seconds": seconds, "error": None}
+            except Exception as e:
+                print(f"Error scanning project {project_id}: {e}", file=sys.stderr)
+                timings[project_id] = {"agents": 0, "seconds": 0.0, "error": str(e)}
+    return timings
+
+
+def print_timing_summary(timings, total_seconds, file=sys.stderr):
+    """Prints a per-project agent count and scan time summary, slowest project first."""
+    print("\nPer-project scan summary:", file=file)
+    template = "{:<40} | {:>8} | {:>10} | {}"
+    print(template.format("Project", "Agents", "Time (s)", "Status"), file=file)
+    print("-" * 80, file=file)
+    for project_id, timing in sorted(timings.items(), key=lambda item: -item[1]["seconds"]):
+        status = f"ERROR: {timing['error']}" if timing["error"] else "OK"
+        print(template.format(project_id, timing["agents"], f"{timing['seconds']:.1f}", status), file=file)
+    total_agents = sum(timing["agents"] for timing in timings.values())
+    print(f"Scanned {len(timings)} project(s), {total_agents} agent(s) in {total_seconds:.1f}s.", file=file)
@@ -0,0 +1,128 @@
+"""
+Streaming output writers for agent inventories.
+Each writer emits rows as soon as they are handed over, so inventories of any size are
+written with bounded memory. Supported formats: table, csv, jsonl and parquet (pyarrow).
+"""
+
+import csv
+import json
+import sys
+
+FORMATS = ["table", "csv", "jsonl", "parquet"]
+
+
+class TextWriter:
+    """Base class of the writers that emit text to a stream (stdout or an --output file)."""
+
+    def __init__(self, stream, fieldnames, owns_stream=False):
+        self.stream = stream
+        self.fieldnames = fieldnames
+        self.owns_stream = owns_stream
+        self.rows = 0
+
+    def close(self):
+        self.stream.flush()
+        if self.owns_stream:
+            self.stream.close()
+
+
+class TableWriter(TextWriter):
+    """Fixed-width table; the header is printed with the first row. Adds a Project column for multi-project scans."""
+
+    template = "{:<22} | {:<30} | {:<50} | {:<25} | {:<30}"
+    project_template = "{:<30} | "
+
+    def write(self, info):
+        with_project = "project_id" in self.fieldnames
+        if self.rows == 0:
+            header = self.template.format("Agent ID", "Agent Name", "Description", "Create Time", "Creator Email")
+            if with_project:
+                header = self.project_template.format("Project") + header
+            print(header, file=self.stream)
+            print("-" * (203 if with_project else 170), file=self.stream)
+        desc = info["description"]
+        if len(desc) > 47:
+            desc = desc[:44] + "..."
+        line = self.template.format(
+            info["agent_id"],
+            info["display_name"],
+            desc,
+            info["create_time"],
+            # Enriched WIF pipeline rows carry the resolved Entra email next to the raw creator identity
+            info.get("creator_email") or info["creator"]
+        )
+        if with_project:
+            line = self.project_template.format(info.get("project_id", "")) + line
+        print(line, file=self.stream)
+        self.rows += 1
+
+
+class CsvWriter(TextWriter):
+    """CSV with a header row, restricted to the given fieldnames."""
+
+    def __init__(self, stream, fieldnames, owns_stream=False):
+        super().__init__(stream, fieldnames, owns_stream)
+        self.writer = csv.DictWriter(stream, fieldnames=fieldnames, extrasaction="ignore")
+
+    def write(self, info):
+        if self.rows == 0:
+            self.writer.writeheader()
+        self.writer.writerow(info)
+        self.rows += 1
+
+
+class JsonlWriter(TextWriter):
+    """Newline-delimited JSON, one object per agent (loadable with `bq load --source_format=NEWLINE_DELIMITED_JSON`)."""
+
+    def write(self, info):
+        self.stream.write(json.dumps({field: info.get(field) for field in self.fieldnames}, ensure_ascii=False) + "\n")
+        self.rows += 1
+
+
+class ParquetWriter:
+    """Columnar Parquet file of string columns, written one row group at a time."""
+
+    def __init__(self, path, fieldnames, row_group_size=10000):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.fieldnames = fieldnames
+        self.schema = pa.schema([(field, pa.string()) for field in fieldnames])
+        self.writer = pq.ParquetWriter(path, self.schema, compression="snappy")
+        self.row_group_size = row_group_size
+        self.buffer = []
+        self.rows = 0
+
+    def write(self, info):
+        self.buffer.append({field: info.get(field) for field in self.fieldnames})
+        self.rows += 1
+        if len(self.buffer) >= self.row_group_size:
+            self._flush()
+
+    def _flush(self):
+        if self.buffer:
+            self.writer.write_table(self.pa.Table.from_pylist(self.buffer, schema=self.schema))
+            self.buffer = []
+
+    def close(self):
+        self._flush()
+        self.writer.close()
+
+
+def open_writer(fmt, fieldnames, output=None, row_group_size=10000):
+    """Opens a streaming writer for the format, writing to the output path or stdout."""
+    if fmt == "parquet":
+        if not output:
+            print("Error: --format parquet requires --output <path>.", file=sys.stderr)
+            sys.exit(1)
+        try:
+            return ParquetWriter(output, fieldnames, row_group_size=row_group_size)
+        except ImportError:
+            print("Error: --format parquet requires pyarrow. Install it with 'pip install pyarrow'.", file=sys.stderr)
+            sys.exit(1)
+
+    writer_class = {"table": TableWriter, "csv": CsvWriter, "jsonl": JsonlWriter}[fmt]
+    if output:
+        return writer_class(open(output, "w", newline="", encoding="utf-8"), fieldnames, owns_stream=True)
+    return writer_class(sys.stdout, fieldnames)
@@ -0,0 +1,186 @@
+"""
+Shared request layer for the Gemini Enterprise agent listers.
+Wraps the authorized session with a token-bucket rate limit and an AIMD concurrency limit per
+API (Discovery Engine, Cloud Logging, Resource Manager), retries HTTP 429/5xx and connection
+errors with jittered exponential backoff that honours Retry-After, and counts requests,
+retries and failures per endpoint so that truncated scans are visible.
+Setting GE_API_ENDPOINT_OVERRIDE (e.g. http://127.0.0.1:8080) sends every call to a local
+stand-in server such as benchmark/fake_server.py instead of googleapis.com.
+"""
+
+import random
+import sys
+import threading
+import time
+from email.utils import parsedate_to_datetime
+import os
+from urllib.parse import urlparse
+import requests
+from instrumentation import count_items_on_decode
+from rate_limit import AdaptiveConcurrencyLimiter, TokenBucket
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ge_common.discoveryengine_client import RETRYABLE_STATUS_CODES
+
+THROTTLING_STATUS_CODES = {429, 503}
+
+def api_for(url):
+    """Maps a Google API URL to the API whose quota it consumes (e.g. us-discoveryengine -> discoveryengine)."""
+    host = urlparse(url).hostname or ""
+    service = host.split(".")[0]
+    return service.split("-", 1)[-1] if service.endswith("discoveryengine") else service
+
+
+def endpoint_for(method, url):
+    """Returns a per-endpoint label for statistics, e.g. "discoveryengine GET agents"."""
+    segments = [segment for segment in urlparse(url).path.split("/") if segment]
+    # Collections and custom methods (engines, agents, entries:list) sit at odd depths below the version
+    collection = segments[-1] if len(segments) % 2 == 0 or ":" in segments[-1] else segments[-2]
+    return f"{api_for(url)} {method} {collection}"
+
+
+def parse_retry_after(value):
+    """Parses a Retry-After header given in seconds or as an HTTP date; returns seconds or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class EndpointStats:
+    """Thread-safe per-endpoint counters of requests, retries, throttling and failures."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+
+    def record(self, endpoint, key):
+        with self.lock:
+            counters = self.endpoints.setdefault(
+                endpoint, {"requests": 0, "retries": 0, "throttled": 0, "server_errors": 0, "failed": 0})
+            counters[key] += 1
+
+    def report(self, file=sys.stderr):
+        if not self.endpoints:
+            return
+        template = "{:<40} | {:>8} | {:>7} | {:>9} | {:>7} | {:>6}"
+        print("\nRequest summary:", file=file)
+        print(template.format("Endpoint", "Requests", "Retries", "Throttled", "5xx", "Failed"), file=file)
+        print("-" * 90, file=file)
+        for endpoint, c in sorted(self.endpoints.items()):
+            print(template.format(endpoint, c["requests"], c["retries"], c["throttled"], c["server_errors"], c["failed"]), file=file)
+        failed = sum(c["failed"] for c in self.endpoints.values())
+        if failed:
+            print(f"Warning: {failed} request(s) failed after retries; the inventory may be incomplete.", file=file)
+
+
+class RetryingSession:
+    """
+    Drop-in replacement for the authorized session used by the listers (get/post/request).
+    Each API gets its own token bucket and AIMD in-flight limit; other attributes (mount,
+    get_adapter, credentials, ...) are delegated to the wrapped session.
+    """
+
+    def __init__(self, session, rates=None, max_in_flight=32, max_retries=6, base_delay=1.0, max_delay=60.0,
+                 endpoint_override=None, recorder=None):
+        self.session = session
+        self.recorder = recorder
+        self.endpoint_override = (endpoint_override or "").rstrip("/")
+        self.rates = rates or {}
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stats = EndpointStats()
+        self.buckets = {}
+        self.limiters = {}
+        self.lock = threading.Lock()
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+    def _limits(self, api):
+        with self.lock:
+            if api not in self.buckets:
+                rate = self.rates.get(api, self.rates.get("default", 10.0))
+                self.buckets[api] = TokenBucket(rate=rate, capacity=max(1, int(rate)))
+                self.limiters[api] = AdaptiveConcurrencyLimiter(self.max_in_flight)
+            return self.buckets[api], self.limiters[api]
+
+    def _backoff(self, attempt):
+        # Full jitter: uniform in [0, min(max_delay, base * 2^attempt)]
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def request(self, method, url, **kwargs):
+        api = api_for(url)
+        endpoint = endpoint_for(method, url)
+        bucket, limiter = self._limits(api)
+        if self.endpoint_override:
+            # Keep the path (API version, project, location) so the stand-in server can route it
+            url = self.endpoint_override + urlparse(url)._replace(scheme="", netloc="").geturl()
+        for attempt in range(self.max_retries + 1):
+            bucket.acquire()
+            limiter.acquire()
+            throttled = False
+            try:
+                self.stats.record(endpoint, "requests")
+                started = time.perf_counter()
+                try:
+                    response = self.session.request(method, url, **kwargs)
+                except Exception:
+                    if self.recorder:
+                        self.recorder.record_call(endpoint, None, started, time.perf_counter() - started, 0)
+                    raise
+                if self.recorder:
+                    elapsed = time.perf_counter() - started
+                    event = self.recorder.record_call(endpoint, response.status_code, started, elapsed, len(response.content))
+                    count_items_on_decode(self.recorder, endpoint, response, event)
+                throttled = response.status_code in THROTTLING_STATUS_CODES
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == self.max_retries:
+                    self.stats.record(endpoint, "failed")
+                    raise
+                self.stats.record(endpoint, "retries")
+                delay = self._backoff(attempt)
+                print(f"Retrying {endpoint} in {delay:.1f}s after {type(e).__name__}", file=sys.stderr)
+                time.sleep(delay)
+                continue
+            finally:
+                limiter.release(throttled=throttled)
+
+            if response.status_code not in RETRYABLE_STATUS_CODES:
+                return response
+            self.stats.record(endpoint, "throttled" if response.status_code == 429 else "server_errors")
+            if attempt == self.max_retries:
+                break
+            self.stats.record(endpoint, "retries")
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            delay = min(self.max_delay, retry_after) if retry_after is not None else self._backoff(attempt)
+            if response.status_code == 429:
+                # Quota exhausted: hold back every worker of this API, not just this one
+                bucket.pause(delay)
+            time.sleep(delay)
+        self.stats.record(endpoint, "failed")
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def failures(self):
+        """Returns how many requests have failed after all retries so far."""
+        with self.stats.lock:
+            return sum(counters["failed"] for counters in self.stats.endpoints.values())
+
+    def report(self, file=sys.stderr):
+        """Prints per-endpoint request, retry and failure counts."""
+        self.stats.report(file=file)
+
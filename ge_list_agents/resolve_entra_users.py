@@ -9,6 +9,9 @@ import argparse
 import requests
 
 import os
+import graph_batch
+import identity_cache
+import directory_sync
 
 def load_env_file(filepath=".env"):
     """Loads environment variables from a .env file if it exists."""
@@ -32,7 +35,13 @@ CLIENT_SECRET = os.getenv("AZURE_CLIENT_SECRET") or os.getenv("CLIENT_SECRET")
 # ---------------------------------------------------------
 
 
-def get_access_token(tenant_id, client_id, client_secret):
+def get_access_token(tenant_id, client_id, client_secret, cache=None):
+    cache_key = f"{tenant_id}:{client_id}"
+    if cache:
+        token = cache.get_token(cache_key)
+        if token:
+            print("Using cached Microsoft Graph API access token.", file=sys.stderr)
+            return token
     token_url = f"https://login.microsoftonline.com/{tenant_id}/oauth2/v2.0/token"
     token_data = {
         "grant_type": "client_credentials",
@@ -45,33 +54,108 @@ def get_access_token(tenant_id, client_id, client_secret):
         if res.status_code != 200:
             print(f"Error fetching token (HTTP {res.status_code}): {res.text}", file=sys.stderr)
             return None
-        return res.json().get("access_token")
+        data = res.json()
+        token = data.get("access_token")
+        if cache and token:
+            cache.store_token(cache_key, token, data.get("expires_in", 3600))
+        return token
     except Exception as e:
         print(f"Exception during token fetch: {e}", file=sys.stderr)
         return None
 
-def resolve_uuid(access_token, uuid):
+def lookup_uuid(access_token, uuid, session=requests):
+    """Returns (email, name, user); user is the Graph user object, {} if not found, None on errors."""
     headers = {"Authorization": f"Bearer {access_token}"}
     graph_url = f"https://graph.microsoft.com/v1.0/users/{uuid}"
     try:
-        res = requests.get(graph_url, headers=headers)
+        res = session.get(graph_url, headers=headers)
         if res.status_code == 404:
-            return None, "User not found"
+            return None, "User not found", {}
         if res.status_code != 200:
-            return None, f"HTTP Error {res.status_code}: {res.text}"
+            return None, f"HTTP Error {res.status_code}: {res.text}", None
         data = res.json()
-        email = data.get("mail") or data.get("userPrincipalName") or "N/A"
-        name = data.get("displayName") or "N/A"
-        return email, name
+        email, name = graph_batch.parse_user(data)
+        return email, name, data
+    except Exception as e:
+        return None, f"Exception: {e}", None
+
+def resolve_uuid(access_token, uuid, session=requests):
+    email, name, _ = lookup_uuid(access_token, uuid, session=session)
+    return email, name
+
+def acquire_token(cache):
+    print("Acquiring Microsoft Graph API access token...", file=sys.stderr)
+    token = get_access_token(TENANT_ID, CLIENT_ID, CLIENT_SECRET, cache=cache)
+    if not token:
+        print("Error: Failed to obtain access token.", file=sys.stderr)
+        sys.exit(1)
+    return token
+
+def resolve_from_graph(args, uuids, cache, report):
+    """Answers fresh cache entries first; only misses and expired entries go to Microsoft Graph."""
+    misses = uuids
+    if cache:
+        cached = cache.lookup(uuids)
+        for uuid in uuids:
+            if uuid in cached:
+                user = cached[uuid]
+                email, name = graph_batch.parse_user(user) if user else (None, "User not found")
+                report(uuid, email, name)
+        misses = [uuid for uuid in uuids if uuid not in cached]
+
+    if misses:
+        token = acquire_token(cache)
+        session = graph_batch.create_session(pool_size=max(10, args.workers))
+        if args.batch:
+            batches = graph_batch.iter_resolved_batches(session, token, misses, batch_size=args.batch_size, workers=args.workers)
+        else:
+            batches = ({uuid: lookup_uuid(token, uuid, session=session)} for uuid in misses)
+        for results in batches:
+            for uuid, (email, name, _) in results.items():
+                report(uuid, email, name)
+            if cache:
+                cache.store({uuid: user for uuid, (_, _, user) in results.items() if user is not None})
+
+    if cache:
+        print(f"Identity cache: {cache.hits} hit(s), {cache.misses} miss(es) ({args.cache}).", file=sys.stderr)
+
+def resolve_from_directory(args, uuids, cache, report):
+    """Syncs the local tenant directory index with Graph delta queries, then resolves every UUID locally."""
+    token = acquire_token(cache)
+    index = directory_sync.DirectoryIndex(args.directory_index)
+    try:
+        directory_sync.sync_directory(graph_batch.create_session(), token, index, TENANT_ID)
     except Exception as e:
-        return None, f"Exception: {e}"
+        print(f"Error syncing directory: {e}", file=sys.stderr)
+        index.close()
+        sys.exit(1)
+    for uuid in uuids:
+        user = index.lookup(uuid)
+        email, name = graph_batch.parse_user(user) if user else (None, "User not found")
+        report(uuid, email, name)
+    index.close()
 
 def main():
     import os
     parser = argparse.ArgumentParser(description="Resolve Entra ID user UUIDs using Microsoft Graph API.")
     parser.add_argument("uuids", nargs="+", help="One or more User UUIDs to resolve, or a path to a text file containing UUIDs (one per line).")
     parser.add_argument("--output", default="resolved_emails.txt", help="Path to write resolved email addresses (default: resolved_emails.txt).")
+    parser.add_argument("--batch", action="store_true", help="Resolve UUIDs with concurrent Microsoft Graph $batch requests instead of one request per UUID.")
+    parser.add_argument("--batch-size", type=int, default=graph_batch.MAX_BATCH_SIZE, help="Lookups per $batch request with --batch (default and maximum: 20).")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent $batch requests with --batch (default: 4).")
+    parser.add_argument("--cache", default="identity_cache.db", help="Path to the SQLite identity and token cache (default: identity_cache.db).")
+    parser.add_argument("--cache-ttl", type=float, default=168, help="Hours a resolved identity stays cached (default: 168, one week).")
+    parser.add_argument("--negative-ttl", type=float, default=24, help="Hours a 'User not found' result stays cached (default: 24).")
+    parser.add_argument("--no-cache", action="store_true", help="Always query Microsoft Graph and fetch a new access token.")
+    parser.add_argument("--directory-sync", action="store_true", help="Sync all tenant users into a local index via Graph delta queries and resolve UUIDs locally.")
+    parser.add_argument("--directory-index", default="directory_index.db", help="Path to the local directory index used by --directory-sync (default: directory_index.db).")
     args = parser.parse_args()
+    if not 1 <= args.batch_size <= graph_batch.MAX_BATCH_SIZE:
+        parser.error(f"--batch-size must be between 1 and {graph_batch.MAX_BATCH_SIZE}")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.cache_ttl < 0 or args.negative_ttl < 0:
+        parser.error("--cache-ttl and --negative-ttl must not be negative")
     
     if not all([TENANT_ID, CLIENT_ID, CLIENT_SECRET]) or "YOUR_" in str(TENANT_ID) or "YOUR_" in str(CLIENT_ID) or "YOUR_" in str(CLIENT_SECRET):
         print("Error: Azure credentials must be configured in a .env file or set as environment variables.", file=sys.stderr)
@@ -91,27 +175,33 @@ def main():
     else:
         uuids = args.uuids
 
+    uuids = graph_batch.dedupe(uuids)
     if not uuids:
         print("No UUIDs to resolve.", file=sys.stderr)
         sys.exit(0)
 
-    print("Acquiring Microsoft Graph API access token...", file=sys.stderr)
-    token = get_access_token(TENANT_ID, CLIENT_ID, CLIENT_SECRET)
-    if not token:
-        print("Error: Failed to obtain access token.", file=sys.stderr)
-        sys.exit(1)
-        
+    cache = None if args.no_cache else identity_cache.IdentityCache(
+        args.cache, ttl_seconds=args.cache_ttl * 3600, negative_ttl_seconds=args.negative_ttl * 3600)
+
     resolved_emails = []
-    print(f"Resolving {len(uuids)} identities...", file=sys.stderr)
-    print("-" * 80, file=sys.stderr)
-    for uuid in uuids:
-        email, name = resolve_uuid(token, uuid)
+
+    def report(uuid, email, name):
         if email and email != "N/A":
             print(f"{uuid} -> {email} ({name})", file=sys.stderr)
             resolved_emails.append(email)
         else:
             print(f"{uuid} -> Failed ({name})", file=sys.stderr)
 
+    print(f"Resolving {len(uuids)} identities...", file=sys.stderr)
+    print("-" * 80, file=sys.stderr)
+
+    if args.directory_sync:
+        resolve_from_directory(args, uuids, cache, report)
+    else:
+        resolve_from_graph(args, uuids, cache, report)
+    if cache:
+        cache.close()
+
     if resolved_emails:
         try:
             with open(args.output, "w") as f:
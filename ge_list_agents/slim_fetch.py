@@ -0,0 +1,236 @@
+"""
+Slim fetch mode for the Discovery Engine list calls (--slim).
+Engine and agent listings request partial responses (`fields=`) holding only the keys the
+listers read (name, displayName, description, create/update time and the payload owner of
+each reported agent type) and ask for gzip-compressed bodies. Pages are decoded with orjson
+when it is installed and projected to the same keys, so full definition blobs are never kept.
+Unreported types are identified by one small marker field of their definition. A definition
+none of whose masked fields is set is left out of a partial response entirely, so agents that
+come back without any definition are fetched again in full: reported agents without a payload
+owner (the ones that need an audit log lookup) and unreported agents without a marker field.
+A few pages are also fetched in full to estimate the bytes saved versus full mode and to check
+that the partial responses still identify every reported agent.
+"""
+
+import json
+import sys
+import threading
+from request_layer import endpoint_for
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Payload owner field path of every reported agent type (see get_payload_email)
+OWNER_FIELDS = {
+    "lowCodeAgentDefinition": ("ownerName",),
+    "noCodeAgentDefinition": ("owner",),
+    "workflowAgentDefinition": ("owner",),
+    "agentDesignerAgentDefinition": ("chatAgentDefinition", "owner"),
+}
+# Definitions of the types get_agent_type knows but the listers do not report
+UNREPORTED_DEFINITIONS = ("adkAgentDefinition", "a2aAgentDefinition", "managedAgentDefinition",
+                          "skillAgentDefinition", "dialogflowAgentDefinition", "iframeAgentDefinition",
+                          "httpAgentDefinition", "appAgentDefinition", "longRunningAgentDefinition")
+# Small field that marks the type of an unreported definition; types not listed here are fetched in full
+TYPE_MARKER_FIELDS = {
+    "adkAgentDefinition": "provisionedReasoningEngine",
+    "a2aAgentDefinition": "jsonAgentCard",
+    "skillAgentDefinition": "owner",
+}
+AGENT_KEYS = ("name", "displayName", "description", "createTime", "updateTime")
+
+ENGINE_FIELDS = "nextPageToken,engines(name)"
+OWNER_MASK = ["/".join((definition,) + path) for definition, path in OWNER_FIELDS.items()]
+AGENT_FIELDS = "nextPageToken,agents({})".format(",".join(
+    list(AGENT_KEYS) + [f"{definition}/{field}" for definition, field in TYPE_MARKER_FIELDS.items()] + OWNER_MASK))
+# Used instead when the API rejects a marker field (HTTP 400): unreported definitions are requested whole
+FALLBACK_AGENT_FIELDS = "nextPageToken,agents({})".format(",".join(
+    list(AGENT_KEYS) + list(UNREPORTED_DEFINITIONS) + OWNER_MASK))
+
+# Google APIs only compress responses for clients whose User-Agent contains "gzip"
+GZIP_HEADERS = {"Accept-Encoding": "gzip", "User-Agent": "ge-list-agents (gzip)"}
+
+
+def loads(data):
+    """Decodes a JSON body, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def slim_agent(agent):
+    """
+    Projects an agent resource to the keys the listers read. Definitions of reported types keep
+    only their owner field; other definitions are kept as empty markers so the type still resolves.
+    """
+    slim = {key: agent[key] for key in AGENT_KEYS if key in agent}
+    for key, value in agent.items():
+        if not key.endswith("AgentDefinition"):
+            continue
+        slim[key] = {}
+        path = OWNER_FIELDS.get(key)
+        if path and isinstance(value, dict):
+            node, target = value, slim[key]
+            for part in path[:-1]:
+                node = node.get(part)
+                if not isinstance(node, dict):
+                    break
+                target = target.setdefault(part, {})
+            else:
+                if path[-1] in node:
+                    target[path[-1]] = node[path[-1]]
+    return slim
+
+
+def has_definition(agent):
+    """True when the agent resource carries any *AgentDefinition key."""
+    return any(key.endswith("AgentDefinition") for key in agent)
+
+
+def reported_definition_keys(agents):
+    """Returns {agent name: sorted definition keys of reported types (OWNER_FIELDS)} of a page's agents."""
+    return {agent.get("name"): sorted(key for key in agent if key in OWNER_FIELDS) for agent in agents}
+
+
+def wire_bytes(response):
+    """Bytes read off the wire for a consumed response (compressed size when gzipped)."""
+    try:
+        return int(response.raw.tell()) or len(response.content)
+    except Exception:
+        return len(response.content)
+
+
+class SlimSession:
+    """
+    Wraps the scanner session so that engine and agent listings are fetched slim; every other
+    call (audit logs, Resource Manager) and attribute is passed through unchanged.
+    """
+
+    def __init__(self, session, sample_pages=1):
+        self.session = session
+        self.sample_pages = sample_pages
+        self.lock = threading.Lock()
+        self.pages = 0
+        self.wire_bytes = 0
+        self.decoded_bytes = 0
+        self.agent_wire_bytes = 0
+        self.sampled = 0
+        self.sample_slim_bytes = 0
+        self.sample_full_bytes = 0
+        self.refetched = 0
+        self.refetch_wire_bytes = 0
+        self.agent_fields = AGENT_FIELDS
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+    def get(self, url, params=None, **kwargs):
+        endpoint = endpoint_for("GET", url)
+        if not endpoint.startswith("discoveryengine GET ") or endpoint.split()[-1] not in ("engines", "agents"):
+            return self.session.get(url, params=params, **kwargs)
+        key = endpoint.split()[-1]
+        headers = dict(kwargs.pop("headers", None) or {}, **GZIP_HEADERS)
+        agent_fields = self.agent_fields
+        slim_params = dict(params or {}, fields=ENGINE_FIELDS if key == "engines" else agent_fields)
+        response = self.session.get(url, params=slim_params, headers=headers, **kwargs)
+        if response.status_code == 400 and key == "agents" and agent_fields != FALLBACK_AGENT_FIELDS:
+            with self.lock:
+                if self.agent_fields != FALLBACK_AGENT_FIELDS:
+                    self.agent_fields = FALLBACK_AGENT_FIELDS
+                    print("Warning: the agent field mask was rejected (HTTP 400); --slim now requests "
+                          "unreported agent definitions whole.", file=sys.stderr)
+            response = self.session.get(url, params=dict(params or {}, fields=FALLBACK_AGENT_FIELDS),
+                                        headers=headers, **kwargs)
+        if response.status_code != 200:
+            return response
+
+        data = loads(response.content)
+        num_bytes = wire_bytes(response)
+        if key == "agents":
+            # Servers that ignore the field mask still only leave the slim keys in memory
+            agents = []
+            for agent in data.get("agents", []):
+                if not has_definition(agent):
+                    agent, refetch_bytes = self._refetch_agent(url, agent, headers, kwargs)
+                    num_bytes += refetch_bytes
+                agents.append(slim_agent(agent))
+            data["agents"] = agents
+        with self.lock:
+            self.pages += 1
+            self.wire_bytes += num_bytes
+            self.decoded_bytes += len(response.content)
+            if key == "agents":
+                self.agent_wire_bytes += num_bytes
+            sample = key == "agents" and self.sampled < self.sample_pages
+            if sample:
+                self.sampled += 1
+        if sample:
+            self._sample_full_page(url, params, kwargs, data["agents"], num_bytes)
+        if hasattr(response, "record_page"):
+            # --stats/--trace-out: count the page's items from this decode instead of a second parse
+            response.record_page(data)
+        # The listers only call .json() on the page, so hand them the decoded slim page
+        response.json = lambda **_: data
+        return response
+
+    def _refetch_agent(self, list_url, agent, headers, kwargs):
+        """
+        Fetches an agent whose partial response carries no definition in full; returns the agent
+        (the partial one if the fetch fails) and the bytes read.
+        """
+        agent_url = list_url.split("/v1alpha/")[0] + "/v1alpha/" + agent.get("name", "")
+        try:
+            response = self.session.get(agent_url, headers=headers, **kwargs)
+            if response.status_code != 200:
+                print(f"Warning: full fetch of {agent.get('name')} for --slim failed (HTTP {response.status_code}); "
+                      "its type is unknown.", file=sys.stderr)
+                return agent, 0
+            full, num_bytes = loads(response.content), wire_bytes(response)
+        except Exception as e:
+            print(f"Warning: full fetch of {agent.get('name')} for --slim failed: {e}", file=sys.stderr)
+            return agent, 0
+        with self.lock:
+            self.refetched += 1
+            self.refetch_wire_bytes += num_bytes
+        return full, num_bytes
+
+    def _sample_full_page(self, url, params, kwargs, slim_agents, slim_bytes):
+        """Fetches one page without the field mask or gzip to compare size and agent types."""
+        try:
+            response = self.session.get(url, params=params, **kwargs)
+            if response.status_code != 200:
+                return
+            full_agents = [slim_agent(agent) for agent in loads(response.content).get("agents", [])]
+            full_bytes = wire_bytes(response)
+        except Exception as e:
+            print(f"Warning: full-page sample for --slim failed: {e}", file=sys.stderr)
+            return
+        # Only reported types matter: other agents are dropped from the inventory either way
+        expected, actual = reported_definition_keys(full_agents), reported_definition_keys(slim_agents)
+        mismatched = sum(1 for name, keys in expected.items() if actual.get(name) != keys)
+        with self.lock:
+            self.sample_slim_bytes += slim_bytes
+            self.sample_full_bytes += full_bytes
+        if mismatched:
+            print(f"Warning: {mismatched} agent(s) lost their type in the slim response; "
+                  "rerun without --slim for a complete inventory.", file=sys.stderr)
+
+    def report(self, file=sys.stderr):
+        """Prints the wrapped session's report, then the slim listing byte counts and savings."""
+        if hasattr(self.session, "report"):
+            self.session.report(file=file)
+        with self.lock:
+            pages, wire, decoded, agent_wire = self.pages, self.wire_bytes, self.decoded_bytes, self.agent_wire_bytes
+            slim_sample, full_sample = self.sample_slim_bytes, self.sample_full_bytes
+            refetched, refetch_wire = self.refetched, self.refetch_wire_bytes
+        print(f"\nSlim fetch: {pages} listing page(s), {wire / 1e6:.2f} MB on the wire "
+              f"({decoded / 1e6:.2f} MB decoded, {'orjson' if orjson else 'json'}).", file=file)
+        if refetched:
+            print(f"{refetched} agent(s) without a definition in the partial response were fetched in full "
+                  f"({refetch_wire / 1e6:.2f} MB).", file=file)
+        if slim_sample:
+            ratio = full_sample / slim_sample
+            print(f"Sampled full agent pages were {ratio:.1f}x larger: about {agent_wire * (ratio - 1) / 1e6:.2f} MB "
+                  "saved versus full mode.", file=file)
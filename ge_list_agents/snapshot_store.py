@@ -0,0 +1,112 @@
+"""
+Local SQLite snapshot of the agent inventory, keyed by agent resource name.
+Used by the --incremental mode of the agent listers: listings are diffed against the
+previous snapshot so that Cloud Audit Logs are only queried for agents that are new.
+"""
+
+import sqlite3
+from datetime import datetime, timezone
+
+UNRESOLVED_PREFIX = "N/A"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS agents (
+    name TEXT PRIMARY KEY,
+    project_id TEXT NOT NULL,
+    location TEXT NOT NULL,
+    engine_id TEXT NOT NULL,
+    agent_id TEXT NOT NULL,
+    type TEXT,
+    display_name TEXT,
+    description TEXT,
+    create_time TEXT,
+    update_time TEXT,
+    creator TEXT,
+    last_seen TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS agents_project_location ON agents (project_id, location);
+"""
+
+
+class SnapshotStore:
+    """Reads and writes the agent inventory snapshot for one or more projects."""
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        self.seen_at = datetime.now(timezone.utc).isoformat()
+
+    def load(self, project_id, locations):
+        """Returns the previous snapshot rows of a project's locations keyed by agent resource name."""
+        placeholders = ",".join("?" for _ in locations)
+        cursor = self.conn.execute(
+            f"SELECT * FROM agents WHERE project_id = ? AND location IN ({placeholders})",
+            [project_id, *locations],
+        )
+        return {row["name"]: dict(row) for row in cursor}
+
+    def upsert(self, project_id, agents_info):
+        """Writes a batch of current listing rows, stamping them as seen in this run."""
+        rows = []
+        for info in agents_info:
+            creator = info.get("creator")
+            if creator and creator.startswith(UNRESOLVED_PREFIX):
+                creator = None
+            rows.append((
+                info["resource_name"], project_id, info["location"], info["engine_id"], info["agent_id"],
+                info["type"], info["display_name"], info["description"],
+                info["create_time_iso"], info["update_time"], creator, self.seen_at,
+            ))
+        with self.conn:
+            self.conn.executemany(
+                """INSERT INTO agents (name, project_id, location, engine_id, agent_id, type, display_name,
+                                       description, create_time, update_time, creator, last_seen)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(name) DO UPDATE SET
+                       location = excluded.location, engine_id = excluded.engine_id, type = excluded.type,
+                       display_name = excluded.display_name, description = excluded.description,
+                       create_time = excluded.create_time, update_time = excluded.update_time,
+                       creator = COALESCE(excluded.creator, agents.creator), last_seen = excluded.last_seen""",
+                rows,
+            )
+
+    def prune(self, project_id, locations, incomplete=()):
+        """
+        Drops agents of the scanned locations that were not seen in this run; returns how many.
+        incomplete holds (location, engine_id) scopes whose listing did not finish, with engine_id
+        None for a whole location; their rows are kept.
+        """
+        skipped = {location for location, engine_id in incomplete if engine_id is None}
+        locations = [location for location in locations if location not in skipped]
+        if not locations:
+            return 0
+        engines = [(location, engine_id) for location, engine_id in incomplete
+                   if engine_id is not None and location in locations]
+        placeholders = ",".join("?" for _ in locations)
+        kept = "".join(" AND NOT (location = ? AND engine_id = ?)" for _ in engines)
+        with self.conn:
+            cursor = self.conn.execute(
+                f"DELETE FROM agents WHERE project_id = ? AND location IN ({placeholders}) AND last_seen != ?{kept}",
+                [project_id, *locations, self.seen_at, *(value for scope in engines for value in scope)],
+            )
+        return cursor.rowcount
+
+    def save(self, project_id, locations, agents_info, incomplete=()):
+        """Upserts the full current listing and drops agents that disappeared from the scanned locations."""
+        self.upsert(project_id, agents_info)
+        return self.prune(project_id, locations, incomplete)
+
+    def close(self):
+        self.conn.close()
+
+
+def classify_agent(previous, info):
+    """Classifies a listed agent against the previous snapshot as new, updated or unchanged."""
+    snapshot_row = previous.get(info["resource_name"])
+    if snapshot_row is None:
+        return "new"
+    if snapshot_row["update_time"] != info["update_time"]:
+        return "updated"
+    return "unchanged"
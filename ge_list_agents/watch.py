@@ -0,0 +1,125 @@
+"""
+Watch mode for the agent listers (--watch).
+Keeps one authenticated session, re-lists engines and agents on a jittered interval and diffs
+the listing against in-memory state keyed by agent resource name and updateTime. Creators are
+only resolved for added agents, so a quiet cycle costs nothing but the listing calls.
+Changes are emitted as JSONL events (added, removed, updated).
+"""
+
+import json
+import random
+import sys
+import time
+from datetime import datetime, timezone
+import async_scan
+import inventory
+
+EVENT_FIELDS = ["agent_id", "display_name", "description", "type", "engine_id", "location", "creator",
+                "create_time", "update_time", "resource_name"]
+
+def list_current(lister, session, project_id, locations, options):
+    """
+    Lists every reported agent once without resolving creators; returns ({resource_name: info},
+    monitor) where monitor records the listing calls that did not complete.
+    """
+    monitor = inventory.ListingMonitor(session)
+    if options.concurrency > 1:
+        listings = async_scan.scan_listings(monitor, project_id, locations, lister.list_engines, lister.list_agents, options.concurrency)
+    else:
+        listings = lister.iter_listings(monitor, project_id, locations, lister.list_engines, lister.list_agents)
+    current = {}
+    for loc, engine_id, agents in listings:
+        for agent in agents:
+            info = lister.build_agent_info(agent, loc, engine_id)
+            if info is not None:
+                current[info["resource_name"]] = info
+    return current, monitor
+
+
+def resolve_added_creators(lister, session, project_id, added, options):
+    """Fills in creators of added agents: payload owner first, then the selected audit log resolver."""
+    pending = {}
+    for info in added:
+        if not info["creator"]:
+            pending.setdefault(info["agent_id"], []).append(info)
+    if not pending:
+        return
+    create_times = {agent_id: infos[0]["create_time_iso"] for agent_id, infos in pending.items()}
+    for agent_ids, creators in inventory.iter_log_resolutions(lister, session, project_id, create_times, options):
+        for agent_id in agent_ids:
+            for info in pending.pop(agent_id, []):
+                info["creator"] = creators.get(agent_id, inventory.UNRESOLVED_CREATOR)
+    for infos in pending.values():
+        for info in infos:
+            info["creator"] = inventory.UNRESOLVED_CREATOR
+
+
+def diff(previous, current):
+    """Returns (added, removed, updated) lists of infos; updated pairs are (old, new)."""
+    added = [info for name, info in current.items() if name not in previous]
+    removed = [info for name, info in previous.items() if name not in current]
+    updated = [(previous[name], info) for name, info in current.items()
+               if name in previous and previous[name]["update_time"] != info["update_time"]]
+    return added, removed, updated
+
+
+def watch_inventory(lister, session, project_id, locations, options, stream, interval=300.0, jitter=0.1,
+                    cycles=None, emit_initial=False):
+    """
+    Polls the inventory until interrupted (or for `cycles` cycles) and writes one JSON event per
+    change to stream. The first cycle only builds the baseline unless emit_initial is set.
+    """
+    def emit(event, info, **extra):
+        record = {"event": event, "observed_at": datetime.now(timezone.utc).isoformat(), "project_id": project_id,
+                  **{field: info.get(field) for field in EVENT_FIELDS}, **extra}
+        stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+        stream.flush()
+
+    state = None
+    cycle = 0
+    while cycles is None or cycle < cycles:
+        cycle += 1
+        start = time.perf_counter()
+        current, monitor = list_current(lister, session, project_id, locations, options)
+
+        if state is None and not emit_initial:
+            state = current
+            print(f"Watch baseline: {len(current)} agent(s). Polling every ~{interval:.0f}s ...", file=sys.stderr)
+        else:
+            added, removed, updated = diff(state or {}, current)
+            # A failed or denied listing call makes agents look deleted: keep them until a clean cycle
+            kept = [info for info in removed if monitor.covers(info)]
+            if kept:
+                for info in kept:
+                    current[info["resource_name"]] = info
+                removed = [info for info in removed if not monitor.covers(info)]
+                print(f"Warning: {len(monitor.incomplete)} engine or agent listing(s) incomplete this cycle; "
+                      f"{len(kept)} possible removal(s) there are not reported.", file=sys.stderr)
+            resolve_added_creators(lister, session, project_id, added, options)
+            for info in added:
+                emit("added", info)
+            for old, new in updated:
+                new["creator"] = new["creator"] or old["creator"]
+                emit("updated", new, previous_update_time=old["update_time"])
+            for info in removed:
+                emit("removed", info)
+            state = current
+            print(f"Watch cycle {cycle}: {len(added)} added, {len(updated)} updated, {len(removed)} removed "
+                  f"({len(current)} agent(s), {time.perf_counter() - start:.1f}s).", file=sys.stderr)
+
+        if cycles is not None and cycle >= cycles:
+            break
+        time.sleep(max(0.0, interval * (1 + random.uniform(-jitter, jitter))))
+
+
+def run_watch(lister, session, project_id, locations, options):
+    """Runs --watch with the parsed options, writing events to --output or stdout until Ctrl+C."""
+    stream = open(options.output, "a", encoding="utf-8") if options.output else sys.stdout
+    try:
+        watch_inventory(lister, session, project_id, locations, options, stream, interval=options.watch_interval,
+                        jitter=options.watch_jitter, cycles=options.watch_cycles, emit_initial=options.watch_emit_initial)
+    except KeyboardInterrupt:
+        print("\nStopped watching.", file=sys.stderr)
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
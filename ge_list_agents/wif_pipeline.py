@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Single-command Workforce Identity Federation (WIF) inventory pipeline.
+Scans Gemini Enterprise no-code agents with the WIF lister and streams every creator UUID
+into a concurrent Microsoft Graph $batch resolver as soon as it is discovered, so Entra ID
+resolution overlaps with engine listing and audit log paging. Emits enriched inventory rows
+(agent + creator email + creator display name).
+"""
+
+import argparse
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import google.auth
+from google.auth.credentials import AnonymousCredentials
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ge_common import discoveryengine_client
+import graph_batch
+import identity_cache
+import inventory
+import list_agents_wif
+import output_writers
+import request_layer
+import resolve_entra_users
+
+FIELDS = list_agents_wif.CSV_FIELDS + ["creator_email", "creator_name"]
+
+UUID_PATTERN = re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$")
+
+
+def enrich(info, email, name):
+    """Adds creator_email/creator_name; failed lookups keep the reason in creator_email as N/A (...)."""
+    if email and email != "N/A":
+        info["creator_email"] = email
+        info["creator_name"] = name
+    else:
+        info["creator_email"] = f"N/A ({name})"
+        info["creator_name"] = ""
+    return info
+
+
+def scan_rows(lister, session, project_id, locations, options, events):
+    """Runs the inventory scan on a background thread and posts its rows to the event queue."""
+    try:
+        for info in inventory.stream_agent_rows(lister, session, project_id, locations, options):
+            events.put(("row", info))
+    except Exception as e:
+        print(f"Error scanning project {project_id}: {e}", file=sys.stderr)
+    finally:
+        events.put(("scan_done", None))
+
+
+def run_pipeline(lister, session, project_id, locations, args, writer, graph_token, cache=None):
+    """
+    Joins the streaming inventory with Entra ID resolution and writes each enriched row as soon
+    as its creator is known. Returns (rows written, UUIDs resolved through Graph).
+    """
+    events = queue.Queue()
+    resolver = graph_batch.StreamingResolver(
+        graph_batch.create_session(pool_size=max(10, args.workers)), graph_token,
+        on_resolved=lambda results: events.put(("resolved", results)),
+        batch_size=args.batch_size, workers=args.workers)
+    scanner = threading.Thread(target=scan_rows, args=(lister, session, project_id, locations, args, events),
+                               name="scan", daemon=True)
+    scanner.start()
+
+    resolved = {}  # lower-case UUID -> (email, name)
+    waiting = {}   # lower-case UUID -> rows waiting for their creator's identity
+    graph_lookups = 0
+    scan_done = False
+    while not (scan_done and events.empty()):
+        kind, payload = events.get()
+        if kind == "row":
+            creator = payload["creator"] or ""
+            key = creator.lower()
+            if not UUID_PATTERN.match(creator):
+                if "@" in creator:
+                    writer.write(enrich(payload, creator, ""))
+                else:
+                    writer.write(enrich(payload, None, "Not a WIF user UUID"))
+            elif key in resolved:
+                writer.write(enrich(payload, *resolved[key]))
+            else:
+                cached = cache.lookup([creator]) if cache else {}
+                if creator in cached:
+                    user = cached[creator]
+                    resolved[key] = graph_batch.parse_user(user) if user else (None, "User not found")
+                    writer.write(enrich(payload, *resolved[key]))
+                else:
+                    waiting.setdefault(key, []).append(payload)
+                    resolver.submit(creator)
+        elif kind == "resolved":
+            graph_lookups += len(payload)
+            if cache:
+                cache.store({uuid: user for uuid, (_, _, user) in payload.items() if user is not None})
+            for uuid, (email, name, _) in payload.items():
+                resolved[uuid.lower()] = (email, name)
+                for info in waiting.pop(uuid.lower(), []):
+                    writer.write(enrich(info, email, name))
+        elif kind == "scan_done":
+            # Send the last partial batch; its results are queued before close() returns
+            resolver.close()
+            scan_done = True
+
+    for infos in waiting.values():
+        for info in infos:
+            writer.write(enrich(info, None, "Not resolved"))
+    return writer.rows, graph_lookups
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan WIF Gemini Enterprise agents and resolve their creators against Entra ID in one streaming pipeline.")
+    inventory.add_scan_arguments(parser, modes=False)
+    parser.add_argument("--batch-size", type=int, default=graph_batch.MAX_BATCH_SIZE, help="Lookups per Microsoft Graph $batch request (default and maximum: 20).")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent Microsoft Graph $batch requests (default: 4).")
+    parser.add_argument("--cache", default="identity_cache.db", help="Path to the SQLite identity and token cache (default: identity_cache.db).")
+    parser.add_argument("--cache-ttl", type=float, default=168, help="Hours a resolved identity stays cached (default: 168, one week).")
+    parser.add_argument("--negative-ttl", type=float, default=24, help="Hours a 'User not found' result stays cached (default: 24).")
+    parser.add_argument("--no-cache", action="store_true", help="Always query Microsoft Graph and fetch a new access token.")
+    args = parser.parse_args()
+    inventory.validate_scan_arguments(parser, args)
+    if not 1 <= args.batch_size <= graph_batch.MAX_BATCH_SIZE:
+        parser.error(f"--batch-size must be between 1 and {graph_batch.MAX_BATCH_SIZE}")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    tenant_id, client_id, client_secret = resolve_entra_users.TENANT_ID, resolve_entra_users.CLIENT_ID, resolve_entra_users.CLIENT_SECRET
+    if not all([tenant_id, client_id, client_secret]) or "YOUR_" in str(tenant_id) or "YOUR_" in str(client_id) or "YOUR_" in str(client_secret):
+        print("Error: Azure credentials must be configured in a .env file or set as environment variables.", file=sys.stderr)
+        print("Required variables: AZURE_TENANT_ID, AZURE_CLIENT_ID, AZURE_CLIENT_SECRET", file=sys.stderr)
+        sys.exit(1)
+
+    # Determine locations to scan
+    locations = inventory.scan_locations(args)
+
+    # Authenticate and detect project
+    try:
+        override = discoveryengine_client.endpoint_override()
+        if override:
+            # Local stand-in server (e.g. benchmark/fake_server.py): no Google login needed
+            credentials, auto_project_id = AnonymousCredentials(), None
+        else:
+            credentials, auto_project_id = google.auth.default()
+        session = request_layer.RetryingSession(
+            discoveryengine_client.Session(discoveryengine_client.CredentialCache(credentials)),
+            rates={"discoveryengine": args.de_qps, "logging": args.log_rpm / 60.0},
+            max_in_flight=args.max_in_flight, max_retries=args.max_retries, endpoint_override=override)
+    except Exception as e:
+        print(f"Authentication Error: {e}", file=sys.stderr)
+        print("Please run 'gcloud auth application-default login' first.", file=sys.stderr)
+        sys.exit(1)
+
+    project_id = args.project_id or os.getenv("GOOGLE_CLOUD_PROJECT") or os.getenv("PROJECT_ID") or auto_project_id
+    if not project_id:
+        print("Error: Project ID could not be detected. Please specify using --project_id <PROJECT_ID>.", file=sys.stderr)
+        sys.exit(1)
+
+    cache = None if args.no_cache else identity_cache.IdentityCache(
+        args.cache, ttl_seconds=args.cache_ttl * 3600, negative_ttl_seconds=args.negative_ttl * 3600)
+    print("Acquiring Microsoft Graph API access token...", file=sys.stderr)
+    graph_token = resolve_entra_users.get_access_token(tenant_id, client_id, client_secret, cache=cache)
+    if not graph_token:
+        print("Error: Failed to obtain access token.", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"Scanning project: {project_id} ...", file=sys.stderr)
+    lister = inventory.AgentLister(
+        list_agents_wif.list_engines, list_agents_wif.list_agents, list_agents_wif.iter_listings,
+        list_agents_wif.get_agent_type, list_agents_wif.get_payload_email, list_agents_wif.get_agent_creators,
+        list_agents_wif.format_datetime, extract_creator=list_agents_wif.extract_creator_identity)
+
+    start = time.perf_counter()
+    writer = output_writers.open_writer(args.format, FIELDS, output=args.output)
+    try:
+        rows, graph_lookups = run_pipeline(lister, session, project_id, locations, args, writer, graph_token, cache=cache)
+    finally:
+        writer.close()
+        if cache:
+            cache.close()
+    session.report()
+
+    print(f"\nWrote {rows} enriched row(s) in {time.perf_counter() - start:.1f}s; "
+          f"{graph_lookups} UUID(s) resolved through Microsoft Graph.", file=sys.stderr)
+    if rows == 0:
+        print("No no-code agents found.", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Rolls an SDP content policy out to (or removes it from) every data connector in a project.
+Discovers the connector collections in each location (what list_data_stores.sh and
+list_connector_config.sh do by hand), PATCHes their dataProtectionPolicy with bounded
+parallelism, polls any long-running operations in one shared loop and prints a per-target report.
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ge_common import discoveryengine_client
+from ge_common.discoveryengine_client import api_base, call
+
+def create_session(project_id, pool_size):
+    session = discoveryengine_client.Session(pool_size=pool_size, quota_project=project_id)
+    session.headers["Content-Type"] = "application/json"
+    return session
+
+
+def list_data_store_collections(session, project_id, location, collection):
+    """Pages the data stores of a collection ("-" for all); returns (collection IDs, HTTP status)."""
+    url = f"{api_base(location)}/v1alpha/projects/{project_id}/locations/{location}/collections/{collection}/dataStores"
+    collections, token = set(), ""
+    while True:
+        params = {"pageSize": 100}
+        if token:
+            params["pageToken"] = token
+        response = call(session, "GET", url, params=params)
+        if response.status_code != 200:
+            return collections, response.status_code
+        data = response.json()
+        for data_store in data.get("dataStores", []):
+            collections.add(data_store["name"].split("/collections/")[1].split("/")[0])
+        token = data.get("nextPageToken")
+        if not token:
+            return collections, 200
+
+
+def list_collections(session, project_id, location):
+    """Returns the IDs of the collections holding data stores in a location."""
+    # Connector data stores live in their connector's collection, so list across all collections first
+    collections, status = list_data_store_collections(session, project_id, location, "-")
+    if status != 200:
+        print(f"Warning: cannot list data stores across collections in {location} (HTTP {status}); "
+              "falling back to default_collection. Pass --collections to target connector collections.", file=sys.stderr)
+        collections, status = list_data_store_collections(session, project_id, location, "default_collection")
+        if status not in (200, 403, 404):
+            print(f"Warning: data store listing in {location} failed (HTTP {status}).", file=sys.stderr)
+    return sorted(collections)
+
+
+def get_connector(session, project_id, location, collection):
+    """Returns the collection's dataConnector, or None if the collection has no connector."""
+    url = f"{api_base(location)}/v1alpha/projects/{project_id}/locations/{location}/collections/{collection}/dataConnector"
+    response = call(session, "GET", url)
+    if response.status_code == 404:
+        return None
+    if response.status_code != 200:
+        raise RuntimeError(f"HTTP {response.status_code}: {response.text[:300]}")
+    return response.json()
+
+
+def current_policy(connector):
+    return connector.get("dataProtectionPolicy", {}).get("sensitiveDataProtectionPolicy", {}).get("policy")
+
+
+def patch_policy(session, connector_name, location, policy):
+    """PATCHes a connector's dataProtectionPolicy (policy None unassigns); returns the response JSON."""
+    body = {"dataProtectionPolicy": {"sensitiveDataProtectionPolicy": {"policy": policy} if policy else {}}}
+    response = call(session, "PATCH", f"{api_base(location)}/v1alpha/{connector_name}",
+                    params={"updateMask": "dataProtectionPolicy"}, json=body)
+    if response.status_code != 200:
+        raise RuntimeError(f"HTTP {response.status_code}: {response.text[:300]}")
+    return response.json()
+
+
+def is_pending_operation(result):
+    return "/operations/" in result.get("name", "") and not result.get("done")
+
+
+class OperationPoller:
+    """
+    One shared loop polling every pending long-running operation. Each operation backs off on its
+    own schedule (interval doubling up to max_interval); each waiter awaits a future.
+    """
+
+    def __init__(self, session, concurrency, interval=1.0, max_interval=10.0, timeout=1800):
+        self.session = session
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.interval = interval
+        self.max_interval = max_interval
+        self.timeout = timeout
+        self.pending = {}
+        self.wakeup = asyncio.Event()
+
+    def wait(self, operation_name, location):
+        future = asyncio.get_running_loop().create_future()
+        now = time.monotonic()
+        self.pending[operation_name] = {"location": location, "future": future, "started": now,
+                                        "interval": self.interval, "next_poll": now + self.interval}
+        self.wakeup.set()
+        return future
+
+    async def _poll(self, name, location):
+        async with self.semaphore:
+            response = await asyncio.to_thread(call, self.session, "GET", f"{api_base(location)}/v1alpha/{name}")
+        if response.status_code != 200:
+            raise RuntimeError(f"Polling {name}: HTTP {response.status_code}: {response.text[:300]}")
+        return response.json()
+
+    async def run(self):
+        while True:
+            self.wakeup.clear()
+            if self.pending:
+                delay = min(op["next_poll"] for op in self.pending.values()) - time.monotonic()
+            else:
+                delay = None
+            if delay is None or delay > 0:
+                # Sleep until the next operation is due, or until a new one is registered
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            now = time.monotonic()
+            due = [name for name, op in self.pending.items() if op["next_poll"] <= now]
+            results = await asyncio.gather(*(self._poll(name, self.pending[name]["location"]) for name in due),
+                                           return_exceptions=True)
+            for name, result in zip(due, results):
+                op = self.pending[name]
+                if isinstance(result, Exception):
+                    error = result
+                elif result.get("done"):
+                    error = RuntimeError(result["error"].get("message", result["error"])) if "error" in result else None
+                elif time.monotonic() - op["started"] > self.timeout:
+                    error = RuntimeError(f"Operation {name} still running after {self.timeout}s")
+                else:
+                    op["interval"] = min(self.max_interval, op["interval"] * 2)
+                    op["next_poll"] = time.monotonic() + op["interval"]
+                    continue
+                del self.pending[name]
+                if error:
+                    op["future"].set_exception(error)
+                else:
+                    op["future"].set_result(result)
+
+
+async def discover(session, project_id, locations, collections, pattern, concurrency):
+    """Returns [(location, collection, connector)] for every connector matching the filters."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def collections_in(location):
+        if collections:
+            return location, collections
+        return location, await asyncio.to_thread(list_collections, session, project_id, location)
+
+    async def connector(location, collection):
+        async with semaphore:
+            try:
+                return location, collection, await asyncio.to_thread(get_connector, session, project_id, location, collection)
+            except Exception as e:
+                print(f"Warning: reading the connector of {location}/{collection} failed: {e}", file=sys.stderr)
+                return location, collection, None
+
+    found = await asyncio.gather(*(collections_in(location) for location in locations))
+    candidates = [(location, collection) for location, ids in found for collection in ids
+                  if not pattern or pattern.search(collection)]
+    results = await asyncio.gather(*(connector(location, collection) for location, collection in candidates))
+    return [result for result in results if result[2] is not None]
+
+
+async def rollout(session, targets, policy_for, concurrency, dry_run):
+    """Applies the desired policy to every target; returns one report row per target."""
+    semaphore = asyncio.Semaphore(concurrency)
+    poller = OperationPoller(session, concurrency)
+    poller_task = asyncio.create_task(poller.run())
+
+    async def apply(location, collection, connector):
+        desired = policy_for(location)
+        row = {"location": location, "collection": collection, "data_source": connector.get("dataSource", ""),
+               "before": current_policy(connector) or "-", "outcome": "", "request_s": 0.0, "total_s": 0.0, "error": ""}
+        if (current_policy(connector) or None) == desired:
+            row["outcome"] = "UNCHANGED"
+            return row
+        if dry_run:
+            row["outcome"] = "WOULD CHANGE"
+            return row
+        started = time.perf_counter()
+        try:
+            async with semaphore:
+                result = await asyncio.to_thread(patch_policy, session, connector["name"], location, desired)
+            row["request_s"] = time.perf_counter() - started
+            if is_pending_operation(result):
+                await poller.wait(result["name"], location)
+            row["outcome"] = "OK"
+        except Exception as e:
+            row["request_s"] = row["request_s"] or time.perf_counter() - started
+            row["outcome"], row["error"] = "FAILED", str(e)
+        row["total_s"] = time.perf_counter() - started
+        return row
+
+    try:
+        return await asyncio.gather(*(apply(*target) for target in targets))
+    finally:
+        poller_task.cancel()
+
+
+def print_report(rows, elapsed):
+    template = "{:<8} | {:<44} | {:<12} | {:<12} | {:>9} | {:>9} | {}"
+    print(template.format("Location", "Collection", "Data Source", "Outcome", "Request s", "Total s", "Error"))
+    print("-" * 130)
+    for row in sorted(rows, key=lambda r: (r["outcome"] != "FAILED", r["location"], r["collection"])):
+        print(template.format(row["location"], row["collection"][:44], row["data_source"][:12], row["outcome"],
+                              f"{row['request_s']:.2f}", f"{row['total_s']:.2f}", row["error"][:200]))
+    outcomes = {}
+    for row in rows:
+        outcomes[row["outcome"]] = outcomes.get(row["outcome"], 0) + 1
+    totals = sorted(row["total_s"] for row in rows if row["outcome"] == "OK")
+    summary = ", ".join(f"{count} {outcome.lower()}" for outcome, count in sorted(outcomes.items()))
+    print(f"\n{len(rows)} connector(s) in {elapsed:.1f}s: {summary}.", file=sys.stderr)
+    if totals:
+        print(f"Per-connector latency: p50 {totals[len(totals) // 2]:.2f}s, p95 {totals[min(len(totals) - 1, int(len(totals) * 0.95))]:.2f}s, "
+              f"max {totals[-1]:.2f}s.", file=sys.stderr)
+
+
+async def main_async(args, policy_for):
+    session = create_session(args.project_id, pool_size=args.concurrency)
+    # Blocking requests calls run in threads: size the pool so --concurrency is the only limit
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=args.concurrency + 4))
+    start = time.perf_counter()
+    locations = [loc.strip() for loc in args.locations.split(",") if loc.strip()]
+    collections = [c.strip() for c in args.collections.split(",") if c.strip()] if args.collections else None
+    pattern = re.compile(args.match) if args.match else None
+    print(f"Discovering data connectors of project {args.project_id} in {', '.join(locations)}...", file=sys.stderr)
+    targets = await discover(session, args.project_id, locations, collections, pattern, args.concurrency)
+    if args.data_source:
+        targets = [t for t in targets if t[2].get("dataSource", "").lower() == args.data_source.lower()]
+    print(f"Found {len(targets)} data connector(s).", file=sys.stderr)
+    rows = await rollout(session, targets, policy_for, args.concurrency, args.dry_run)
+    print_report(rows, time.perf_counter() - start)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Assign or unassign an SDP content policy on every data connector of a project, concurrently.")
+    parser.add_argument("--project-id", default=os.getenv("PROJECT_ID"), help="Project of the data connectors (default: PROJECT_ID env var).")
+    parser.add_argument("--locations", default="global,us,eu", help="Comma-separated locations to scan (default: global,us,eu).")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument("--policy", help="Content policy ID or full resource name (projects/.../locations/.../contentPolicies/...) to assign.")
+    action.add_argument("--unassign", action="store_true", help="Remove the SDP content policy from the connectors instead.")
+    parser.add_argument("--policy-location", help="Location of --policy when given as an ID (default: each connector's own location).")
+    parser.add_argument("--collections", help="Comma-separated collection IDs to target instead of discovering them.")
+    parser.add_argument("--match", help="Only target collections whose ID matches this regular expression (e.g. '^sharepoint').")
+    parser.add_argument("--data-source", help="Only target connectors of this data source (e.g. sharepoint).")
+    parser.add_argument("--concurrency", type=int, default=16, help="Maximum requests in flight at once (default: 16).")
+    parser.add_argument("--dry-run", action="store_true", help="Report which connectors would change without patching them.")
+    args = parser.parse_args()
+    if not args.project_id:
+        parser.error("--project-id (or the PROJECT_ID env var) is required")
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+
+    def policy_for(location):
+        if args.unassign:
+            return None
+        if args.policy.startswith("projects/"):
+            return args.policy
+        return f"projects/{args.project_id}/locations/{args.policy_location or location}/contentPolicies/{args.policy}"
+
+    rows = asyncio.run(main_async(args, policy_for))
+    if any(row["outcome"] == "FAILED" for row in rows):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()